@@ -16,13 +16,19 @@ router = APIRouter()
 
 
 @router.get("/download", summary="查询下载历史记录", response_model=List[schemas.DownloadHistory])
-def download_history(page: int = 1,
+def download_history(title: str = None,
+                     page: int = 1,
                      count: int = 30,
+                     last_id: int = None,
                      db: Session = Depends(get_db),
                      _: schemas.TokenPayload = Depends(verify_token)) -> Any:
     """
-    查询下载历史记录
+    查询下载历史记录，传入last_id（上一页最后一条记录的ID）时按游标分页
     """
+    if last_id is not None:
+        return DownloadHistory.list_by_cursor(db, title=title, last_id=last_id, count=count)
+    if title:
+        return DownloadHistory.list_by_title(db, title, page, count)
     return DownloadHistory.list_by_page(db, page, count)
 
 
@@ -41,22 +47,32 @@ def delete_download_history(history_in: schemas.DownloadHistory,
 def transfer_history(title: str = None,
                      page: int = 1,
                      count: int = 30,
+                     cursor: str = None,
                      db: Session = Depends(get_db),
                      _: schemas.TokenPayload = Depends(verify_token)) -> Any:
     """
-    查询转移历史记录
+    查询转移历史记录，传入cursor时按游标分页（首页传空字符串），返回的cursor用于查询下一页
     """
-    if title:
-        total = TransferHistory.count_by_title(db, title)
+    if cursor is not None:
+        date, hid = None, None
+        if cursor:
+            date, _sep, hid = cursor.rpartition("|")
+            hid = int(hid) if hid.isdigit() else None
+        result = TransferHistory.list_by_cursor(db, title=title, date=date, hid=hid, count=count)
+    elif title:
         result = TransferHistory.list_by_title(db, title, page, count)
     else:
         result = TransferHistory.list_by_page(db, page, count)
+    if title:
+        total = TransferHistory.count_by_title(db, title)
+    else:
         total = TransferHistory.count(db)
 
     return schemas.Response(success=True,
                             data={
                                 "list": result,
                                 "total": total,
+                                "cursor": f"{result[-1].date}|{result[-1].id}" if len(result) == count else None
                             })
 
 
@@ -9,6 +9,7 @@ from app.chain.rss import RssChain
 from app.core.security import verify_token
 from app.db import get_db
 from app.db.models.rss import Rss
+from app.db.rss_oper import RssOper
 from app.helper.rss import RssHelper
 from app.schemas import MediaType
 
@@ -72,6 +73,8 @@ def update_rss(
         return schemas.Response(success=False, message="自定义订阅不存在")
 
     rss.update(db, rss_in.dict())
+    # 规则可能已变化，下次刷新时重新解析全部条目
+    RssOper(db).reset_state(rss.id)
     return schemas.Response(success=True)
 
 
@@ -131,5 +134,5 @@ def read_rss(
     """
     根据ID删除自定义订阅
     """
-    Rss.delete(db, rssid)
+    RssOper(db).delete(rssid)
     return schemas.Response(success=True)
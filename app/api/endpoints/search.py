@@ -1,6 +1,6 @@
 from typing import List, Any
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
 
 from app import schemas
@@ -14,40 +14,49 @@ router = APIRouter()
 
 
 @router.get("/last", summary="查询搜索结果", response_model=List[schemas.Context])
-async def search_latest(db: Session = Depends(get_db),
-                        _: schemas.TokenPayload = Depends(verify_token)) -> Any:
+async def search_latest(search_id: str = None,
+                        page: int = None,
+                        count: int = 30,
+                        db: Session = Depends(get_db),
+                        token: schemas.TokenPayload = Depends(verify_token)) -> Any:
     """
-    查询搜索结果
+    查询当前用户最近一次搜索结果，可指定搜索ID（精确搜索响应头X-Search-Id返回），传入page时分页返回
     """
-    torrents = SearchChain(db).last_search_results()
-    return [torrent.to_dict() for torrent in torrents]
+    return SearchChain(db).last_search_results(userid=token.sub, search_id=search_id,
+                                               page=page, count=count)
 
 
 @router.get("/media/{mediaid}", summary="精确搜索资源", response_model=List[schemas.Context])
 def search_by_tmdbid(mediaid: str,
+                     response: Response,
                      mtype: str = None,
                      area: str = "title",
                      db: Session = Depends(get_db),
-                     _: schemas.TokenPayload = Depends(verify_token)) -> Any:
+                     token: schemas.TokenPayload = Depends(verify_token)) -> Any:
     """
     根据TMDBID/豆瓣ID精确搜索站点资源 tmdb:/douban:/
+    搜索结果已保存，响应头X-Search-Id为本次搜索的ID，可用于/search/last查询或分页
     """
     if mediaid.startswith("tmdb:"):
         tmdbid = int(mediaid.replace("tmdb:", ""))
         if mtype:
             mtype = MediaType(mtype)
-        torrents = SearchChain(db).search_by_tmdbid(tmdbid=tmdbid, mtype=mtype, area=area)
+        search_id, torrents = SearchChain(db).search_by_tmdbid(tmdbid=tmdbid, mtype=mtype, area=area,
+                                                               userid=token.sub)
     elif mediaid.startswith("douban:"):
         doubanid = mediaid.replace("douban:", "")
         # 识别豆瓣信息
         context = DoubanChain(db).recognize_by_doubanid(doubanid)
         if not context or not context.media_info or not context.media_info.tmdb_id:
             raise HTTPException(status_code=404, detail="无法识别TMDB媒体信息！")
-        torrents = SearchChain(db).search_by_tmdbid(tmdbid=context.media_info.tmdb_id,
-                                                    mtype=context.media_info.type,
-                                                    area=area)
+        search_id, torrents = SearchChain(db).search_by_tmdbid(tmdbid=context.media_info.tmdb_id,
+                                                               mtype=context.media_info.type,
+                                                               area=area,
+                                                               userid=token.sub)
     else:
         return []
+    if search_id:
+        response.headers["X-Search-Id"] = search_id
     return [torrent.to_dict() for torrent in torrents]
 
 
@@ -10,6 +10,7 @@ from app.core.config import settings
 from app.core.security import verify_token
 from app.db import get_db
 from app.db.models.subscribe import Subscribe
+from app.db.subscribe_oper import SubscribeOper
 from app.db.models.user import User
 from app.db.userauth import get_current_active_user
 from app.schemas.types import MediaType
@@ -166,12 +167,12 @@ def delete_subscribe_by_mediaid(
         tmdbid = mediaid[5:]
         if not tmdbid or not str(tmdbid).isdigit():
             return schemas.Response(success=False)
-        Subscribe().delete_by_tmdbid(db, int(tmdbid), season)
+        SubscribeOper(db).delete_by_tmdbid(int(tmdbid), season)
     elif mediaid.startswith("douban:"):
         doubanid = mediaid[7:]
         if not doubanid:
             return schemas.Response(success=False)
-        Subscribe().delete_by_doubanid(db, doubanid)
+        SubscribeOper(db).delete_by_doubanid(doubanid)
 
     return schemas.Response(success=True)
 
@@ -185,7 +186,7 @@ def delete_subscribe(
     """
     删除订阅信息
     """
-    Subscribe.delete(db, subscribe_id)
+    SubscribeOper(db).delete(subscribe_id)
     return schemas.Response(success=True)
 
 
@@ -6,8 +6,10 @@ from sqlalchemy.orm import Session
 
 from app import schemas
 from app.chain.transfer import TransferChain
+from app.core.config import settings
 from app.core.security import verify_token
 from app.db import get_db
+from app.monitor import Monitor
 from app.schemas import MediaType
 
 router = APIRouter()
@@ -75,3 +77,19 @@ def manual_transfer(path: str,
         return schemas.Response(success=False, message=errormsg)
     # 成功
     return schemas.Response(success=True)
+
+
+@router.get("/completed", summary="下载完成通知", response_model=schemas.Response)
+@router.post("/completed", summary="下载完成通知", response_model=schemas.Response)
+def download_completed(token: str, download_hash: str) -> Any:
+    """
+    下载器下载完成时调用，立即整理对应种子，种子在下载器中未完成或已整理时不处理
+    qBittorrent：Torrent 完成时运行外部程序 curl "http://IP:PORT/api/v1/transfer/completed?token=API_TOKEN&download_hash=%I"
+    Transmission：script-torrent-done 脚本中使用环境变量 TR_TORRENT_HASH 调用
+    :param token: API密钥
+    :param download_hash: 种子Hash
+    """
+    if token != settings.API_TOKEN:
+        return schemas.Response(success=False, message="token认证不通过")
+    Monitor().put_hash(download_hash)
+    return schemas.Response(success=True)
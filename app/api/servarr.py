@@ -10,6 +10,7 @@ from app.core.config import settings
 from app.core.metainfo import MetaInfo
 from app.db import get_db
 from app.db.models.subscribe import Subscribe
+from app.db.subscribe_oper import SubscribeOper
 from app.schemas import RadarrMovie, SonarrSeries
 from app.schemas.types import MediaType
 from version import APP_VERSION
@@ -421,7 +422,7 @@ def arr_remove_movie(apikey: str, mid: int, db: Session = Depends(get_db)) -> An
         )
     subscribe = Subscribe.get(db, mid)
     if subscribe:
-        subscribe.delete(db, mid)
+        SubscribeOper(db).delete(mid)
         return schemas.Response(success=True)
     else:
         raise HTTPException(
@@ -765,7 +766,7 @@ def arr_remove_series(apikey: str, tid: int, db: Session = Depends(get_db)) -> A
         )
     subscribe = Subscribe.get(db, tid)
     if subscribe:
-        subscribe.delete(db, tid)
+        SubscribeOper(db).delete(tid)
         return schemas.Response(success=True)
     else:
         raise HTTPException(
@@ -16,6 +16,7 @@ from app.core.context import MediaInfo, TorrentInfo
 from app.core.event import EventManager
 from app.core.meta import MetaBase
 from app.core.module import ModuleManager
+from app.helper.library import LibraryHelper
 from app.log import logger
 from app.schemas import TransferInfo, TransferTorrent, ExistMediaInfo, DownloadingTorrent, CommingMessage, Notification, \
     WebhookEventInfo, EpisodeFormat
@@ -198,14 +199,14 @@ class ChainBase(metaclass=ABCMeta):
 
     def search_torrents(self, site: CommentedMap,
                         mediainfo: Optional[MediaInfo] = None,
-                        keyword: str = None,
+                        keyword: Union[str, List[str]] = None,
                         page: int = 0,
                         area: str = "title") -> List[TorrentInfo]:
         """
         搜索一个站点的种子资源
         :param site:  站点
         :param mediainfo:  识别的媒体信息
-        :param keyword:  搜索关键词，如有按关键词搜索，否则按媒体信息名称搜索
+        :param keyword:  搜索关键词，如有按关键词搜索，否则按媒体信息名称搜索，为列表时批量查询
         :param page:  页码
         :param area:  搜索区域
         :reutrn: 资源列表
@@ -292,6 +293,14 @@ class ChainBase(metaclass=ABCMeta):
                                transfer_type=transfer_type, target=target, meta=meta,
                                epformat=epformat, min_filesize=min_filesize)
 
+    def media_target_dir(self, path: Path, mediainfo: MediaInfo) -> Optional[Path]:
+        """
+        获取转移到媒体库时的目的目录（含类型和二级分类）
+        :param path:  文件路径
+        :param mediainfo:  识别的媒体信息
+        """
+        return self.run_module("media_target_dir", path=path, mediainfo=mediainfo)
+
     def transfer_completed(self, hashs: Union[str, list], transinfo: TransferInfo = None) -> None:
         """
         转移完成后的处理
@@ -339,6 +348,10 @@ class ChainBase(metaclass=ABCMeta):
         :param itemid:  媒体服务器ItemID
         :return: 如不存在返回None，存在时返回信息，包括每季已存在所有集{type: movie/tv, seasons: {season: [episodes]}}
         """
+        library = LibraryHelper()
+        if not itemid and library.ready:
+            # 已同步媒体服务器数据时从内存索引中查询，指定了项目ID时仍由媒体服务器查询
+            return library.media_exists(mediainfo=mediainfo)
         return self.run_module("media_exists", mediainfo=mediainfo, itemid=itemid)
 
     def refresh_mediaserver(self, mediainfo: MediaInfo, file_path: Path) -> Optional[bool]:
@@ -617,18 +617,23 @@ class DownloadChain(ChainBase):
         if not torrents:
             return []
         ret_torrents = []
-        for torrent in torrents:
-            history = self.downloadhis.get_by_hash(torrent.hash)
-            if history:
-                torrent.media = {
-                    "tmdbid": history.tmdbid,
-                    "type": history.type,
-                    "title": history.title,
-                    "season": history.seasons,
-                    "episode": history.episodes,
-                    "image": history.image,
-                }
-            ret_torrents.append(torrent)
+        # 一次查询所有任务的下载记录
+        self.downloadhis.cache_hashes([torrent.hash for torrent in torrents])
+        try:
+            for torrent in torrents:
+                history = self.downloadhis.get_by_hash(torrent.hash)
+                if history:
+                    torrent.media = {
+                        "tmdbid": history.tmdbid,
+                        "type": history.type,
+                        "title": history.title,
+                        "season": history.seasons,
+                        "episode": history.episodes,
+                        "image": history.image,
+                    }
+                ret_torrents.append(torrent)
+        finally:
+            self.downloadhis.clear_cache()
         return ret_torrents
 
     def set_downloading(self, hash_str, oper: str) -> bool:
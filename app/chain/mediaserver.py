@@ -1,6 +1,9 @@
 import json
 import threading
-from typing import List, Union, Generator
+import time
+from datetime import datetime
+from itertools import islice
+from typing import List, Union, Generator, Optional, Dict
 
 from sqlalchemy.orm import Session
 
@@ -8,8 +11,11 @@ from app import schemas
 from app.chain import ChainBase
 from app.core.config import settings
 from app.db.mediaserver_oper import MediaServerOper
+from app.db.systemconfig_oper import SystemConfigOper
+from app.helper.library import LibraryHelper
 from app.log import logger
 from app.schemas import MessageChannel, Notification
+from app.schemas.types import SystemConfigKey
 
 lock = threading.Lock()
 
@@ -18,10 +24,19 @@ class MediaServerChain(ChainBase):
     """
     媒体服务器处理链
     """
+    # 全量同步间隔（天）
+    _full_sync_days = 7
+    # 增量同步时向前多取的时间（秒），避免服务器与本地时间不一致时遗漏
+    _sync_margin = 3600
+    # 每批写入的数量
+    _batch_size = 500
+    # 增量同步时变化的电视剧超过该数量才批量获取整个媒体库的剧集
+    _inventory_threshold = 20
 
     def __init__(self, db: Session = None):
         super().__init__(db)
         self.mediaserverdb = MediaServerOper(db)
+        self.systemconfig = SystemConfigOper(db)
 
     def librarys(self) -> List[schemas.MediaServerLibrary]:
         """
@@ -29,11 +44,19 @@ class MediaServerChain(ChainBase):
         """
         return self.run_module("mediaserver_librarys")
 
-    def items(self, library_id: Union[str, int]) -> Generator:
+    def items(self, library_id: Union[str, int], since: datetime = None) -> Generator:
         """
-        获取媒体服务器所有项目
+        获取媒体服务器所有项目，获取失败时在迭代过程中抛出异常
+        :param library_id: 媒体库ID
+        :param since: 只获取该时间（UTC）后新增或修改过的项目
         """
-        return self.run_module("mediaserver_items", library_id=library_id)
+        return self.run_module("mediaserver_items", library_id=library_id, since=since)
+
+    def item_ids(self, library_id: Union[str, int]) -> Optional[List[str]]:
+        """
+        获取媒体库中所有项目的ID
+        """
+        return self.run_module("mediaserver_item_ids", library_id=library_id)
 
     def episodes(self, item_id: Union[str, int]) -> List[schemas.MediaServerSeasonInfo]:
         """
@@ -41,50 +64,129 @@ class MediaServerChain(ChainBase):
         """
         return self.run_module("mediaserver_tv_episodes", item_id=item_id)
 
+    def episodes_inventory(self, library_id: Union[str, int]) -> Optional[Dict[str, Dict[int, list]]]:
+        """
+        批量获取媒体库中所有电视剧的季集信息
+        """
+        return self.run_module("mediaserver_episodes_inventory", library_id=library_id)
+
     def remote_sync(self, channel: MessageChannel, userid: Union[int, str]):
         """
         同步豆瓣想看数据，发送消息
         """
         self.post_message(Notification(channel=channel,
                                        title="开始媒体服务器 ...", userid=userid))
-        self.sync()
+        self.sync(full=True)
         self.post_message(Notification(channel=channel,
                                        title="同步媒体服务器完成！", userid=userid))
 
-    def sync(self):
+    def __get_since(self, server: str, full: bool) -> Optional[datetime]:
+        """
+        计算增量同步的起始时间，需要全量同步时返回None
+        """
+        if full:
+            return None
+        last = self.systemconfig.get(SystemConfigKey.MediaServerSyncTime) or {}
+        if last.get("server") != server or not last.get("time"):
+            return None
+        if time.time() - (last.get("full_time") or 0) > self._full_sync_days * 86400:
+            return None
+        return datetime.utcfromtimestamp(last.get("time") - self._sync_margin)
+
+    def sync(self, full: bool = False):
         """
-        同步媒体库所有数据到本地数据库
+        同步媒体库数据到本地数据库
+        - 上次同步后只获取新增或修改过的项目，每隔一段时间做一次全量同步
+        - 按项目ID批量更新，再删除媒体服务器上已不存在的项目，同步过程中数据一直可用
+        - 增量同步时，已有电视剧中删除的剧集不会出现在变化项目中，季集信息要到下次全量同步（或手动同步）才更新
+        - 删除已不存在的项目需要比对完整的项目ID列表，增量同步时也会获取每个媒体库所有电影和电视剧的ID（只取ID，不含剧集）
+        :param full: 是否强制全量同步
         """
         with lock:
-            logger.info("开始同步媒体库数据 ...")
+            server = settings.MEDIASERVER
+            if not server:
+                return
+            start_time = time.time()
+            since = self.__get_since(server, full)
+            if since:
+                logger.info(f"开始增量同步媒体库数据，起始时间：{since.strftime('%Y-%m-%d %H:%M:%S')} UTC ...")
+            else:
+                logger.info("开始同步媒体库数据 ...")
+            librarys = self.librarys()
+            if not librarys:
+                logger.warn("未获取到媒体库，跳过同步")
+                return
             # 汇总统计
             total_count = 0
-            # 清空登记薄
-            self.mediaserverdb.empty(server=settings.MEDIASERVER)
-            for library in self.librarys():
+            # 媒体服务器上现有的项目ID，有媒体库获取失败时不删除
+            exists_ids = set()
+            ids_complete = True
+            # 有媒体库项目获取失败时不更新同步时间，下次仍从上次成功的时间开始同步
+            items_complete = True
+            for library in librarys:
                 logger.info(f"正在同步媒体库 {library.name} ...")
                 library_count = 0
-                for item in self.items(library.id):
-                    if not item:
-                        continue
-                    if not item.item_id:
-                        continue
-                    # 计数
-                    library_count += 1
-                    seasoninfo = {}
-                    # 类型
-                    item_type = "电视剧" if item.item_type in ['Series', 'show'] else "电影"
-                    if item_type == "电视剧":
-                        # 查询剧集信息
-                        espisodes_info = self.episodes(item.item_id) or []
-                        for episode in espisodes_info:
-                            seasoninfo[episode.season] = episode.episodes
-                    # 插入数据
-                    item_dict = item.dict()
-                    item_dict['seasoninfo'] = json.dumps(seasoninfo)
-                    item_dict['item_type'] = item_type
-                    self.mediaserverdb.add(**item_dict)
+                # 全量同步或变化的电视剧较多时批量获取整个媒体库的剧集，失败时逐个查询
+                inventory = None
+                inventory_fetched = False
+                series_count = 0
+                # 按批读取项目，不一次性加载整个媒体库
+                try:
+                    items = (item for item in self.items(library.id, since=since) or [] if item and item.item_id)
+                    while True:
+                        batch = list(islice(items, self._batch_size))
+                        if not batch:
+                            break
+                        library_count += len(batch)
+                        series_count += len([item for item in batch if item.item_type in ['Series', 'show']])
+                        if not inventory_fetched and series_count \
+                                and (not since or series_count > self._inventory_threshold):
+                            inventory = self.episodes_inventory(library.id)
+                            inventory_fetched = True
+                        item_dicts = []
+                        for item in batch:
+                            seasoninfo = {}
+                            # 类型
+                            item_type = "电视剧" if item.item_type in ['Series', 'show'] else "电影"
+                            if item_type == "电视剧":
+                                if inventory is not None:
+                                    seasoninfo = inventory.get(str(item.item_id)) or {}
+                                else:
+                                    # 查询剧集信息
+                                    espisodes_info = self.episodes(item.item_id) or []
+                                    for episode in espisodes_info:
+                                        seasoninfo[episode.season] = episode.episodes
+                            item_dict = item.dict()
+                            item_dict['seasoninfo'] = json.dumps(seasoninfo)
+                            item_dict['item_type'] = item_type
+                            item_dicts.append(item_dict)
+                        self.mediaserverdb.upsert(server=server, items=item_dicts)
+                except Exception as e:
+                    items_complete = False
+                    logger.error(f"媒体库 {library.name} 项目获取失败：{str(e)}")
+                library_ids = self.item_ids(library.id)
+                if library_ids is None:
+                    ids_complete = False
+                else:
+                    exists_ids.update(library_ids)
                 logger.info(f"媒体库 {library.name} 同步完成，共同步数量：{library_count}")
                 # 总数累加
                 total_count += library_count
+            if ids_complete:
+                removed = self.mediaserverdb.delete_vanished(server=server, item_ids=exists_ids)
+                if removed:
+                    logger.info(f"已删除媒体服务器上不存在的项目：{removed}")
+            else:
+                logger.warn("部分媒体库项目列表获取失败，本次不删除数据")
+            if items_complete:
+                # 同步开始前整理入库的媒体已以媒体服务器的数据为准
+                LibraryHelper().reset_transferred(before=start_time)
+                last = self.systemconfig.get(SystemConfigKey.MediaServerSyncTime) or {}
+                self.systemconfig.set(SystemConfigKey.MediaServerSyncTime, {
+                    "server": server,
+                    "time": start_time,
+                    "full_time": last.get("full_time") if since else start_time
+                })
+            else:
+                logger.warn("部分媒体库项目获取失败，本次不更新同步时间")
             logger.info("【MediaServer】媒体库数据同步完成，同步数量：%s" % total_count)
@@ -1,4 +1,3 @@
-import json
 import re
 from datetime import datetime
 from typing import Tuple, Optional
@@ -8,7 +7,7 @@ from sqlalchemy.orm import Session
 from app.chain import ChainBase
 from app.chain.download import DownloadChain
 from app.core.config import settings
-from app.core.context import Context, TorrentInfo, MediaInfo
+from app.core.context import Context, TorrentInfo, MediaInfo, MediaInfoRegistry
 from app.core.metainfo import MetaInfo
 from app.db.rss_oper import RssOper
 from app.db.systemconfig_oper import SystemConfigOper
@@ -119,11 +118,30 @@ class RssChain(ChainBase):
                 continue
             if not rss_task.url:
                 continue
-            # 下载Rss报文
-            items = RssHelper.parse(rss_task.url, True if rss_task.proxy else False)
+            # 旧版本保存在附加信息中的已处理数据
+            if rss_task.note:
+                self.rssoper.import_note(rss_task)
+            # 下载Rss报文，RSS未变化或没有新条目时不再处理
+            items, cache = RssHelper.fetch(rss_task.url,
+                                           proxy=True if rss_task.proxy else False,
+                                           etag=rss_task.etag,
+                                           last_modified=rss_task.last_modified,
+                                           last_guid=rss_task.last_guid,
+                                           last_pubdate=rss_task.last_pubdate)
+            if items is None:
+                logger.info(f"{rss_task.name} RSS未更新")
+                continue
             if not items:
-                logger.error(f"RSS未下载到数据：{rss_task.url}")
-            logger.info(f"{rss_task.name} RSS下载到数据：{len(items)}")
+                if cache:
+                    logger.info(f"{rss_task.name} RSS没有新数据")
+                    self.rssoper.update(rssid=rss_task.id, **cache)
+                else:
+                    logger.error(f"RSS未下载到数据：{rss_task.url}")
+                continue
+            if not cache:
+                # 部分内容，已解析的条目照常处理，不更新缓存和已处理位置，下次重新获取全部内容
+                logger.warn(f"{rss_task.name} RSS内容不完整，下次刷新时重新处理")
+            logger.info(f"{rss_task.name} RSS下载到新数据：{len(items)}")
             # 检查站点
             domain = StringUtils.get_url_domain(rss_task.url)
             site_info = self.sites.get_indexer(domain) or {}
@@ -134,16 +152,15 @@ class RssChain(ChainBase):
                 filter_rule = self.systemconfig.get(SystemConfigKey.FilterRules)
             # 处理RSS条目
             matched_contexts = []
-            # 处理过的title
-            processed_data = json.loads(rss_task.note) if rss_task.note else {
-                "titles": [],
-                "season_episodes": []
-            }
+            # 处理过的条目和季集
+            processed = self.rssoper.processed(rss_task.id, items)
+            season_episodes = self.rssoper.season_episodes(rss_task.id)
+            processed_items = []
             for item in items:
                 if not item.get("title"):
                     continue
-                # 标题是否已处理过
-                if item.get("title") in processed_data.get('titles'):
+                # 条目是否已处理过
+                if item.get("guid") in processed or item.get("title") in processed:
                     logger.info(f"{item.get('title')} 已处理过")
                     continue
                 # 基本要素匹配
@@ -168,7 +185,7 @@ class RssChain(ChainBase):
                     logger.error(f"{item.get('title')} 不匹配")
                     continue
                 # 季集是否已处理过
-                if meta.season_episode in processed_data.get('season_episodes'):
+                if meta.season_episode in season_episodes:
                     logger.info(f"{meta.season_episode} 已处理过")
                     continue
                 # 种子
@@ -196,18 +213,28 @@ class RssChain(ChainBase):
                         logger.info(f"{rss_task.name} 不匹配过滤规则")
                         continue
                 # 更新已处理数据
-                processed_data['titles'].append(item.get("title"))
-                processed_data['season_episodes'].append(meta.season_episode)
+                processed_items.append({
+                    "guid": item.get("guid"),
+                    "title": item.get("title"),
+                    "season_episode": meta.season_episode
+                })
+                season_episodes.add(meta.season_episode)
                 # 清除多条数据
                 mediainfo.clear()
-                # 匹配到的数据
+                # 匹配到的数据，同一媒体共用一份媒体信息
                 matched_contexts.append(Context(
                     meta_info=meta,
-                    media_info=mediainfo,
+                    media_info=MediaInfoRegistry().share(mediainfo),
                     torrent_info=torrentinfo
                 ))
-            # 更新已处理过的title
-            self.rssoper.update(rssid=rss_task.id, note=json.dumps(processed_data))
+            # 记录已处理的条目，RSS条目按发布时间倒序，第一条即为最新位置
+            self.rssoper.add_processed(rss_task.id, processed_items)
+            if cache:
+                pubdates = [int(item["pubdate"].timestamp()) for item in items if item.get("pubdate")]
+                self.rssoper.update(rssid=rss_task.id,
+                                    last_guid=items[0].get("guid"),
+                                    last_pubdate=max(pubdates) if pubdates else None,
+                                    **cache)
             if not matched_contexts:
                 logger.info(f"{rss_task.name} 未匹配到数据")
                 continue
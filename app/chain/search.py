@@ -1,8 +1,8 @@
-import pickle
+import copy
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from typing import Dict
-from typing import List, Optional
+from typing import List, Optional, Tuple
 
 from sqlalchemy.orm import Session
 
@@ -10,8 +10,10 @@ from app.chain import ChainBase
 from app.core.context import Context
 from app.core.context import MediaInfo, TorrentInfo
 from app.core.metainfo import MetaInfo
+from app.db.searchresult_oper import SearchResultOper
 from app.db.systemconfig_oper import SystemConfigOper
 from app.helper.progress import ProgressHelper
+from app.helper.sitebudget import SiteBudget, TaskBudget
 from app.helper.sites import SitesHelper
 from app.helper.torrent import TorrentHelper
 from app.log import logger
@@ -30,24 +32,27 @@ class SearchChain(ChainBase):
         self.siteshelper = SitesHelper()
         self.progress = ProgressHelper()
         self.systemconfig = SystemConfigOper(self._db)
+        self.searchresult = SearchResultOper(self._db)
         self.torrenthelper = TorrentHelper()
 
-    def search_by_tmdbid(self, tmdbid: int, mtype: MediaType = None, area: str = "title") -> List[Context]:
+    def search_by_tmdbid(self, tmdbid: int, mtype: MediaType = None, area: str = "title",
+                         userid: str = None) -> Tuple[Optional[str], List[Context]]:
         """
         根据TMDB ID搜索资源，精确匹配，但不不过滤本地存在的资源
         :param tmdbid: TMDB ID
         :param mtype: 媒体，电影 or 电视剧
         :param area: 搜索范围，title or imdbid
+        :param userid: 用户ID，搜索结果按用户保存
+        :return: 搜索ID（用于查询保存的结果），资源列表
         """
         mediainfo = self.recognize_media(tmdbid=tmdbid, mtype=mtype)
         if not mediainfo:
             logger.error(f'{tmdbid} 媒体信息识别失败！')
-            return []
+            return None, []
         results = self.process(mediainfo=mediainfo, area=area)
-        # 保存眲结果
-        bytes_results = pickle.dumps(results)
-        self.systemconfig.set(SystemConfigKey.SearchResults, bytes_results)
-        return results
+        # 保存结果
+        search_id = self.searchresult.save(results, userid=userid)
+        return search_id, results
 
     def search_by_title(self, title: str, page: int = 0, site: int = None) -> List[TorrentInfo]:
         """
@@ -63,18 +68,21 @@ class SearchChain(ChainBase):
         # 搜索
         return self.__search_all_sites(keyword=title, sites=[site] if site else None, page=page) or []
 
-    def last_search_results(self) -> List[Context]:
+    def last_search_results(self, userid: str = None, search_id: str = None,
+                            page: int = None, count: int = 30) -> List[dict]:
         """
         获取上次搜索结果
+        :param userid: 用户ID，为空时返回最近一次搜索
+        :param search_id: 搜索ID，为空时返回该用户最近一次搜索，只能查询该用户的搜索
+        :param page: 页码，为空时返回全部
+        :param count: 每页数量
+        :return: 与Context.to_dict()相同结构的字典列表
         """
-        results = self.systemconfig.get(SystemConfigKey.SearchResults)
-        if not results:
-            return []
-        try:
-            return pickle.loads(results)
-        except Exception as e:
-            print(str(e))
-            return []
+        if search_id:
+            search = self.searchresult.get(search_id, userid)
+        else:
+            search = self.searchresult.get_last(userid)
+        return self.searchresult.list_items(search, page=page, count=count)
 
     def browse(self, domain: str, keyword: str = None) -> List[TorrentInfo]:
         """
@@ -97,7 +105,10 @@ class SearchChain(ChainBase):
                 no_exists: Dict[int, Dict[int, NotExistMediaInfo]] = None,
                 sites: List[int] = None,
                 filter_rule: str = None,
-                area: str = "title") -> List[Context]:
+                area: str = "title",
+                budget: TaskBudget = None,
+                prefetched: Dict[int, List[TorrentInfo]] = None,
+                progress: bool = True) -> List[Context]:
         """
         根据媒体信息搜索种子资源，精确匹配，应用过滤规则，同时根据no_exists过滤本地已存在的资源
         :param mediainfo: 媒体信息
@@ -106,6 +117,9 @@ class SearchChain(ChainBase):
         :param sites: 站点ID列表，为空时搜索所有站点
         :param filter_rule: 过滤规则，为空是使用默认过滤规则
         :param area: 搜索范围，title or imdbid
+        :param budget: 站点访问配额，有值时按配额等待后再检查站点流控
+        :param prefetched: 已批量查询过的站点及结果，这些站点不再用主关键词单独搜索，结果参与匹配
+        :param progress: 是否更新搜索进度，多个订阅并发搜索时不更新
         """
         logger.info(f'开始搜索资源，关键词：{keyword or mediainfo.title} ...')
         # 补充媒体信息
@@ -131,15 +145,27 @@ class SearchChain(ChainBase):
             keywords = [mediainfo.title]
         # 执行搜索
         torrents: List[TorrentInfo] = []
+        # 批量查询的结果
+        batch_torrents: List[TorrentInfo] = []
         for keyword in keywords:
             torrents = self.__search_all_sites(
                 mediainfo=mediainfo,
                 keyword=keyword,
                 sites=sites,
-                area=area
-            )
-            if torrents:
+                area=area,
+                budget=budget,
+                exclude_sites=list(prefetched.keys()) if prefetched else None,
+                progress=progress
+            ) or []
+            if prefetched:
+                # 批量查询结果由多个订阅共用，过滤时会写入优先级，每个订阅使用各自的副本
+                batch_torrents = [copy.copy(torrent) for results in prefetched.values() for torrent in results]
+                # 批量查询结果只使用一次，后续关键词（原始标题）所有站点都单独搜索
+                prefetched = None
+            # 批量查询结果包含同组其它订阅的资源，只有与本媒体匹配的才算搜索到
+            if torrents or any(self.__match_torrent(mediainfo, torrent, log=False) for torrent in batch_torrents):
                 break
+        torrents += batch_torrents
         if not torrents:
             logger.warn(f'{keyword or mediainfo.title} 未搜索到资源')
             return []
@@ -164,64 +190,23 @@ class SearchChain(ChainBase):
         # 已处理数
         _count = 0
         if mediainfo:
-            self.progress.start(ProgressKey.Search)
+            if progress:
+                self.progress.start(ProgressKey.Search)
+                self.progress.update(value=0, text=f'开始匹配，总 {_total} 个资源 ...', key=ProgressKey.Search)
             logger.info(f'开始匹配，总 {_total} 个资源 ...')
-            self.progress.update(value=0, text=f'开始匹配，总 {_total} 个资源 ...', key=ProgressKey.Search)
             for torrent in torrents:
                 _count += 1
-                self.progress.update(value=(_count / _total) * 100,
-                                     text=f'正在匹配 {torrent.site_name}，已完成 {_count} / {_total} ...',
-                                     key=ProgressKey.Search)
-                # 比对IMDBID
-                if torrent.imdbid \
-                        and mediainfo.imdb_id \
-                        and torrent.imdbid == mediainfo.imdb_id:
-                    logger.info(f'{mediainfo.title} 匹配到资源：{torrent.site_name} - {torrent.title}')
-                    _match_torrents.append(torrent)
-                    continue
-                # 识别
-                torrent_meta = MetaInfo(title=torrent.title, subtitle=torrent.description)
-                # 比对类型
-                if (torrent_meta.type == MediaType.TV and mediainfo.type != MediaType.TV) \
-                        or (torrent_meta.type != MediaType.TV and mediainfo.type == MediaType.TV):
-                    logger.warn(f'{torrent.site_name} - {torrent.title} 类型不匹配')
-                    continue
-                # 比对年份
-                if mediainfo.year:
-                    if mediainfo.type == MediaType.TV:
-                        # 剧集年份，每季的年份可能不同
-                        if torrent_meta.year and torrent_meta.year not in [year for year in
-                                                                           mediainfo.season_years.values()]:
-                            logger.warn(f'{torrent.site_name} - {torrent.title} 年份不匹配')
-                            continue
-                    else:
-                        # 电影年份，上下浮动1年
-                        if torrent_meta.year not in [str(int(mediainfo.year) - 1),
-                                                     mediainfo.year,
-                                                     str(int(mediainfo.year) + 1)]:
-                            logger.warn(f'{torrent.site_name} - {torrent.title} 年份不匹配')
-                            continue
-                # 比对标题
-                meta_name = StringUtils.clear_upper(torrent_meta.name)
-                if meta_name in [
-                    StringUtils.clear_upper(mediainfo.title),
-                    StringUtils.clear_upper(mediainfo.original_title)
-                ]:
-                    logger.info(f'{mediainfo.title} 匹配到资源：{torrent.site_name} - {torrent.title}')
+                if progress:
+                    self.progress.update(value=(_count / _total) * 100,
+                                         text=f'正在匹配 {torrent.site_name}，已完成 {_count} / {_total} ...',
+                                         key=ProgressKey.Search)
+                if self.__match_torrent(mediainfo, torrent):
                     _match_torrents.append(torrent)
-                    continue
-                # 比对别名和译名
-                for name in mediainfo.names:
-                    if StringUtils.clear_upper(name) == meta_name:
-                        logger.info(f'{mediainfo.title} 匹配到资源：{torrent.site_name} - {torrent.title}')
-                        _match_torrents.append(torrent)
-                        break
-                else:
-                    logger.warn(f'{torrent.site_name} - {torrent.title} 标题不匹配')
-            self.progress.update(value=100,
-                                 text=f'匹配完成，共匹配到 {len(_match_torrents)} 个资源',
-                                 key=ProgressKey.Search)
-            self.progress.end(ProgressKey.Search)
+            if progress:
+                self.progress.update(value=100,
+                                     text=f'匹配完成，共匹配到 {len(_match_torrents)} 个资源',
+                                     key=ProgressKey.Search)
+                self.progress.end(ProgressKey.Search)
         else:
             _match_torrents = torrents
         logger.info(f"匹配完成，共匹配到 {len(_match_torrents)} 个资源")
@@ -236,11 +221,63 @@ class SearchChain(ChainBase):
         # 返回
         return contexts
 
+    @staticmethod
+    def __match_torrent(mediainfo: MediaInfo, torrent: TorrentInfo, log: bool = True) -> bool:
+        """
+        比对资源与媒体信息的IMDBID、类型、年份和标题
+        :param log: 是否输出匹配日志
+        """
+        # 比对IMDBID
+        if torrent.imdbid \
+                and mediainfo.imdb_id \
+                and torrent.imdbid == mediainfo.imdb_id:
+            if log:
+                logger.info(f'{mediainfo.title} 匹配到资源：{torrent.site_name} - {torrent.title}')
+            return True
+        # 识别
+        torrent_meta = MetaInfo(title=torrent.title, subtitle=torrent.description)
+        # 比对类型
+        if (torrent_meta.type == MediaType.TV and mediainfo.type != MediaType.TV) \
+                or (torrent_meta.type != MediaType.TV and mediainfo.type == MediaType.TV):
+            if log:
+                logger.warn(f'{torrent.site_name} - {torrent.title} 类型不匹配')
+            return False
+        # 比对年份
+        if mediainfo.year:
+            if mediainfo.type == MediaType.TV:
+                # 剧集年份，每季的年份可能不同
+                if torrent_meta.year and torrent_meta.year not in [year for year in
+                                                                   mediainfo.season_years.values()]:
+                    if log:
+                        logger.warn(f'{torrent.site_name} - {torrent.title} 年份不匹配')
+                    return False
+            else:
+                # 电影年份，上下浮动1年
+                if torrent_meta.year not in [str(int(mediainfo.year) - 1),
+                                             mediainfo.year,
+                                             str(int(mediainfo.year) + 1)]:
+                    if log:
+                        logger.warn(f'{torrent.site_name} - {torrent.title} 年份不匹配')
+                    return False
+        # 比对标题、别名和译名
+        meta_name = StringUtils.clear_upper(torrent_meta.name)
+        for name in [mediainfo.title, mediainfo.original_title] + (mediainfo.names or []):
+            if name and StringUtils.clear_upper(name) == meta_name:
+                if log:
+                    logger.info(f'{mediainfo.title} 匹配到资源：{torrent.site_name} - {torrent.title}')
+                return True
+        if log:
+            logger.warn(f'{torrent.site_name} - {torrent.title} 标题不匹配')
+        return False
+
     def __search_all_sites(self, mediainfo: Optional[MediaInfo] = None,
                            keyword: str = None,
                            sites: List[int] = None,
                            page: int = 0,
-                           area: str = "title") -> Optional[List[TorrentInfo]]:
+                           area: str = "title",
+                           budget: TaskBudget = None,
+                           exclude_sites: List[int] = None,
+                           progress: bool = True) -> Optional[List[TorrentInfo]]:
         """
         多线程搜索多个站点
         :param mediainfo:  识别的媒体信息
@@ -248,6 +285,9 @@ class SearchChain(ChainBase):
         :param sites:  指定站点ID列表，如有则只搜索指定站点，否则搜索所有站点
         :param page:  搜索页码
         :param area:  搜索区域 title or imdbid
+        :param budget:  站点访问配额
+        :param exclude_sites:  不搜索的站点ID列表
+        :param progress:  是否更新搜索进度
         :reutrn: 资源列表
         """
         # 未开启的站点不搜索
@@ -259,34 +299,38 @@ class SearchChain(ChainBase):
             config_indexers = [str(sid) for sid in self.systemconfig.get(SystemConfigKey.IndexerSites) or []]
         for indexer in self.siteshelper.get_indexers():
             # 检查站点索引开关
+            if exclude_sites and indexer.get("id") in exclude_sites:
+                continue
             if not config_indexers or str(indexer.get("id")) in config_indexers:
-                # 站点流控
-                state, msg = self.siteshelper.check(indexer.get("domain"))
-                if state:
-                    logger.warn(msg)
-                    continue
+                # 站点流控，有配额时在搜索前按配额等待后再检查
+                if not budget:
+                    state, msg = self.siteshelper.check(indexer.get("domain"))
+                    if state:
+                        logger.warn(msg)
+                        continue
                 indexer_sites.append(indexer)
         if not indexer_sites:
-            logger.warn('未开启任何有效站点，无法搜索资源')
+            if not exclude_sites:
+                logger.warn('未开启任何有效站点，无法搜索资源')
             return []
-        # 开始进度
-        self.progress.start(ProgressKey.Search)
         # 开始计时
         start_time = datetime.now()
         # 总数
         total_num = len(indexer_sites)
         # 完成数
         finish_count = 0
-        # 更新进度
-        self.progress.update(value=0,
-                             text=f"开始搜索，共 {total_num} 个站点 ...",
-                             key=ProgressKey.Search)
+        if progress:
+            # 开始进度
+            self.progress.start(ProgressKey.Search)
+            self.progress.update(value=0,
+                                 text=f"开始搜索，共 {total_num} 个站点 ...",
+                                 key=ProgressKey.Search)
         # 多线程
         executor = ThreadPoolExecutor(max_workers=len(indexer_sites))
         all_task = []
         for site in indexer_sites:
-            task = executor.submit(self.search_torrents, mediainfo=mediainfo,
-                                   site=site, keyword=keyword, page=page, area=area)
+            task = executor.submit(self.__search_site, mediainfo=mediainfo,
+                                   site=site, keyword=keyword, page=page, area=area, budget=budget)
             all_task.append(task)
         # 结果集
         results = []
@@ -296,17 +340,52 @@ class SearchChain(ChainBase):
             if result:
                 results.extend(result)
             logger.info(f"站点搜索进度：{finish_count} / {total_num}")
-            self.progress.update(value=finish_count / total_num * 100,
-                                 text=f"正在搜索{keyword or ''}，已完成 {finish_count} / {total_num} 个站点 ...",
-                                 key=ProgressKey.Search)
+            if progress:
+                self.progress.update(value=finish_count / total_num * 100,
+                                     text=f"正在搜索{keyword or ''}，已完成 {finish_count} / {total_num} 个站点 ...",
+                                     key=ProgressKey.Search)
         # 计算耗时
         end_time = datetime.now()
-        # 更新进度
-        self.progress.update(value=100,
-                             text=f"站点搜索完成，有效资源数：{len(results)}，总耗时 {(end_time - start_time).seconds} 秒",
-                             key=ProgressKey.Search)
+        if progress:
+            # 结束进度
+            self.progress.update(value=100,
+                                 text=f"站点搜索完成，有效资源数：{len(results)}，总耗时 {(end_time - start_time).seconds} 秒",
+                                 key=ProgressKey.Search)
+            self.progress.end(ProgressKey.Search)
         logger.info(f"站点搜索完成，有效资源数：{len(results)}，总耗时 {(end_time - start_time).seconds} 秒")
-        # 结束进度
-        self.progress.end(ProgressKey.Search)
         # 返回
         return results
+
+    def batch_indexers(self) -> List[dict]:
+        """
+        已开启且支持批量查询（多个关键词或查询）的站点
+        """
+        config_indexers = [str(sid) for sid in self.systemconfig.get(SystemConfigKey.IndexerSites) or []]
+        return [indexer for indexer in self.siteshelper.get_indexers()
+                if indexer.get("batch")
+                and indexer.get("parser") not in ["TNodeSpider", "TorrentLeech"]
+                and (not config_indexers or str(indexer.get("id")) in config_indexers)]
+
+    def batch_search(self, site: dict, keywords: List[str],
+                     budget: SiteBudget = None) -> Optional[List[TorrentInfo]]:
+        """
+        在一个站点上用多个关键词进行一次或查询，结果需要调用方按媒体信息匹配
+        只取第一页结果，多个关键词共用一页，单个订阅能查到的资源会少于单独搜索，
+        是以召回换取更少的站点访问；主关键词没有查到任何资源时，会再用原始标题在所有站点（包括批量查询的站点）单独搜索
+        :param site: 站点
+        :param keywords: 关键词列表
+        :param budget: 站点访问配额
+        :return: 资源列表，因流控未查询时返回None
+        """
+        if budget and not budget.acquire(site):
+            return None
+        logger.info(f'开始批量查询 {site.get("name")}，关键词：{"、".join(keywords)} ...')
+        return self.search_torrents(site=site, keyword=keywords) or []
+
+    def __search_site(self, site: dict, budget: TaskBudget = None, **kwargs) -> Optional[List[TorrentInfo]]:
+        """
+        搜索单个站点，有配额时先获取配额
+        """
+        if budget and not budget.acquire(site):
+            return []
+        return self.search_torrents(site=site, **kwargs)
@@ -1,5 +1,9 @@
+import copy
 import json
 import re
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from typing import Dict, List, Optional, Union, Tuple
 
@@ -9,13 +13,16 @@ from app.chain import ChainBase
 from app.chain.download import DownloadChain
 from app.chain.search import SearchChain
 from app.chain.torrents import TorrentsChain
+from app.core.config import settings
 from app.core.context import TorrentInfo, Context, MediaInfo
 from app.core.meta import MetaBase
 from app.core.metainfo import MetaInfo
 from app.db.models.subscribe import Subscribe
 from app.db.subscribe_oper import SubscribeOper
+from app.db.subscribestate_oper import SubscribeStateOper
 from app.db.systemconfig_oper import SystemConfigOper
 from app.helper.message import MessageHelper
+from app.helper.sitebudget import SiteBudget, TaskBudget
 from app.log import logger
 from app.schemas import NotExistMediaInfo, Notification
 from app.schemas.types import MediaType, SystemConfigKey, MessageChannel, NotificationType
@@ -25,12 +32,15 @@ class SubscribeChain(ChainBase):
     """
     订阅管理处理链
     """
+    # 批量查询时每次合并的订阅数
+    _batch_size = 10
 
     def __init__(self, db: Session = None):
         super().__init__(db)
         self.downloadchain = DownloadChain(self._db)
         self.searchchain = SearchChain(self._db)
         self.subscribeoper = SubscribeOper(self._db)
+        self.subscribestate = SubscribeStateOper(self._db)
         self.torrentschain = TorrentsChain()
         self.message = MessageHelper()
         self.systemconfig = SystemConfigOper(self._db)
@@ -173,7 +183,7 @@ class SubscribeChain(ChainBase):
 
     def search(self, sid: int = None, state: str = 'N', manual: bool = False):
         """
-        订阅搜索
+        订阅搜索，多个订阅并发搜索，按站点流控规则控制访问频率，下载在当前线程中依次处理
         :param sid: 订阅ID，有值时只处理该订阅
         :param state: 订阅状态 N:未搜索 R:已搜索
         :param manual: 是否手动搜索
@@ -183,142 +193,54 @@ class SubscribeChain(ChainBase):
             subscribes = [self.subscribeoper.get(sid)]
         else:
             subscribes = self.subscribeoper.list(state)
-        # 遍历订阅
+        # 全量搜索时，上次因站点流控未完成的从中断处继续
+        resumable = not sid and state == 'R'
+        finished = self.__load_search_progress() if resumable else set()
+        # 准备搜索任务
+        tasks = []
         for subscribe in subscribes:
-            logger.info(f'开始搜索订阅，标题：{subscribe.name} ...')
-            # 如果状态为N则更新为R
-            if subscribe.state == 'N':
-                self.subscribeoper.update(subscribe.id, {'state': 'R'})
-            # 生成元数据
-            meta = MetaInfo(subscribe.name)
-            meta.year = subscribe.year
-            meta.begin_season = subscribe.season or None
-            meta.type = MediaType(subscribe.type)
-            # 识别媒体信息
-            mediainfo: MediaInfo = self.recognize_media(meta=meta, mtype=meta.type, tmdbid=subscribe.tmdbid)
-            if not mediainfo:
-                logger.warn(f'未识别到媒体信息，标题：{subscribe.name}，tmdbid：{subscribe.tmdbid}')
+            if subscribe.id in finished:
+                logger.info(f'订阅 {subscribe.name} 上次已搜索过，跳过')
                 continue
-
-            # 非洗版状态
-            if not subscribe.best_version:
-                # 查询缺失的媒体信息
-                exist_flag, no_exists = self.downloadchain.get_no_exists_info(meta=meta, mediainfo=mediainfo)
-                if exist_flag:
-                    logger.info(f'{mediainfo.title_year} 媒体库中已存在，完成订阅')
-                    self.subscribeoper.delete(subscribe.id)
-                    # 发送通知
-                    self.post_message(Notification(mtype=NotificationType.Subscribe,
-                                                   title=f'{mediainfo.title_year} {meta.season} 已完成订阅',
-                                                   image=mediainfo.get_message_image()))
-                    continue
-                # 电视剧订阅
-                if meta.type == MediaType.TV:
-                    # 使用订阅的总集数和开始集数替换no_exists
-                    no_exists = self.__get_subscribe_no_exits(
-                        no_exists=no_exists,
-                        tmdb_id=mediainfo.tmdb_id,
-                        begin_season=meta.begin_season,
-                        total_episode=subscribe.total_episode,
-                        start_episode=subscribe.start_episode,
-
-                    )
-                    # 打印缺失集信息
-                    if no_exists and no_exists.get(subscribe.tmdbid):
-                        no_exists_info = no_exists.get(subscribe.tmdbid).get(subscribe.season)
-                        if no_exists_info:
-                            logger.info(f'订阅 {mediainfo.title_year} {meta.season} 缺失集：{no_exists_info.episodes}')
-            else:
-                # 洗版状态
-                if meta.type == MediaType.TV:
-                    no_exists = {
-                        subscribe.season: NotExistMediaInfo(
-                            season=subscribe.season,
-                            episodes=[],
-                            total_episode=subscribe.total_episode,
-                            start_episode=subscribe.start_episode or 1)
-                    }
-                else:
-                    no_exists = {}
-            # 站点范围
-            if subscribe.sites:
-                sites = json.loads(subscribe.sites)
-            else:
-                sites = None
-            # 过滤规则
-            if subscribe.best_version:
-                filter_rule = self.systemconfig.get(SystemConfigKey.FilterRules2)
-            else:
-                filter_rule = self.systemconfig.get(SystemConfigKey.FilterRules)
-            # 搜索，同时电视剧会过滤掉不需要的剧集
-            contexts = self.searchchain.process(mediainfo=mediainfo,
-                                                keyword=subscribe.keyword,
-                                                no_exists=no_exists,
-                                                sites=sites,
-                                                filter_rule=filter_rule)
-            if not contexts:
-                logger.warn(f'订阅 {subscribe.keyword or subscribe.name} 未搜索到资源')
-                if meta.type == MediaType.TV:
-                    # 未搜索到资源，但本地缺失可能有变化，更新订阅剩余集数
-                    self.__upate_lack_episodes(lefts=no_exists, subscribe=subscribe, mediainfo=mediainfo)
-                continue
-            # 过滤
-            matched_contexts = []
-            for context in contexts:
-                torrent_meta = context.meta_info
-                torrent_info = context.torrent_info
-                torrent_mediainfo = context.media_info
-                # 包含
-                if subscribe.include:
-                    if not re.search(r"%s" % subscribe.include,
-                                     f"{torrent_info.title} {torrent_info.description}", re.I):
+            task = self.__prepare_search(subscribe)
+            if task:
+                tasks.append(task)
+        # 优先搜索最近播出和缺失集数多的订阅
+        tasks.sort(key=self.__search_priority, reverse=True)
+        # 是否有订阅因站点流控未完成搜索
+        deferred = False
+        if tasks:
+            budget = SiteBudget()
+            # 支持批量查询的站点先合并查询
+            self.__batch_search(tasks, budget)
+            with ThreadPoolExecutor(max_workers=max(settings.SUBSCRIBE_SEARCH_THREADS, 1)) as executor:
+                futures = {executor.submit(self.__search_task, task, budget.for_task()): task
+                           for task in tasks}
+                for future in as_completed(futures):
+                    task = futures[future]
+                    subscribe = task.get("subscribe")
+                    try:
+                        contexts, task_budget = future.result()
+                        self.__handle_search_result(task, contexts)
+                    except Exception as err:
+                        logger.error(f'订阅 {subscribe.name} 搜索出错：{err} - {traceback.format_exc()}')
+                        deferred = True
                         continue
-                # 排除
-                if subscribe.exclude:
-                    if re.search(r"%s" % subscribe.exclude,
-                                 f"{torrent_info.title} {torrent_info.description}", re.I):
+                    if task_budget.deferred:
+                        logger.info(f'订阅 {subscribe.name} 有站点因流控未搜索，下次继续')
+                        deferred = True
                         continue
-                # 非洗版
-                if not subscribe.best_version:
-                    # 如果是电视剧过滤掉已经下载的集数
-                    if torrent_mediainfo.type == MediaType.TV:
-                        if self.__check_subscribe_note(subscribe, torrent_meta.episode_list):
-                            logger.info(f'{torrent_info.title} 对应剧集 {torrent_meta.episode_list} 已下载过')
-                            continue
-                else:
-                    # 洗版时，非整季不要
-                    if torrent_mediainfo.type == MediaType.TV:
-                        if torrent_meta.episode_list:
-                            logger.info(f'{subscribe.name} 正在洗版，{torrent_info.title} 不是整季')
-                            continue
-                matched_contexts.append(context)
-            if not matched_contexts:
-                logger.warn(f'订阅 {subscribe.name} 没有符合过滤条件的资源')
-                # 非洗版未搜索到资源，但本地缺失可能有变化，更新订阅剩余集数
-                if meta.type == MediaType.TV and not subscribe.best_version:
-                    self.__upate_lack_episodes(lefts=no_exists, subscribe=subscribe, mediainfo=mediainfo)
-                continue
-            # 自动下载
-            downloads, lefts = self.downloadchain.batch_download(contexts=matched_contexts,
-                                                                 no_exists=no_exists)
-            # 更新已经下载的集数
-            if downloads \
-                    and meta.type == MediaType.TV \
-                    and not subscribe.best_version:
-                self.__update_subscribe_note(subscribe=subscribe, downloads=downloads)
-
-            if downloads and not lefts:
-                # 判断是否应完成订阅
-                self.finish_subscribe_or_not(subscribe=subscribe, meta=meta,
-                                             mediainfo=mediainfo, downloads=downloads)
+                    finished.add(subscribe.id)
+                    if resumable:
+                        # 每完成一个订阅保存一次进度，中途退出时下次也能从中断处继续
+                        self.__save_search_progress(finished)
+        if resumable:
+            if deferred:
+                # 有订阅未完成，保存进度下次继续
+                self.__save_search_progress(finished)
             else:
-                # 未完成下载
-                logger.info(f'{mediainfo.title_year} 未下载未完整，继续订阅 ...')
-                if meta.type == MediaType.TV and not subscribe.best_version:
-                    # 更新订阅剩余集数和时间
-                    update_date = True if downloads else False
-                    self.__upate_lack_episodes(lefts=lefts, subscribe=subscribe,
-                                               mediainfo=mediainfo, update_date=update_date)
+                # 全部完成，清除进度
+                self.systemconfig.set(SystemConfigKey.SubscribeSearchProgress, {})
         # 手动触发时发送系统消息
         if manual:
             if sid:
@@ -326,6 +248,271 @@ class SubscribeChain(ChainBase):
             else:
                 self.message.put(f'所有订阅搜索完成！')
 
+    def __prepare_search(self, subscribe: Subscribe) -> Optional[dict]:
+        """
+        准备订阅的搜索参数，媒体库中已存在时完成订阅并返回None
+        """
+        logger.info(f'开始搜索订阅，标题：{subscribe.name} ...')
+        # 如果状态为N则更新为R
+        if subscribe.state == 'N':
+            self.subscribeoper.update(subscribe.id, {'state': 'R'})
+        # 生成元数据
+        meta = MetaInfo(subscribe.name)
+        meta.year = subscribe.year
+        meta.begin_season = subscribe.season or None
+        meta.type = MediaType(subscribe.type)
+        # 识别媒体信息
+        mediainfo: MediaInfo = self.__get_subscribe_media(subscribe=subscribe, meta=meta)
+        if not mediainfo:
+            logger.warn(f'未识别到媒体信息，标题：{subscribe.name}，tmdbid：{subscribe.tmdbid}')
+            return None
+
+        # 非洗版状态
+        if not subscribe.best_version:
+            # 查询缺失的媒体信息
+            exist_flag, no_exists = self.__get_no_exists_info(subscribe=subscribe, meta=meta,
+                                                              mediainfo=mediainfo)
+            if exist_flag:
+                logger.info(f'{mediainfo.title_year} 媒体库中已存在，完成订阅')
+                self.subscribeoper.delete(subscribe.id)
+                # 发送通知
+                self.post_message(Notification(mtype=NotificationType.Subscribe,
+                                               title=f'{mediainfo.title_year} {meta.season} 已完成订阅',
+                                               image=mediainfo.get_message_image()))
+                return None
+            # 电视剧订阅
+            if meta.type == MediaType.TV:
+                # 使用订阅的总集数和开始集数替换no_exists
+                no_exists = self.__get_subscribe_no_exits(
+                    no_exists=no_exists,
+                    tmdb_id=mediainfo.tmdb_id,
+                    begin_season=meta.begin_season,
+                    total_episode=subscribe.total_episode,
+                    start_episode=subscribe.start_episode,
+
+                )
+                # 打印缺失集信息
+                if no_exists and no_exists.get(subscribe.tmdbid):
+                    no_exists_info = no_exists.get(subscribe.tmdbid).get(subscribe.season)
+                    if no_exists_info:
+                        logger.info(f'订阅 {mediainfo.title_year} {meta.season} 缺失集：{no_exists_info.episodes}')
+        else:
+            # 洗版状态
+            if meta.type == MediaType.TV:
+                no_exists = {
+                    subscribe.season: NotExistMediaInfo(
+                        season=subscribe.season,
+                        episodes=[],
+                        total_episode=subscribe.total_episode,
+                        start_episode=subscribe.start_episode or 1)
+                }
+            else:
+                no_exists = {}
+        # 站点范围
+        if subscribe.sites:
+            sites = json.loads(subscribe.sites)
+        else:
+            sites = None
+        # 过滤规则
+        if subscribe.best_version:
+            filter_rule = self.systemconfig.get(SystemConfigKey.FilterRules2)
+        else:
+            filter_rule = self.systemconfig.get(SystemConfigKey.FilterRules)
+        return {
+            "subscribe": subscribe,
+            "keyword": subscribe.keyword,
+            "meta": meta,
+            "mediainfo": mediainfo,
+            "no_exists": no_exists,
+            "sites": sites,
+            "filter_rule": filter_rule
+        }
+
+    @staticmethod
+    def __search_priority(task: dict) -> Tuple[str, int]:
+        """
+        订阅搜索优先级：最近播出时间、缺失集数
+        """
+        mediainfo: MediaInfo = task.get("mediainfo")
+        subscribe: Subscribe = task.get("subscribe")
+        air_date = mediainfo.last_air_date or mediainfo.release_date or mediainfo.first_air_date or ""
+        return air_date, subscribe.lack_episode or 0
+
+    @staticmethod
+    def __search_task(task: dict, budget: TaskBudget) -> Tuple[List[Context], TaskBudget]:
+        """
+        在线程中搜索一个订阅，使用独立的数据库会话，不访问订阅对象
+        搜索会精简传入的媒体信息，使用副本，订阅任务中的媒体信息在处理结果时仍需完整
+        """
+        contexts = SearchChain().process(mediainfo=copy.copy(task.get("mediainfo")),
+                                         keyword=task.get("keyword"),
+                                         no_exists=task.get("no_exists"),
+                                         sites=task.get("sites"),
+                                         filter_rule=task.get("filter_rule"),
+                                         budget=budget,
+                                         prefetched=task.get("prefetched"),
+                                         progress=False)
+        return contexts, budget
+
+    def __batch_search(self, tasks: List[dict], budget: SiteBudget):
+        """
+        支持批量查询的站点，将多个订阅的关键词合并为或查询，结果记录到订阅任务中，搜索时按订阅在本地匹配
+        """
+        if len(tasks) < 2:
+            return
+        indexers = self.searchchain.batch_indexers()
+        if not indexers:
+            return
+        # 按站点分组
+        batches = []
+        for indexer in indexers:
+            site_tasks = [task for task in tasks
+                          if not task.get("sites") or indexer.get("id") in task.get("sites")]
+            if len(site_tasks) < 2:
+                continue
+            for i in range(0, len(site_tasks), self._batch_size):
+                batches.append((indexer, site_tasks[i:i + self._batch_size]))
+        if not batches:
+            return
+        logger.info(f'开始批量查询，共 {len(batches)} 次 ...')
+        with ThreadPoolExecutor(max_workers=max(settings.SUBSCRIBE_SEARCH_THREADS, 1)) as executor:
+            futures = {}
+            for indexer, batch in batches:
+                keywords = list(dict.fromkeys([task.get("keyword") or task.get("mediainfo").title
+                                               for task in batch]))
+                future = executor.submit(SearchChain().batch_search, site=indexer,
+                                         keywords=keywords, budget=budget)
+                futures[future] = (indexer, batch)
+            for future in as_completed(futures):
+                indexer, batch = futures[future]
+                try:
+                    torrents = future.result()
+                except Exception as err:
+                    logger.error(f'{indexer.get("name")} 批量查询出错：{err}')
+                    continue
+                if torrents is None:
+                    continue
+                for task in batch:
+                    task.setdefault("prefetched", {})[indexer.get("id")] = torrents
+
+    def __handle_search_result(self, task: dict, contexts: List[Context]):
+        """
+        处理订阅的搜索结果，过滤后自动下载
+        """
+        subscribe: Subscribe = task.get("subscribe")
+        meta: MetaBase = task.get("meta")
+        mediainfo: MediaInfo = task.get("mediainfo")
+        no_exists = task.get("no_exists")
+        if not contexts:
+            logger.warn(f'订阅 {subscribe.keyword or subscribe.name} 未搜索到资源')
+            if meta.type == MediaType.TV:
+                # 未搜索到资源，但本地缺失可能有变化，更新订阅剩余集数
+                self.__upate_lack_episodes(lefts=no_exists, subscribe=subscribe, mediainfo=mediainfo)
+            return
+        # 过滤
+        matched_contexts = []
+        for context in contexts:
+            torrent_meta = context.meta_info
+            torrent_info = context.torrent_info
+            torrent_mediainfo = context.media_info
+            # 包含
+            if subscribe.include:
+                if not re.search(r"%s" % subscribe.include,
+                                 f"{torrent_info.title} {torrent_info.description}", re.I):
+                    continue
+            # 排除
+            if subscribe.exclude:
+                if re.search(r"%s" % subscribe.exclude,
+                             f"{torrent_info.title} {torrent_info.description}", re.I):
+                    continue
+            # 非洗版
+            if not subscribe.best_version:
+                # 如果是电视剧过滤掉已经下载的集数
+                if torrent_mediainfo.type == MediaType.TV:
+                    if self.__check_subscribe_note(subscribe, torrent_meta.episode_list):
+                        logger.info(f'{torrent_info.title} 对应剧集 {torrent_meta.episode_list} 已下载过')
+                        continue
+            else:
+                # 洗版时，非整季不要
+                if torrent_mediainfo.type == MediaType.TV:
+                    if torrent_meta.episode_list:
+                        logger.info(f'{subscribe.name} 正在洗版，{torrent_info.title} 不是整季')
+                        continue
+            matched_contexts.append(context)
+        if not matched_contexts:
+            logger.warn(f'订阅 {subscribe.name} 没有符合过滤条件的资源')
+            # 非洗版未搜索到资源，但本地缺失可能有变化，更新订阅剩余集数
+            if meta.type == MediaType.TV and not subscribe.best_version:
+                self.__upate_lack_episodes(lefts=no_exists, subscribe=subscribe, mediainfo=mediainfo)
+            return
+        # 自动下载
+        downloads, lefts = self.downloadchain.batch_download(contexts=matched_contexts,
+                                                             no_exists=no_exists)
+        # 更新已经下载的集数
+        if downloads \
+                and meta.type == MediaType.TV \
+                and not subscribe.best_version:
+            self.__update_subscribe_note(subscribe=subscribe, downloads=downloads)
+
+        if downloads and not lefts:
+            # 判断是否应完成订阅
+            self.finish_subscribe_or_not(subscribe=subscribe, meta=meta,
+                                         mediainfo=mediainfo, downloads=downloads)
+        else:
+            # 未完成下载
+            logger.info(f'{mediainfo.title_year} 未下载未完整，继续订阅 ...')
+            if meta.type == MediaType.TV and not subscribe.best_version:
+                # 更新订阅剩余集数和时间
+                update_date = True if downloads else False
+                self.__upate_lack_episodes(lefts=lefts, subscribe=subscribe,
+                                           mediainfo=mediainfo, update_date=update_date)
+
+    def __load_search_progress(self) -> set:
+        """
+        读取上次未完成的订阅搜索进度，超过2天的不再继续
+        """
+        progress = self.systemconfig.get(SystemConfigKey.SubscribeSearchProgress) or {}
+        if not progress.get("finished"):
+            return set()
+        if time.time() - (progress.get("time") or 0) > 2 * 24 * 3600:
+            return set()
+        logger.info(f'继续上次未完成的订阅搜索，已完成 {len(progress.get("finished"))} 个订阅')
+        return set(progress.get("finished"))
+
+    def __save_search_progress(self, finished: set):
+        """
+        保存订阅搜索进度
+        """
+        progress = self.systemconfig.get(SystemConfigKey.SubscribeSearchProgress) or {}
+        self.systemconfig.set(SystemConfigKey.SubscribeSearchProgress, {
+            "time": progress.get("time") or time.time(),
+            "finished": list(finished)
+        })
+
+    def __get_subscribe_media(self, subscribe: Subscribe, meta: MetaBase) -> Optional[MediaInfo]:
+        """
+        获取订阅的媒体信息，优先使用快照
+        """
+        mediainfo = self.subscribestate.get_mediainfo(subscribe)
+        if mediainfo:
+            return mediainfo
+        mediainfo = self.recognize_media(meta=meta, mtype=meta.type, tmdbid=subscribe.tmdbid)
+        if mediainfo:
+            self.subscribestate.save_mediainfo(subscribe, mediainfo)
+        return mediainfo
+
+    def __get_no_exists_info(self, subscribe: Subscribe, meta: MetaBase, mediainfo: MediaInfo
+                             ) -> Tuple[bool, Dict[int, Dict[int, NotExistMediaInfo]]]:
+        """
+        查询订阅在媒体库中的缺失情况，优先使用快照
+        """
+        snapshot = self.subscribestate.get_no_exists(subscribe)
+        if snapshot:
+            return snapshot
+        exist_flag, no_exists = self.downloadchain.get_no_exists_info(meta=meta, mediainfo=mediainfo)
+        self.subscribestate.save_no_exists(subscribe, exist_flag=exist_flag, no_exists=no_exists)
+        return exist_flag, no_exists
+
     def finish_subscribe_or_not(self, subscribe: Subscribe, meta: MetaInfo,
                                 mediainfo: MediaInfo, downloads: List[Context]):
         """
@@ -379,6 +566,13 @@ class SubscribeChain(ChainBase):
             return
         # 所有订阅
         subscribes = self.subscribeoper.list('R')
+        # 按TMDBID、类型和季索引缓存种子
+        torrent_index = self.__build_torrent_index(torrents)
+        # 过滤规则
+        filter_rules = self.systemconfig.get(SystemConfigKey.FilterRules)
+        filter_rules2 = self.systemconfig.get(SystemConfigKey.FilterRules2)
+        # 过滤结果缓存：规则 -> {种子: (是否通过, 优先级)}
+        filter_cache: Dict[str, Dict[int, Tuple[bool, Optional[int]]]] = {}
         # 遍历订阅
         for subscribe in subscribes:
             logger.info(f'开始匹配订阅，标题：{subscribe.name} ...')
@@ -388,14 +582,15 @@ class SubscribeChain(ChainBase):
             meta.begin_season = subscribe.season or None
             meta.type = MediaType(subscribe.type)
             # 识别媒体信息
-            mediainfo: MediaInfo = self.recognize_media(meta=meta, mtype=meta.type, tmdbid=subscribe.tmdbid)
+            mediainfo: MediaInfo = self.__get_subscribe_media(subscribe=subscribe, meta=meta)
             if not mediainfo:
                 logger.warn(f'未识别到媒体信息，标题：{subscribe.name}，tmdbid：{subscribe.tmdbid}')
                 continue
             # 非洗版
             if not subscribe.best_version:
                 # 查询缺失的媒体信息
-                exist_flag, no_exists = self.downloadchain.get_no_exists_info(meta=meta, mediainfo=mediainfo)
+                exist_flag, no_exists = self.__get_no_exists_info(subscribe=subscribe, meta=meta,
+                                                                  mediainfo=mediainfo)
                 if exist_flag:
                     logger.info(f'{mediainfo.title_year} 媒体库中已存在，完成订阅')
                     self.subscribeoper.delete(subscribe.id)
@@ -432,87 +627,66 @@ class SubscribeChain(ChainBase):
                     }
                 else:
                     no_exists = {}
-            # 遍历缓存种子
-            _match_context = []
-            for domain, contexts in torrents.items():
-                for context in contexts:
-                    # 检查是否匹配
-                    torrent_meta = context.meta_info
-                    torrent_mediainfo = context.media_info
-                    torrent_info = context.torrent_info
-                    # 比对TMDBID和类型
-                    if torrent_mediainfo.tmdb_id != mediainfo.tmdb_id \
-                            or torrent_mediainfo.type != mediainfo.type:
-                        continue
-                    # 过滤规则
-                    if subscribe.best_version:
-                        filter_rule = self.systemconfig.get(SystemConfigKey.FilterRules2)
-                    else:
-                        filter_rule = self.systemconfig.get(SystemConfigKey.FilterRules)
-                    result: List[TorrentInfo] = self.filter_torrents(
-                        rule_string=filter_rule,
-                        torrent_list=[torrent_info])
-                    if result is not None and not result:
-                        # 不符合过滤规则
-                        continue
-                    # 不在订阅站点范围的不处理
-                    if subscribe.sites:
-                        sub_sites = json.loads(subscribe.sites)
-                        if sub_sites and torrent_info.site not in sub_sites:
-                            continue
-                    # 如果是电视剧
-                    if torrent_mediainfo.type == MediaType.TV:
-                        # 有多季的不要
-                        if len(torrent_meta.season_list) > 1:
-                            logger.info(f'{torrent_info.title} 有多季，不处理')
-                            continue
-                        # 比对季
-                        if torrent_meta.begin_season:
-                            if meta.begin_season != torrent_meta.begin_season:
-                                logger.info(f'{torrent_info.title} 季不匹配')
-                                continue
-                        elif meta.begin_season != 1:
-                            logger.info(f'{torrent_info.title} 季不匹配')
-                            continue
-                        # 非洗版
-                        if not subscribe.best_version:
-                            # 不是缺失的剧集不要
-                            if no_exists and no_exists.get(subscribe.tmdbid):
-                                # 缺失集
-                                no_exists_info = no_exists.get(subscribe.tmdbid).get(subscribe.season)
-                                if no_exists_info:
-                                    # 是否有交集
-                                    if no_exists_info.episodes and \
-                                            torrent_meta.episode_list and \
-                                            not set(no_exists_info.episodes).intersection(
-                                                set(torrent_meta.episode_list)
-                                            ):
-                                        logger.info(
-                                            f'{torrent_info.title} 对应剧集 {torrent_meta.episode_list} 未包含缺失的剧集')
-                                        continue
-                            # 过滤掉已经下载的集数
-                            if self.__check_subscribe_note(subscribe, torrent_meta.episode_list):
-                                logger.info(f'{torrent_info.title} 对应剧集 {torrent_meta.episode_list} 已下载过')
-                                continue
-                        else:
-                            # 洗版时，非整季不要
-                            if meta.type == MediaType.TV:
-                                if torrent_meta.episode_list:
-                                    logger.info(f'{subscribe.name} 正在洗版，{torrent_info.title} 不是整季')
-                                    continue
-                    # 包含
-                    if subscribe.include:
-                        if not re.search(r"%s" % subscribe.include,
-                                         f"{torrent_info.title} {torrent_info.description}", re.I):
+            # 订阅站点范围
+            sub_sites = set(json.loads(subscribe.sites)) if subscribe.sites else set()
+            # 已下载的集
+            sub_note = set(json.loads(subscribe.note)) if subscribe.note else set()
+            # 包含、排除规则
+            try:
+                include = re.compile(r"%s" % subscribe.include, re.I) if subscribe.include else None
+                exclude = re.compile(r"%s" % subscribe.exclude, re.I) if subscribe.exclude else None
+            except re.error as err:
+                logger.error(f'订阅 {subscribe.name} 包含或排除规则有误：{err}')
+                continue
+            # 缺失集
+            no_exists_episodes = set()
+            if not subscribe.best_version and no_exists and no_exists.get(subscribe.tmdbid):
+                no_exists_info = no_exists.get(subscribe.tmdbid).get(subscribe.season)
+                if no_exists_info and no_exists_info.episodes:
+                    no_exists_episodes = set(no_exists_info.episodes)
+            # 只遍历TMDBID、类型和季相同的缓存种子
+            season = meta.begin_season if mediainfo.type == MediaType.TV else None
+            candidates = []
+            for context in torrent_index.get((mediainfo.tmdb_id, mediainfo.type, season)) or []:
+                torrent_meta = context.meta_info
+                torrent_info = context.torrent_info
+                # 不在订阅站点范围的不处理
+                if sub_sites and torrent_info.site not in sub_sites:
+                    continue
+                # 如果是电视剧
+                if mediainfo.type == MediaType.TV:
+                    # 非洗版
+                    if not subscribe.best_version:
+                        # 不是缺失的剧集不要
+                        if no_exists_episodes and torrent_meta.episode_list \
+                                and not no_exists_episodes.intersection(torrent_meta.episode_list):
+                            logger.info(
+                                f'{torrent_info.title} 对应剧集 {torrent_meta.episode_list} 未包含缺失的剧集')
                             continue
-                    # 排除
-                    if subscribe.exclude:
-                        if re.search(r"%s" % subscribe.exclude,
-                                     f"{torrent_info.title} {torrent_info.description}", re.I):
+                        # 过滤掉已经下载的集数
+                        if sub_note and torrent_meta.episode_list \
+                                and sub_note.issuperset(torrent_meta.episode_list):
+                            logger.info(f'{torrent_info.title} 对应剧集 {torrent_meta.episode_list} 已下载过')
                             continue
-                    # 匹配成功
-                    logger.info(f'{mediainfo.title_year} 匹配成功：{torrent_info.title}')
-                    _match_context.append(context)
+                    # 洗版时，非整季不要
+                    elif torrent_meta.episode_list:
+                        logger.info(f'{subscribe.name} 正在洗版，{torrent_info.title} 不是整季')
+                        continue
+                # 包含
+                if include and not include.search(f"{torrent_info.title} {torrent_info.description}"):
+                    continue
+                # 排除
+                if exclude and exclude.search(f"{torrent_info.title} {torrent_info.description}"):
+                    continue
+                candidates.append(context)
+            # 过滤规则，同一规则下每个种子只过滤一次
+            filter_rule = filter_rules2 if subscribe.best_version else filter_rules
+            _match_context = self.__filter_contexts(filter_rule=filter_rule,
+                                                    contexts=candidates,
+                                                    cache=filter_cache.setdefault(filter_rule, {}))
+            for context in _match_context:
+                # 匹配成功
+                logger.info(f'{mediainfo.title_year} 匹配成功：{context.torrent_info.title}')
             # 开始下载
             logger.info(f'{mediainfo.title_year} 匹配完成，共匹配到{len(_match_context)}个资源')
             if _match_context:
@@ -537,6 +711,57 @@ class SubscribeChain(ChainBase):
                     # 未搜索到资源，但本地缺失可能有变化，更新订阅剩余集数
                     self.__upate_lack_episodes(lefts=no_exists, subscribe=subscribe, mediainfo=mediainfo)
 
+    @staticmethod
+    def __build_torrent_index(torrents: Dict[str, List[Context]]) -> Dict[tuple, List[Context]]:
+        """
+        按(TMDBID, 类型, 季)索引缓存种子，电视剧未识别到季的按第一季处理，多季的种子不参与匹配
+        """
+        index: Dict[tuple, List[Context]] = {}
+        for contexts in torrents.values():
+            for context in contexts:
+                torrent_mediainfo = context.media_info
+                if not torrent_mediainfo or not torrent_mediainfo.tmdb_id:
+                    continue
+                if torrent_mediainfo.type == MediaType.TV:
+                    torrent_meta = context.meta_info
+                    if len(torrent_meta.season_list) > 1:
+                        continue
+                    season = torrent_meta.begin_season or 1
+                else:
+                    season = None
+                index.setdefault((torrent_mediainfo.tmdb_id, torrent_mediainfo.type, season), []).append(context)
+        return index
+
+    def __filter_contexts(self, filter_rule: str, contexts: List[Context],
+                          cache: Dict[int, Tuple[bool, Optional[int]]]) -> List[Context]:
+        """
+        按过滤规则批量过滤资源，已过滤过的种子直接使用缓存结果
+        :param filter_rule: 过滤规则
+        :param contexts: 待过滤资源
+        :param cache: 该规则的过滤结果缓存 {id(种子): (是否通过, 优先级)}
+        """
+        pending = [context.torrent_info for context in contexts
+                   if id(context.torrent_info) not in cache]
+        if pending:
+            result: List[TorrentInfo] = self.filter_torrents(rule_string=filter_rule,
+                                                             torrent_list=pending)
+            if result is None:
+                # 没有过滤模块，全部通过
+                passed = {id(torrent) for torrent in pending}
+            else:
+                passed = {id(torrent) for torrent in result}
+            for torrent in pending:
+                cache[id(torrent)] = (id(torrent) in passed, torrent.pri_order)
+        matched = []
+        for context in contexts:
+            passed, pri_order = cache.get(id(context.torrent_info)) or (False, None)
+            if not passed:
+                continue
+            # 优先级由过滤时写入种子，同一种子在其它规则下过滤过时需要还原为本规则的优先级
+            context.torrent_info.pri_order = pri_order
+            matched.append(context)
+        return matched
+
     def __update_subscribe_note(self, subscribe: Subscribe, downloads: List[Context]):
         """
         更新已下载集数到note字段
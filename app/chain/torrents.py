@@ -4,7 +4,7 @@ from requests import Session
 
 from app.chain import ChainBase
 from app.core.config import settings
-from app.core.context import TorrentInfo, Context, MediaInfo
+from app.core.context import TorrentInfo, Context, MediaInfo, MediaInfoRegistry
 from app.core.metainfo import MetaInfo
 from app.db.systemconfig_oper import SystemConfigOper
 from app.helper.sites import SitesHelper
@@ -47,8 +47,10 @@ class TorrentsChain(ChainBase):
         """
         刷新站点最新资源
         """
-        # 读取缓存
+        # 读取缓存，加载时已关联到共享的媒体信息
         torrents_cache = self.get_torrents()
+        # 同一媒体的种子共用一份媒体信息
+        registry = MediaInfoRegistry()
 
         # 所有站点索引
         indexers = self.siteshelper.get_indexers()
@@ -87,8 +89,15 @@ class TorrentsChain(ChainBase):
                         logger.warn(f'未识别到媒体信息，标题：{torrent.title}')
                         # 存储空的媒体信息
                         mediainfo = MediaInfo()
-                    # 清理多余数据
-                    mediainfo.clear()
+                    else:
+                        shared = registry.get(mediainfo.tmdb_id, mediainfo.type)
+                        # 共享的媒体信息被多个上下文引用，只读，已清理过
+                        if shared:
+                            mediainfo = shared
+                        else:
+                            # 清理多余数据
+                            mediainfo.clear()
+                            mediainfo = registry.share(mediainfo)
                     # 上下文
                     context = Context(meta_info=meta, media_info=mediainfo, torrent_info=torrent)
                     # 添加到缓存
@@ -15,7 +15,12 @@ from app.core.metainfo import MetaInfo
 from app.db.downloadhistory_oper import DownloadHistoryOper
 from app.db.models.downloadhistory import DownloadHistory
 from app.db.models.transferhistory import TransferHistory
+from app.db.models.transferjournal import TransferJournal
+from app.db.subscribestate_oper import SubscribeStateOper
 from app.db.transferhistory_oper import TransferHistoryOper
+from app.db.transferjournal_oper import TransferJournalOper
+from app.helper.hardlink import HardLinkHelper
+from app.helper.library import LibraryHelper
 from app.helper.progress import ProgressHelper
 from app.log import logger
 from app.schemas import TransferInfo, TransferTorrent, Notification, EpisodeFormat
@@ -35,130 +40,252 @@ class TransferChain(ChainBase):
         super().__init__(db)
         self.downloadhis = DownloadHistoryOper(self._db)
         self.transferhis = TransferHistoryOper(self._db)
+        self.journal = TransferJournalOper(self._db)
+        self.subscribestate = SubscribeStateOper(self._db)
         self.progress = ProgressHelper()
         self.mediachain = MediaChain(self._db)
 
-    def process(self) -> bool:
+    def process(self, hashs: Union[str, list] = None, paths: List[Path] = None) -> bool:
         """
         获取下载器中的种子列表，并执行转移
+        :param hashs: 仅处理指定Hash的种子（下载完成通知）
+        :param paths: 仅处理包含这些文件的种子（下载目录变化），hashs和paths都为空时处理所有已完成的种子
         """
 
         # 全局锁，避免重复处理
         with lock:
             logger.info("开始执行下载器文件转移 ...")
-            # 从下载器获取种子列表
-            torrents: Optional[List[TransferTorrent]] = self.list_torrents(status=TorrentStatus.TRANSFER)
+            # 从下载器获取已完成且未整理的种子列表，通知可能早于下载器完成状态更新，未完成的不处理
+            if isinstance(hashs, str):
+                hashs = [hashs]
+            hashs = {download_hash.lower() for download_hash in hashs or []}
+            if paths:
+                # 需要按路径匹配时获取一次完整列表，同时匹配指定的Hash
+                torrents: Optional[List[TransferTorrent]] = [
+                    torrent for torrent in self.list_torrents(status=TorrentStatus.TRANSFER) or []
+                    if (torrent.hash and torrent.hash.lower() in hashs)
+                    or (torrent.path and any(path == torrent.path or path.is_relative_to(torrent.path)
+                                             for path in paths))
+                ]
+            elif hashs:
+                # 只有下载完成通知时按Hash查询
+                torrents = self.list_torrents(status=TorrentStatus.TRANSFER, hashs=list(hashs))
+            else:
+                torrents = self.list_torrents(status=TorrentStatus.TRANSFER)
             if not torrents:
                 logger.info("没有获取到已完成的下载任务")
                 return False
 
             logger.info(f"获取到 {len(torrents)} 个已完成的下载任务")
 
-            for torrent in torrents:
-                # 识别元数据
-                meta: MetaBase = MetaInfo(title=torrent.title)
-                if not meta.name:
-                    logger.error(f'未识别到元数据，标题：{torrent.title}')
-                    continue
-
-                # 查询下载记录识别情况
-                downloadhis: DownloadHistory = self.downloadhis.get_by_hash(torrent.hash)
-                if downloadhis:
-                    # 类型
-                    mtype = MediaType(downloadhis.type)
-                    # 补充剧集信息
-                    if mtype == MediaType.TV \
-                            and ((not meta.season_list and downloadhis.seasons)
-                                 or (not meta.episode_list and downloadhis.episodes)):
-                        meta = MetaInfo(f"{torrent.title} {downloadhis.seasons} {downloadhis.episodes}")
-                    # 按TMDBID识别
-                    mediainfo = self.recognize_media(mtype=mtype,
-                                                     tmdbid=downloadhis.tmdbid)
-                else:
-                    mediainfo = self.recognize_media(meta=meta)
-
-                if not mediainfo:
-                    logger.warn(f'未识别到媒体信息，标题：{torrent.title}')
-                    # 新增转移失败历史记录
-                    his = self.__insert_fail_history(
-                        src_path=torrent.path,
-                        download_hash=torrent.hash,
-                        meta=meta
-                    )
-                    self.post_message(Notification(
-                        mtype=NotificationType.Manual,
-                        title=f"{torrent.title} 未识别到媒体信息，无法入库！\n"
-                              f"回复：```\n/redo {his.id} [tmdbid]|[类型]\n``` 手动识别转移。"
-                    ))
-                    # 设置种子状态，避免一直报错
-                    self.transfer_completed(hashs=torrent.hash)
-                    continue
-
-                logger.info(f"{torrent.title} 识别为：{mediainfo.type.value} {mediainfo.title_year}")
-
-                # 更新媒体图片
-                self.obtain_images(mediainfo=mediainfo)
-
-                # 获取待转移路径清单
-                trans_paths = self.__get_trans_paths(torrent.path)
-                if not trans_paths:
-                    logger.warn(f"{torrent.title} 对应目录没有找到媒体文件")
-                    continue
-
-                # 转移所有文件
-                for trans_path in trans_paths:
-                    transferinfo: TransferInfo = self.transfer(mediainfo=mediainfo,
-                                                               path=trans_path,
-                                                               transfer_type=settings.TRANSFER_TYPE)
-                    if not transferinfo:
-                        logger.error("文件转移模块运行失败")
+            # 一次查询所有任务的下载记录
+            self.downloadhis.cache_hashes([torrent.hash for torrent in torrents])
+            try:
+                for torrent in torrents:
+                    # 转移日志已全部完成（中断于设置种子状态之前），无需重新识别转移
+                    if self.journal.is_done(torrent.hash):
+                        logger.info(f"{torrent.title} 已转移完成，跳过")
+                        self.transfer_completed(hashs=torrent.hash)
+                        self.journal.clear(torrent.hash)
+                        continue
+                    # 识别元数据
+                    meta: MetaBase = MetaInfo(title=torrent.title)
+                    if not meta.name:
+                        logger.error(f'未识别到元数据，标题：{torrent.title}')
                         continue
-                    if not transferinfo.target_path:
-                        # 转移失败
-                        logger.warn(f"{torrent.title} 入库失败：{transferinfo.message}")
+
+                    # 查询下载记录识别情况
+                    downloadhis: DownloadHistory = self.downloadhis.get_by_hash(torrent.hash)
+                    if downloadhis:
+                        # 类型
+                        mtype = MediaType(downloadhis.type)
+                        # 补充剧集信息
+                        if mtype == MediaType.TV \
+                                and ((not meta.season_list and downloadhis.seasons)
+                                     or (not meta.episode_list and downloadhis.episodes)):
+                            meta = MetaInfo(f"{torrent.title} {downloadhis.seasons} {downloadhis.episodes}")
+                        # 按TMDBID识别
+                        mediainfo = self.recognize_media(mtype=mtype,
+                                                         tmdbid=downloadhis.tmdbid)
+                    else:
+                        mediainfo = self.recognize_media(meta=meta)
+
+                    if not mediainfo:
+                        logger.warn(f'未识别到媒体信息，标题：{torrent.title}')
                         # 新增转移失败历史记录
-                        self.__insert_fail_history(
-                            src_path=trans_path,
+                        his = self.__insert_fail_history(
+                            src_path=torrent.path,
                             download_hash=torrent.hash,
-                            meta=meta,
-                            mediainfo=mediainfo,
-                            transferinfo=transferinfo
+                            meta=meta
                         )
-                        # 发送消息
                         self.post_message(Notification(
-                            title=f"{mediainfo.title_year} {meta.season_episode} 入库失败！",
-                            text=f"原因：{transferinfo.message or '未知'}",
-                            image=mediainfo.get_message_image()
+                            mtype=NotificationType.Manual,
+                            title=f"{torrent.title} 未识别到媒体信息，无法入库！\n"
+                                  f"回复：```\n/redo {his.id} [tmdbid]|[类型]\n``` 手动识别转移。"
                         ))
+                        # 设置种子状态，避免一直报错
+                        self.transfer_completed(hashs=torrent.hash)
                         continue
 
-                    # 新增转移成功历史记录
-                    self.__insert_sucess_history(
-                        src_path=trans_path,
-                        download_hash=torrent.hash,
-                        meta=meta,
-                        mediainfo=mediainfo,
-                        transferinfo=transferinfo
-                    )
-                    # 刮削元数据
-                    self.scrape_metadata(path=transferinfo.target_path, mediainfo=mediainfo)
-                    # 刷新媒体库
-                    self.refresh_mediaserver(mediainfo=mediainfo, file_path=transferinfo.target_path)
-                    # 发送通知
-                    self.send_transfer_message(meta=meta, mediainfo=mediainfo, transferinfo=transferinfo)
-                    # 广播事件
-                    self.eventmanager.send_event(EventType.TransferComplete, {
-                        'meta': meta,
-                        'mediainfo': mediainfo,
-                        'transferinfo': transferinfo
-                    })
+                    logger.info(f"{torrent.title} 识别为：{mediainfo.type.value} {mediainfo.title_year}")
 
-                # 转移完成
-                self.transfer_completed(hashs=torrent.hash, transinfo=transferinfo)
+                    # 更新媒体图片
+                    self.obtain_images(mediainfo=mediainfo)
+
+                    # 获取待转移路径清单
+                    trans_paths = self.__get_trans_paths(torrent.path)
+                    if not trans_paths:
+                        logger.warn(f"{torrent.title} 对应目录没有找到媒体文件")
+                        continue
+
+                    # 先登记转移日志，再执行转移
+                    journals = [self.journal.plan(download_hash=torrent.hash,
+                                                  torrent_title=torrent.title,
+                                                  src=trans_path,
+                                                  mode=settings.TRANSFER_TYPE,
+                                                  mtype=mediainfo.type.value,
+                                                  tmdbid=mediainfo.tmdb_id,
+                                                  meta_title=meta.org_string)
+                                for trans_path in trans_paths]
+
+                    # 转移所有文件
+                    transferinfo = None
+                    for journal in journals:
+                        if journal.state == 'done':
+                            continue
+                        transferinfo = self.__transfer_journal(journal=journal, meta=meta,
+                                                               mediainfo=mediainfo) or transferinfo
+
+                    # 所有路径均已转移完成才设置种子状态，否则保留日志下次继续
+                    if not self.journal.is_done(torrent.hash):
+                        logger.warn(f"{torrent.title} 部分文件未完成转移，下次继续")
+                        continue
+                    # 转移完成
+                    self.transfer_completed(hashs=torrent.hash, transinfo=transferinfo)
+                    self.journal.clear(torrent.hash)
+            finally:
+                self.downloadhis.clear_cache()
             # 结束
             logger.info("下载器文件转移执行完成")
             return True
 
+    def __transfer_journal(self, journal: TransferJournal,
+                           meta: MetaBase, mediainfo: MediaInfo) -> Optional[TransferInfo]:
+        """
+        执行一条转移日志对应的转移，并记录历史、发送通知
+        """
+        trans_path = Path(journal.src)
+        self.journal.start(journal, dest=self.media_target_dir(path=trans_path, mediainfo=mediainfo))
+        transferinfo: TransferInfo = self.transfer(mediainfo=mediainfo,
+                                                   path=trans_path,
+                                                   transfer_type=journal.mode or settings.TRANSFER_TYPE)
+        if not transferinfo:
+            # 模块运行失败，保留日志状态，下次继续
+            logger.error("文件转移模块运行失败")
+            return None
+        if not transferinfo.target_path:
+            # 转移失败
+            logger.warn(f"{journal.torrent_title} 入库失败：{transferinfo.message}")
+            # 新增转移失败历史记录
+            self.__insert_fail_history(
+                src_path=trans_path,
+                download_hash=journal.download_hash,
+                meta=meta,
+                mediainfo=mediainfo,
+                transferinfo=transferinfo
+            )
+            # 发送消息
+            self.post_message(Notification(
+                title=f"{mediainfo.title_year} {meta.season_episode} 入库失败！",
+                text=f"原因：{transferinfo.message or '未知'}",
+                image=mediainfo.get_message_image()
+            ))
+            self.journal.finish(journal)
+            return transferinfo
+
+        # 新增转移成功历史记录
+        self.__insert_sucess_history(
+            src_path=trans_path,
+            download_hash=journal.download_hash,
+            meta=meta,
+            mediainfo=mediainfo,
+            transferinfo=transferinfo
+        )
+        self.journal.finish(journal, dest=transferinfo.target_path)
+        # 刮削元数据
+        self.scrape_metadata(path=transferinfo.target_path, mediainfo=mediainfo)
+        # 刷新媒体库
+        self.refresh_mediaserver(mediainfo=mediainfo, file_path=transferinfo.target_path)
+        # 发送通知
+        self.send_transfer_message(meta=meta, mediainfo=mediainfo, transferinfo=transferinfo)
+        # 广播事件
+        self.eventmanager.send_event(EventType.TransferComplete, {
+            'meta': meta,
+            'mediainfo': mediainfo,
+            'transferinfo': transferinfo
+        })
+        return transferinfo
+
+    def resume(self):
+        """
+        恢复上次中断的转移，启动时执行，按日志中记录的TMDBID识别，不重新扫描已完成的种子
+        """
+        with lock:
+            journals = self.journal.list_unfinished()
+            if not journals:
+                return
+            logger.info(f"发现 {len(journals)} 条未完成的转移日志，开始恢复 ...")
+            # 回滚中断时写了一半的目标文件
+            self.__rollback_temp_files(journals)
+            self.__resume_journals(journals)
+            logger.info("转移日志恢复完成")
+
+    @staticmethod
+    def __rollback_temp_files(journals: List[TransferJournal]):
+        """
+        删除复制、跨设备移动中断时残留的临时文件，完整的目标文件是由临时文件重命名得到的
+        只清理中断时正在转移的日志记录的目的目录，不遍历整个媒体库
+        """
+        target_dirs = {journal.dest for journal in journals if journal.state == 'running' and journal.dest}
+        for target_dir in target_dirs:
+            for temp in SystemUtils.clear_temp_files(Path(target_dir)):
+                logger.info(f"已删除未转移完成的临时文件：{temp}")
+
+    def __resume_journals(self, journals: List[TransferJournal]):
+        """
+        按种子重新执行未完成的转移日志
+        """
+        # 按种子分组
+        torrent_journals = {}
+        for journal in journals:
+            torrent_journals.setdefault(journal.download_hash, []).append(journal)
+        for download_hash, items in torrent_journals.items():
+            first = items[0]
+            meta = MetaInfo(title=first.meta_title or first.torrent_title)
+            mediainfo = self.recognize_media(mtype=MediaType(first.type), tmdbid=first.tmdbid)
+            if not mediainfo:
+                logger.warn(f"{first.torrent_title} 恢复转移时未识别到媒体信息，下次重试")
+                continue
+            transferinfo = None
+            for journal in items:
+                if not Path(journal.src).exists():
+                    if journal.mode != "move":
+                        # 非移动模式下源文件不会被删除，应是被手动删除了，无法继续转移
+                        logger.warn(f"{journal.src} 源路径已不存在，无法恢复转移")
+                        self.journal.finish(journal)
+                        continue
+                    # 移动时目标文件完整写入后才会删除源文件，源文件不存在说明已移动完成
+                    logger.info(f"{journal.src} 已移动完成")
+                    self.journal.finish(journal)
+                    continue
+                logger.info(f"恢复转移：{journal.src} ...")
+                transferinfo = self.__transfer_journal(journal=journal, meta=meta,
+                                                       mediainfo=mediainfo) or transferinfo
+            if self.journal.is_done(download_hash):
+                # 转移完成
+                self.transfer_completed(hashs=download_hash, transinfo=transferinfo)
+                self.journal.clear(download_hash)
+
     @staticmethod
     def __get_trans_paths(directory: Path):
         """
@@ -524,6 +651,14 @@ class TransferChain(ChainBase):
             status=1,
             files=json.dumps(transferinfo.file_list)
         )
+        if settings.TRANSFER_TYPE == "link":
+            # 登记硬链接索引
+            HardLinkHelper().add_paths(transferinfo.file_list + transferinfo.file_list_new)
+        # 媒体库有变化，订阅需要重新查询缺失情况
+        self.subscribestate.expire_exists(tmdbid=mediainfo.tmdb_id)
+        # 登记到媒体库索引
+        LibraryHelper().add_transferred(mtype=mediainfo.type, tmdbid=mediainfo.tmdb_id,
+                                        season=meta.begin_season or 1, episodes=meta.episode_list)
 
     def __insert_fail_history(self, src_path: Path, download_hash: str, meta: MetaBase,
                               transferinfo: TransferInfo = None, mediainfo: MediaInfo = None):
@@ -1,8 +1,14 @@
+import threading
 import time
-from typing import Any
+from typing import Any, Optional
 
 from app.chain import ChainBase
-from app.schemas import Notification
+from app.chain.mediaserver import MediaServerChain, lock as mediaserver_lock
+from app.core.config import settings
+from app.db.mediaserver_oper import MediaServerOper
+from app.db.subscribestate_oper import SubscribeStateOper
+from app.helper.library import LibraryHelper
+from app.schemas import Notification, WebhookEventInfo
 from app.schemas.types import EventType, MediaImageType, MediaType, NotificationType
 from app.utils.http import WebUtils
 
@@ -12,6 +18,20 @@ class WebhookChain(ChainBase):
     Webhook处理链
     """
 
+    def __get_tmdbid(self, event_info: WebhookEventInfo) -> Optional[int]:
+        """
+        获取通知对应电影或剧的TMDBID，剧集通知中的TMDBID是单集的ID，从同步的媒体服务器数据中按剧的ID查询
+        """
+        if event_info.item_type in ["MOV", "Movie", "movie"]:
+            if event_info.tmdb_id and str(event_info.tmdb_id).isdigit():
+                return int(event_info.tmdb_id)
+            return None
+        if event_info.item_id:
+            item = MediaServerOper(self._db).get_by_itemid(event_info.item_id)
+            if item and item.item_type == MediaType.TV.value:
+                return item.tmdbid
+        return None
+
     def message(self, body: Any, form: Any, args: Any) -> None:
         """
         处理Webhook报文并发送消息
@@ -22,6 +42,16 @@ class WebhookChain(ChainBase):
             return
         # 广播事件
         self.eventmanager.send_event(EventType.WebhookMessage, event_info)
+        # 入库、删除时订阅需要重新查询缺失情况
+        if event_info.event and ("library" in event_info.event or "delete" in event_info.event.lower()):
+            # 无法确定剧集的TMDBID时全部失效
+            SubscribeStateOper(self._db).expire_exists(tmdbid=self.__get_tmdbid(event_info))
+            if "delete" in event_info.event.lower():
+                # 删除的媒体不能再按已整理入库处理，无法确定TMDBID时由随后的同步重置
+                LibraryHelper().remove_transferred(tmdbid=event_info.tmdb_id)
+            # 增量同步媒体服务器数据，更新媒体库索引
+            if settings.MEDIASERVER_SYNC_INTERVAL and not mediaserver_lock.locked():
+                threading.Thread(target=MediaServerChain().sync).start()
         # 拼装消息内容
         _webhook_actions = {
             "library.new": "新入库",
@@ -65,6 +65,12 @@ class Settings(BaseSettings):
     INDEXER: str = "builtin"
     # 订阅搜索开关
     SUBSCRIBE_SEARCH: bool = False
+    # 订阅搜索并发数
+    SUBSCRIBE_SEARCH_THREADS: int = 3
+    # 订阅媒体信息快照有效期（小时），0为每次刷新都重新识别
+    SUBSCRIBE_MEDIA_TTL: int = 24
+    # 订阅媒体库缺失情况快照有效期（小时），转移完成或收到媒体服务器入库通知时提前失效，0为每次刷新都重新查询
+    SUBSCRIBE_EXISTS_TTL: int = 6
     # 用户认证站点 hhclub/audiences/hddolby/zmpt/freefarm/hdfans/wintersakura/leaves/1ptba/icc2022/iyuu
     AUTH_SITE: str = ""
     # 交互搜索自动下载用户ID，使用,分割
@@ -103,6 +109,10 @@ class Settings(BaseSettings):
     DOWNLOADER: str = "qbittorrent"
     # 下载器监控开关
     DOWNLOADER_MONITOR: bool = True
+    # 下载器监控轮询间隔（分钟），已配置下载完成通知或目录监控时可调大，0为不轮询
+    DOWNLOADER_MONITOR_INTERVAL: int = 5
+    # 实时监控下载目录变化触发整理
+    DOWNLOADER_MONITOR_PATH: bool = False
     # Qbittorrent地址，IP:PORT
     QB_HOST: str = None
     # Qbittorrent用户名
@@ -149,6 +159,8 @@ class Settings(BaseSettings):
     PLEX_TOKEN: str = None
     # 转移方式 link/copy/move/softlink
     TRANSFER_TYPE: str = "copy"
+    # 复制和跨设备移动后校验文件摘要
+    TRANSFER_VERIFY: bool = False
     # CookieCloud服务器地址
     COOKIECLOUD_HOST: str = "https://movie-pilot.org/cookiecloud"
     # CookieCloud用户KEY
@@ -182,6 +194,22 @@ class Settings(BaseSettings):
                             "{{fileExt}}"
     # 大内存模式
     BIG_MEMORY_MODE: bool = False
+    # 数据库WAL模式，读写不互相阻塞
+    DB_WAL_ENABLE: bool = True
+    # 数据库同步模式 OFF/NORMAL/FULL/EXTRA
+    DB_SYNCHRONOUS: str = "NORMAL"
+    # 数据库被锁定时的等待时间（秒）
+    DB_BUSY_TIMEOUT: int = 30
+    # 数据库内存映射大小（MB），0为不使用
+    DB_MMAP_SIZE: int = 256
+    # 数据库页缓存大小（MB）
+    DB_CACHE_SIZE: int = 32
+    # 数据库连接池大小
+    DB_POOL_SIZE: int = 30
+    # 数据库连接池最大溢出数量
+    DB_MAX_OVERFLOW: int = 20
+    # 数据库优化间隔（小时），0为不优化
+    DB_OPTIMIZE_INTERVAL: int = 24
 
     @property
     def INNER_CONFIG_PATH(self):
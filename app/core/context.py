@@ -1,14 +1,50 @@
 import re
-from dataclasses import dataclass, field, asdict
+import sys
+import threading
+import weakref
+from dataclasses import dataclass, field, asdict, fields, MISSING
 from typing import List, Dict, Any
 
 from app.core.config import settings
 from app.core.meta import MetaBase
 from app.core.metainfo import MetaInfo
 from app.schemas.types import MediaType
+from app.utils.singleton import Singleton
 
 
-@dataclass
+def _lean_state(obj: Any) -> dict:
+    """
+    序列化时只保留与默认值不同的字段，减小缓存体积
+    """
+    state = {}
+    for f in fields(obj):
+        value = getattr(obj, f.name)
+        if f.default is not MISSING:
+            if value == f.default:
+                continue
+        elif f.default_factory is not MISSING:
+            if not value:
+                continue
+        state[f.name] = value
+    return state
+
+
+def _restore_state(obj: Any, state: dict):
+    """
+    反序列化时先设置默认值，再恢复保存的字段，兼容按完整__dict__保存的旧数据
+    """
+    for f in fields(obj):
+        if f.default is not MISSING:
+            setattr(obj, f.name, f.default)
+        elif f.default_factory is not MISSING:
+            setattr(obj, f.name, f.default_factory())
+    names = {f.name for f in fields(obj)}
+    for key, value in (state or {}).items():
+        if key in names or hasattr(obj, "__dict__"):
+            setattr(obj, key, value)
+
+
+@dataclass(slots=True)
 class TorrentInfo:
     # 站点ID
     site: int = None
@@ -55,8 +91,27 @@ class TorrentInfo:
     # 种子优先级
     pri_order: int = 0
 
-    def __setattr__(self, name: str, value: Any):
-        self.__dict__[name] = value
+    def __post_init__(self):
+        # 同一站点的种子共用站点信息字符串
+        self.intern_site()
+
+    def intern_site(self):
+        """
+        驻留站点名称、Cookie、UA，大量种子共用同一份字符串
+        """
+        if isinstance(self.site_name, str):
+            self.site_name = sys.intern(self.site_name)
+        if isinstance(self.site_cookie, str):
+            self.site_cookie = sys.intern(self.site_cookie)
+        if isinstance(self.site_ua, str):
+            self.site_ua = sys.intern(self.site_ua)
+
+    def __getstate__(self):
+        return _lean_state(self)
+
+    def __setstate__(self, state: dict):
+        _restore_state(self, state)
+        self.intern_site()
 
     def __get_properties(self):
         """
@@ -75,9 +130,10 @@ class TorrentInfo:
         """
         properties = self.__get_properties()
         for key, value in data.items():
-            if key in properties:
+            if key in properties or key not in self.__slots__:
                 continue
             setattr(self, key, value)
+        self.intern_site()
 
     @staticmethod
     def get_free_string(upload_volume_factor: float, download_volume_factor: float) -> str:
@@ -213,6 +269,13 @@ class MediaInfo:
     # 下一集
     next_episode_to_air: dict = field(default_factory=dict)
 
+    # 精简时从TMDB原始数据中去除的字段
+    _tmdb_heavy_keys = ("credits", "alternative_titles", "translations", "seasons", "images", "videos",
+                        "keywords", "recommendations", "similar", "reviews", "release_dates",
+                        "content_ratings", "external_ids", "created_by", "networks",
+                        "production_companies", "production_countries", "spoken_languages",
+                        "next_episode_to_air", "last_episode_to_air", "episode_groups", "names")
+
     def __post_init__(self):
         # 设置媒体信息
         if self.tmdb_info:
@@ -223,6 +286,16 @@ class MediaInfo:
     def __setattr__(self, name: str, value: Any):
         self.__dict__[name] = value
 
+    def __getstate__(self):
+        # 只保存与默认值不同的字段，以及豆瓣信息等附加的属性
+        state = _lean_state(self)
+        names = self.__dataclass_fields__.keys()
+        state.update({key: value for key, value in self.__dict__.items() if key not in names})
+        return state
+
+    def __setstate__(self, state: dict):
+        _restore_state(self, state)
+
     def __get_properties(self):
         """
         获取属性列表
@@ -558,8 +631,10 @@ class MediaInfo:
 
     def clear(self):
         """
-        去除多余数据，减小体积
+        去除多余数据，减小体积，只能在登记为共享实例之前调用，对共享实例调用时抛出RuntimeError
         """
+        if MediaInfoRegistry().get(self.tmdb_id, self.type) is self:
+            raise RuntimeError(f"共享的媒体信息只读，不能清理：{self.title_year}")
         self.douban_info = {}
         self.seasons = {}
         self.genres = []
@@ -572,9 +647,50 @@ class MediaInfo:
         self.spoken_languages = []
         self.networks = []
         self.next_episode_to_air = {}
+        self.created_by = []
+        self.episode_run_time = []
+        self.languages = []
+        # TMDB原始数据中只保留简单字段，去掉演职员、别名、翻译、季等大块数据
+        if self.tmdb_info:
+            self.tmdb_info = {key: value for key, value in self.tmdb_info.items()
+                              if key not in self._tmdb_heavy_keys}
 
 
-@dataclass
+class MediaInfoRegistry(metaclass=Singleton):
+    """
+    共享媒体信息，同一媒体（TMDBID+类型）的上下文共用一个MediaInfo实例
+    弱引用保存，没有上下文引用时自动释放；共享的实例应视为只读
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._medias: weakref.WeakValueDictionary = weakref.WeakValueDictionary()
+
+    def share(self, mediainfo: MediaInfo) -> MediaInfo:
+        """
+        获取共享的媒体信息，已存在时返回已有实例，否则登记并返回传入的实例
+        """
+        if not mediainfo or not mediainfo.tmdb_id:
+            return mediainfo
+        key = (mediainfo.tmdb_id, mediainfo.type)
+        with self._lock:
+            shared = self._medias.get(key)
+            if shared is not None:
+                return shared
+            self._medias[key] = mediainfo
+            return mediainfo
+
+    def get(self, tmdbid: int, mtype: MediaType) -> MediaInfo:
+        """
+        查询共享的媒体信息
+        """
+        return self._medias.get((tmdbid, mtype))
+
+    def __len__(self):
+        return len(self._medias)
+
+
+@dataclass(slots=True)
 class Context:
     """
     上下文对象
@@ -587,6 +703,16 @@ class Context:
     # 种子信息
     torrent_info: TorrentInfo = None
 
+    def __getstate__(self):
+        # 共享的媒体信息在同一次序列化中只保存一份，其它上下文保存引用
+        return _lean_state(self)
+
+    def __setstate__(self, state: dict):
+        _restore_state(self, state)
+        # 反序列化后重新关联到共享的媒体信息
+        if self.media_info:
+            self.media_info = MediaInfoRegistry().share(self.media_info)
+
     def to_dict(self):
         """
         转换为字典
@@ -81,25 +81,40 @@ class ReleaseGroupsMatcher(metaclass=Singleton):
             for release_group in site_groups:
                 release_groups.append(release_group)
         self.__release_groups = '|'.join(release_groups)
+        # 内置组和自定义组编译后的正则
+        self.__groups_re = self.__compile(self.systemconfig.get(SystemConfigKey.CustomReleaseGroups))
+        # 自定义组变化时重新编译
+        self.systemconfig.register(self.__on_groups_changed, [SystemConfigKey.CustomReleaseGroups])
 
-    def match(self, title: str = None, groups: str = None):
+    def __on_groups_changed(self, key: str, value: list):
+        self.__groups_re = self.__compile(value)
+
+    def __compile(self, custom_release_groups: list = None, groups: str = None):
         """
-        :param title: 资源标题或文件名
-        :param groups: 制作组/字幕组
-        :return: 匹配结果
+        编译制作组正则
         """
-        if not title:
-            return ""
         if not groups:
-            # 自定义组
-            custom_release_groups = self.systemconfig.get(SystemConfigKey.CustomReleaseGroups)
             if custom_release_groups:
                 custom_release_groups_str = '|'.join(custom_release_groups)
                 groups = f"{self.__release_groups}|{custom_release_groups_str}"
             else:
                 groups = self.__release_groups
+        return re.compile(r"(?<=[-@\[￡【&])(?:%s)(?=[@.\s\]\[】&])" % groups, re.I)
+
+    def match(self, title: str = None, groups: str = None):
+        """
+        :param title: 资源标题或文件名
+        :param groups: 制作组/字幕组
+        :return: 匹配结果
+        """
+        if not title:
+            return ""
+        if groups:
+            groups_re = self.__compile(groups=groups)
+        else:
+            # 内置组和自定义组
+            groups_re = self.__groups_re
         title = f"{title} "
-        groups_re = re.compile(r"(?<=[-@\[￡【&])(?:%s)(?=[@.\s\]\[】&])" % groups, re.I)
         # 处理一个制作组识别多次的情况，保留顺序
         unique_groups = []
         for item in re.findall(groups_re, title):
@@ -13,6 +13,39 @@ class WordsMatcher(metaclass=Singleton):
 
     def __init__(self):
         self.systemconfig = SystemConfigOper()
+        # 解析后的自定义识别词：(识别词, 类型, 参数)
+        self._words: List[Tuple[str, str, List[str]]] = self.__parse_words(
+            self.systemconfig.get(SystemConfigKey.CustomIdentifiers))
+        # 识别词变化时重新解析
+        self.systemconfig.register(self.__on_words_changed, [SystemConfigKey.CustomIdentifiers])
+
+    def __on_words_changed(self, key: str, value: List[str]):
+        self._words = self.__parse_words(value)
+
+    @staticmethod
+    def __parse_words(words: List[str]) -> List[Tuple[str, str, List[str]]]:
+        """
+        按格式解析自定义识别词
+        """
+        parsed = []
+        for word in words or []:
+            if not word:
+                continue
+            try:
+                if word.count(" => "):
+                    # 替换词
+                    parsed.append((word, "replace", word.split(" => ")))
+                elif word.count(" >> ") and word.count(" <> "):
+                    # 集偏移
+                    strings = word.split(" <> ")
+                    offsets = strings[1].split(" >> ")
+                    parsed.append((word, "offset", [strings[0], offsets[0], offsets[1]]))
+                else:
+                    # 屏蔽词
+                    parsed.append((word, "block", [word]))
+            except Exception as err:
+                logger.error(f"自定义识别词 {word} 格式错误：{str(err)}")
+        return parsed
 
     def prepare(self, title: str) -> Tuple[str, List[str]]:
         """
@@ -22,26 +55,18 @@ class WordsMatcher(metaclass=Singleton):
         3：前定位词 <> 后定位词 >> 偏移量（EP）
         """
         appley_words = []
-        # 读取自定义识别词
-        words: List[str] = self.systemconfig.get(SystemConfigKey.CustomIdentifiers) or []
-        for word in words:
-            if not word:
-                continue
+        for word, word_type, strings in self._words:
             try:
-                if word.count(" => "):
+                if word_type == "replace":
                     # 替换词
-                    strings = word.split(" => ")
                     title, message, state = self.__replace_regex(title, strings[0], strings[1])
-                elif word.count(" >> ") and word.count(" <> "):
+                elif word_type == "offset":
                     # 集偏移
-                    strings = word.split(" <> ")
-                    offsets = strings[1].split(" >> ")
-                    strings[1] = offsets[0]
                     title, message, state = self.__episode_offset(title, strings[0], strings[1],
-                                                                  offsets[1])
+                                                                  strings[2])
                 else:
                     # 屏蔽词
-                    title, message, state = self.__replace_regex(title, word, "")
+                    title, message, state = self.__replace_regex(title, strings[0], "")
 
                 if state:
                     appley_words.append(word)
@@ -1,4 +1,8 @@
-from sqlalchemy import create_engine, QueuePool
+from contextlib import contextmanager
+from typing import Any, List
+
+from sqlalchemy import create_engine, QueuePool, insert, event
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import sessionmaker, Session
 
 from app.core.config import settings
@@ -8,9 +12,32 @@ Engine = create_engine(f"sqlite:///{settings.CONFIG_PATH}/user.db",
                        pool_pre_ping=True,
                        echo=False,
                        poolclass=QueuePool,
-                       pool_size=1000,
+                       pool_size=settings.DB_POOL_SIZE,
                        pool_recycle=60 * 10,
-                       max_overflow=0)
+                       pool_timeout=settings.DB_BUSY_TIMEOUT,
+                       max_overflow=settings.DB_MAX_OVERFLOW,
+                       connect_args={"timeout": settings.DB_BUSY_TIMEOUT})
+
+
+@event.listens_for(Engine, "connect")
+def set_sqlite_pragma(dbapi_connection, connection_record):
+    """
+    新建连接时设置SQLite参数
+    """
+    synchronous = str(settings.DB_SYNCHRONOUS).upper()
+    if synchronous not in ["OFF", "NORMAL", "FULL", "EXTRA"]:
+        synchronous = "NORMAL"
+    cursor = dbapi_connection.cursor()
+    if settings.DB_WAL_ENABLE:
+        cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute(f"PRAGMA synchronous={synchronous}")
+    cursor.execute(f"PRAGMA busy_timeout={int(settings.DB_BUSY_TIMEOUT) * 1000}")
+    cursor.execute(f"PRAGMA mmap_size={int(settings.DB_MMAP_SIZE) * 1024 * 1024}")
+    # 负数表示以KB为单位
+    cursor.execute(f"PRAGMA cache_size=-{int(settings.DB_CACHE_SIZE) * 1024}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
 # 数据库会话
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=Engine)
 
@@ -30,6 +57,8 @@ def get_db():
 
 
 class DbOper:
+    # 批量写入时每批的数量
+    _batch_size = 500
 
     _db: Session = None
 
@@ -42,3 +71,73 @@ class DbOper:
     def __del__(self):
         if self._db:
             self._db.close()
+
+    @contextmanager
+    def unit_of_work(self):
+        """
+        工作单元，块内通过会话新增或修改的数据在退出时统一提交，出错时回滚
+        """
+        try:
+            yield self._db
+            self._db.commit()
+        except Exception:
+            self._db.rollback()
+            raise
+
+    @staticmethod
+    def __normalize(model: Any, rows: List[dict]) -> List[dict]:
+        """
+        统一每行的字段，批量执行时所有行的字段需要一致，忽略主键和表中不存在的字段
+        """
+        columns = set(model.__table__.columns.keys())
+        keys = set()
+        for row in rows:
+            keys.update(row.keys())
+        keys = [key for key in keys if key in columns and key != "id"]
+        return [{key: row.get(key) for key in keys} for row in rows]
+
+    def bulk_insert(self, model: Any, rows: List[dict], commit: bool = True) -> int:
+        """
+        批量新增
+        :param model: 数据表模型
+        :param rows: 数据
+        :param commit: 是否提交，在工作单元中使用时可以不提交
+        :return: 写入数量
+        """
+        if not rows:
+            return 0
+        rows = self.__normalize(model, rows)
+        stmt = insert(model.__table__)
+        for i in range(0, len(rows), self._batch_size):
+            self._db.execute(stmt, rows[i:i + self._batch_size])
+        if commit:
+            self._db.commit()
+        return len(rows)
+
+    def bulk_upsert(self, model: Any, rows: List[dict], index_elements: List[str],
+                    update_fields: List[str] = None, commit: bool = True) -> int:
+        """
+        批量新增或更新，按唯一索引判断是否已存在
+        :param model: 数据表模型
+        :param rows: 数据
+        :param index_elements: 唯一索引的字段
+        :param update_fields: 已存在时更新的字段，为空时更新除索引字段外的所有字段
+        :param commit: 是否提交，在工作单元中使用时可以不提交
+        :return: 写入数量
+        """
+        if not rows:
+            return 0
+        rows = self.__normalize(model, rows)
+        stmt = sqlite_insert(model.__table__)
+        if not update_fields:
+            update_fields = [key for key in rows[0].keys() if key not in index_elements]
+        if update_fields:
+            stmt = stmt.on_conflict_do_update(index_elements=index_elements,
+                                              set_={field: stmt.excluded[field] for field in update_fields})
+        else:
+            stmt = stmt.on_conflict_do_nothing(index_elements=index_elements)
+        for i in range(0, len(rows), self._batch_size):
+            self._db.execute(stmt, rows[i:i + self._batch_size])
+        if commit:
+            self._db.commit()
+        return len(rows)
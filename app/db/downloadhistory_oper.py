@@ -1,5 +1,7 @@
 from pathlib import Path
-from typing import Any
+from typing import Any, List, Dict, Optional
+
+from sqlalchemy.orm import Session
 
 from app.db import DbOper
 from app.db.models.downloadhistory import DownloadHistory
@@ -10,6 +12,11 @@ class DownloadHistoryOper(DbOper):
     下载历史管理
     """
 
+    def __init__(self, db: Session = None):
+        super().__init__(db)
+        # 本次运行中按Hash查询的缓存
+        self._hash_cache: Optional[Dict[str, Any]] = None
+
     def get_by_path(self, path: Path) -> Any:
         """
         按路径查询下载记录
@@ -22,8 +29,31 @@ class DownloadHistoryOper(DbOper):
         按Hash查询下载记录
         :param download_hash: 数据key
         """
+        if self._hash_cache and download_hash in self._hash_cache:
+            return self._hash_cache[download_hash]
         return DownloadHistory.get_by_hash(self._db, download_hash)
 
+    def cache_hashes(self, download_hashes: List[str]):
+        """
+        批量查询一组Hash的下载记录并缓存，之后get_by_hash直接从缓存返回，用完后调用clear_cache清除
+        没有下载记录的Hash不缓存，期间新增的记录仍能查到
+        :param download_hashes: 下载任务Hash列表
+        """
+        cache = {}
+        hashes = list(dict.fromkeys(download_hash for download_hash in download_hashes if download_hash))
+        for i in range(0, len(hashes), self._batch_size):
+            for history in DownloadHistory.list_by_hashes(self._db, hashes[i:i + self._batch_size]):
+                # 与get_by_hash一致，同一Hash取最早的记录
+                if history.download_hash not in cache:
+                    cache[history.download_hash] = history
+        self._hash_cache = cache
+
+    def clear_cache(self):
+        """
+        清除按Hash查询的缓存
+        """
+        self._hash_cache = None
+
     def add(self, **kwargs):
         """
         新增下载历史
@@ -31,12 +61,27 @@ class DownloadHistoryOper(DbOper):
         downloadhistory = DownloadHistory(**kwargs)
         return downloadhistory.create(self._db)
 
+    def add_batch(self, histories: List[dict]) -> int:
+        """
+        批量新增下载历史，一次提交
+        """
+        return self.bulk_insert(DownloadHistory, histories)
+
     def list_by_page(self, page: int = 1, count: int = 30):
         """
         分页查询下载历史
         """
         return DownloadHistory.list_by_page(self._db, page, count)
 
+    def list_by_cursor(self, title: str = None, last_id: int = None, count: int = 30):
+        """
+        按游标分页查询下载历史
+        :param title: 标题关键字
+        :param last_id: 上一页最后一条记录的ID，为空时查询第一页
+        :param count: 每页数量
+        """
+        return DownloadHistory.list_by_cursor(self._db, title=title, last_id=last_id, count=count)
+
     def truncate(self):
         """
         清空下载记录
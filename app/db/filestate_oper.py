@@ -0,0 +1,127 @@
+from typing import Dict, List, Tuple, Optional
+
+from app.db import DbOper
+from app.db.models.filestate import FileState
+
+# 文件状态：是否目录、大小、修改时间、inode、设备号
+FileStat = Tuple[int, int, float, int, int]
+
+
+class FileStateOper(DbOper):
+    """
+    文件状态索引管理
+    """
+    # 单条SQL中IN参数的数量上限
+    _chunk_size = 500
+    # 文件摘要单独保存，不与目录扫描和硬链接索引的根目录混用
+    _digest_root = "checksum:"
+    # 处理失败的重试次数按根目录单独保存
+    _retry_prefix = "retry:"
+
+    def load(self, root: str) -> Dict[str, FileStat]:
+        """
+        加载根目录下所有文件的状态
+        :param root: 根目录
+        """
+        return {
+            item.path: (item.is_dir, item.size, item.mtime, item.inode, item.device)
+            for item in FileState.list_by_root(self._db, root)
+        }
+
+    def load_files(self) -> Dict[str, FileStat]:
+        """
+        加载所有已索引文件的状态
+        """
+        return {
+            item.path: (item.is_dir, item.size, item.mtime, item.inode, item.device)
+            for item in FileState.list_files(self._db)
+        }
+
+    def get(self, path: str) -> Optional[FileState]:
+        """
+        查询单个路径的状态
+        """
+        return FileState.get_by_path(self._db, path)
+
+    def save(self, root: str, changed: Dict[str, FileStat], removed: List[str] = None):
+        """
+        批量保存状态变化，一次提交
+        :param root: 根目录
+        :param changed: 新增或变化的路径及状态
+        :param removed: 已删除的路径
+        """
+        if not changed and not removed:
+            return
+        paths = list(changed.keys()) + list(removed or [])
+        for i in range(0, len(paths), self._chunk_size):
+            FileState.delete_by_paths(self._db, root, paths[i:i + self._chunk_size])
+        self._db.add_all([
+            FileState(root=root, path=path, is_dir=stat[0], size=stat[1],
+                      mtime=stat[2], inode=stat[3], device=stat[4])
+            for path, stat in changed.items()
+        ])
+        self._db.commit()
+
+    def remove(self, paths: List[str]):
+        """
+        删除已不存在的路径在所有根目录下的记录
+        """
+        if not paths:
+            return
+        for i in range(0, len(paths), self._chunk_size):
+            FileState.delete_by_path_list(self._db, paths[i:i + self._chunk_size])
+        self._db.commit()
+
+    def get_digest(self, device: int, inode: int, size: int, mtime: float) -> Optional[str]:
+        """
+        查询文件摘要，文件大小或修改时间变化后已保存的摘要失效
+        """
+        item = FileState.get_by_inode(self._db, self._digest_root, device, inode)
+        if not item or item.size != size or item.mtime != mtime:
+            return None
+        return item.digest
+
+    def save_digest(self, path: str, device: int, inode: int, size: int, mtime: float, digest: str):
+        """
+        保存文件摘要，同一文件（设备号+inode）只保留最新的一条
+        """
+        FileState.delete_by_inode(self._db, self._digest_root, device, inode)
+        self._db.add(FileState(root=self._digest_root, path=path, is_dir=0, size=size,
+                               mtime=mtime, inode=inode, device=device, digest=digest))
+        self._db.commit()
+
+    def load_retries(self, root: str) -> Dict[str, Tuple[FileStat, int]]:
+        """
+        加载根目录下处理失败文件的状态及重试次数
+        """
+        return {
+            item.path: ((item.is_dir, item.size, item.mtime, item.inode, item.device), item.retries or 0)
+            for item in FileState.list_by_root(self._db, self._retry_prefix + root)
+        }
+
+    def save_retries(self, root: str, changed: Dict[str, Tuple[FileStat, int]], removed: List[str] = None):
+        """
+        批量保存处理失败文件的重试次数，不记录inode，不参与硬链接索引
+        :param root: 根目录
+        :param changed: 新增或变化的路径及（状态，重试次数）
+        :param removed: 不再需要重试的路径
+        """
+        if not changed and not removed:
+            return
+        retry_root = self._retry_prefix + root
+        paths = list(changed.keys()) + list(removed or [])
+        for i in range(0, len(paths), self._chunk_size):
+            FileState.delete_by_paths(self._db, retry_root, paths[i:i + self._chunk_size])
+        self._db.add_all([
+            FileState(root=retry_root, path=path, is_dir=stat[0], size=stat[1],
+                      mtime=stat[2], retries=retries)
+            for path, (stat, retries) in changed.items()
+        ])
+        self._db.commit()
+
+    def clear(self, root: str):
+        """
+        清空根目录的状态索引及重试记录
+        """
+        FileState.delete_by_root(self._db, root)
+        FileState.delete_by_root(self._db, self._retry_prefix + root)
@@ -46,3 +46,17 @@ def update_db():
         upgrade(alembic_cfg, 'head')
     except Exception as e:
         logger.error(f'数据库更新失败：{e}')
+
+
+def optimize_db():
+    """
+    优化数据库，更新查询计划的统计信息，并将WAL日志合并回数据库文件
+    """
+    try:
+        with Engine.connect() as conn:
+            conn.exec_driver_sql("PRAGMA optimize")
+            if settings.DB_WAL_ENABLE:
+                conn.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+        logger.info("数据库优化完成")
+    except Exception as e:
+        logger.error(f"数据库优化失败：{e}")
@@ -1,10 +1,13 @@
 import json
-from typing import Optional
+from datetime import datetime
+from typing import Optional, List, Set
 
 from sqlalchemy.orm import Session
 
 from app.db import DbOper
 from app.db.models.mediaserver import MediaServerItem
+from app.helper.library import LibraryHelper
+from app.schemas.types import MediaType
 
 
 class MediaServerOper(DbOper):
@@ -25,16 +28,56 @@ class MediaServerOper(DbOper):
             return True
         return False
 
+    def upsert(self, server: str, items: List[dict]) -> int:
+        """
+        批量新增或更新媒体服务器数据，按服务器和项目ID判断是否已存在，全部写入后统一提交
+        :return: 写入数量
+        """
+        if not items:
+            return 0
+        lst_mod_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        rows = [{**item, "server": server, "lst_mod_date": lst_mod_date} for item in items]
+        self.bulk_upsert(MediaServerItem, rows, index_elements=["server", "item_id"])
+        LibraryHelper().update(server, items)
+        return len(items)
+
+    def delete_vanished(self, server: str, item_ids: Set[str]) -> int:
+        """
+        删除媒体服务器上已不存在的数据
+        :param server: 服务器类型
+        :param item_ids: 媒体服务器上现有的项目ID
+        :return: 删除数量
+        """
+        vanished = [item_id for item_id in MediaServerItem.list_itemids(self._db, server)
+                    if item_id not in item_ids]
+        if not vanished:
+            return 0
+        for i in range(0, len(vanished), self._batch_size):
+            MediaServerItem.delete_by_itemids(self._db, server, vanished[i:i + self._batch_size])
+        self._db.commit()
+        LibraryHelper().remove(server, vanished)
+        return len(vanished)
+
     def empty(self, server: str):
         """
         清空媒体服务器数据
         """
         MediaServerItem.empty(self._db, server)
+        LibraryHelper().clear(server)
 
     def exists(self, **kwargs) -> Optional[MediaServerItem]:
         """
         判断媒体服务器数据是否存在
         """
+        library = LibraryHelper()
+        if kwargs.get("mtype") in [MediaType.MOVIE.value, MediaType.TV.value] and library.ready:
+            # 从内存索引中查找
+            item_id = library.get_item_id(mtype=MediaType(kwargs.get("mtype")), tmdbid=kwargs.get("tmdbid"),
+                                          title=kwargs.get("title"), year=kwargs.get("year"),
+                                          season=kwargs.get("season"))
+            if not item_id:
+                return None
+            return MediaServerItem.get_by_itemid(self._db, item_id)
         if kwargs.get("tmdbid"):
             # 优先按TMDBID查
             item = MediaServerItem.exist_by_tmdbid(self._db, tmdbid=kwargs.get("tmdbid"),
@@ -55,10 +98,21 @@ class MediaServerOper(DbOper):
                 return None
         return item
 
+    def get_by_itemid(self, item_id: str) -> Optional[MediaServerItem]:
+        """
+        按媒体服务器中的ID获取媒体服务器数据
+        """
+        return MediaServerItem.get_by_itemid(self._db, item_id)
+
     def get_item_id(self, **kwargs) -> Optional[str]:
         """
         获取媒体服务器数据ID
         """
+        library = LibraryHelper()
+        if kwargs.get("mtype") in [MediaType.MOVIE.value, MediaType.TV.value] and library.ready:
+            return library.get_item_id(mtype=MediaType(kwargs.get("mtype")), tmdbid=kwargs.get("tmdbid"),
+                                       title=kwargs.get("title"), year=kwargs.get("year"),
+                                       season=kwargs.get("season"))
         item = self.exists(**kwargs)
         if not item:
             return None
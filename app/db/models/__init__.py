@@ -1,7 +1,11 @@
-from typing import Any
+from typing import Any, Dict
 
+from sqlalchemy import text
 from sqlalchemy.orm import as_declarative, declared_attr
 
+# 表是否已建立全文索引
+_fts_tables: Dict[str, bool] = {}
+
 
 @as_declarative()
 class Base:
@@ -37,6 +41,23 @@ class Base:
     def list(cls, db):
         return db.query(cls).all()
 
+    @classmethod
+    def fts_filter(cls, db, keyword: str):
+        """
+        全文索引查询条件，表没有全文索引或关键字少于3个字符（三元组分词的最小长度）时返回None
+        """
+        if not keyword or len(keyword) < 3:
+            return None
+        table = cls.__tablename__
+        if table not in _fts_tables:
+            _fts_tables[table] = bool(db.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type='table' AND name=:name"),
+                {"name": f"{table}_fts"}).first())
+        if not _fts_tables[table]:
+            return None
+        return text(f"{table}.id IN (SELECT rowid FROM {table}_fts WHERE {table}_fts MATCH :fts_keyword)"
+                    ).bindparams(fts_keyword='"%s"' % keyword.replace('"', '""'))
+
     def to_dict(self):
         return {c.name: getattr(self, c.name, None) for c in self.__table__.columns}
 
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Sequence
+from sqlalchemy import Column, Integer, String, Sequence, Index, or_
 from sqlalchemy.orm import Session
 
 from app.db.models import Base
@@ -38,13 +38,57 @@ class DownloadHistory(Base):
     # 附加信息
     note = Column(String)
 
+    __table_args__ = (
+        Index('ix_downloadhistory_tmdbid_seasons_episodes', 'tmdbid', 'seasons', 'episodes'),
+        Index('ix_downloadhistory_type_title_year', 'type', 'title', 'year'),
+    )
+
     @staticmethod
     def get_by_hash(db: Session, download_hash: str):
-        return db.query(DownloadHistory).filter(DownloadHistory.download_hash == download_hash).first()
+        return db.query(DownloadHistory).filter(DownloadHistory.download_hash == download_hash).order_by(
+            DownloadHistory.id).first()
+
+    @staticmethod
+    def list_by_hashes(db: Session, download_hashes: list):
+        return db.query(DownloadHistory).filter(DownloadHistory.download_hash.in_(download_hashes)).order_by(
+            DownloadHistory.id).all()
 
     @staticmethod
     def list_by_page(db: Session, page: int = 1, count: int = 30):
-        return db.query(DownloadHistory).offset((page - 1) * count).limit(count).all()
+        return db.query(DownloadHistory).order_by(
+            DownloadHistory.id.desc()).offset((page - 1) * count).limit(count).all()
+
+    @staticmethod
+    def list_by_cursor(db: Session, title: str = None, last_id: int = None, count: int = 30):
+        """
+        按ID倒序游标分页，从上一页最后一条记录之后开始查询
+        """
+        query = db.query(DownloadHistory)
+        if title:
+            query = query.filter(DownloadHistory.title_filter(db, title))
+        if last_id:
+            query = query.filter(DownloadHistory.id < last_id)
+        return query.order_by(DownloadHistory.id.desc()).limit(count).all()
+
+    @staticmethod
+    def title_filter(db: Session, title: str):
+        """
+        按标题、路径、种子名称、季集查询的条件，优先使用全文索引
+        """
+        fts = DownloadHistory.fts_filter(db, title)
+        if fts is not None:
+            return fts
+        # 关键字过短或不支持全文索引时，按全文索引相同的字段模糊查询
+        return or_(*[column.like(f'%{title}%') for column in (DownloadHistory.title,
+                                                              DownloadHistory.path,
+                                                              DownloadHistory.torrent_name,
+                                                              DownloadHistory.seasons,
+                                                              DownloadHistory.episodes)])
+
+    @staticmethod
+    def list_by_title(db: Session, title: str, page: int = 1, count: int = 30):
+        return db.query(DownloadHistory).filter(DownloadHistory.title_filter(db, title)).order_by(
+            DownloadHistory.id.desc()).offset((page - 1) * count).limit(count).all()
 
     @staticmethod
     def get_by_path(db: Session, path: str):
@@ -0,0 +1,74 @@
+from sqlalchemy import Column, Integer, String, Sequence, Float, Index
+from sqlalchemy.orm import Session
+
+from app.db.models import Base
+
+
+class FileState(Base):
+    """
+    文件状态索引，记录目录下文件的大小、修改时间和inode，用于增量比对
+    """
+    id = Column(Integer, Sequence('id'), primary_key=True, index=True)
+    # 所属根目录（如监控目录）
+    root = Column(String, nullable=False, index=True)
+    # 路径
+    path = Column(String, nullable=False, index=True)
+    # 是否为目录
+    is_dir = Column(Integer, default=0)
+    # 大小
+    size = Column(Integer)
+    # 修改时间
+    mtime = Column(Float)
+    # inode
+    inode = Column(Integer)
+    # 设备号
+    device = Column(Integer)
+    # 文件摘要
+    digest = Column(String)
+    # 处理失败的重试次数
+    retries = Column(Integer)
+
+    __table_args__ = (
+        Index('ix_filestate_device_inode', 'device', 'inode'),
+    )
+
+    @staticmethod
+    def list_by_root(db: Session, root: str):
+        return db.query(FileState).filter(FileState.root == root).all()
+
+    @staticmethod
+    def list_files(db: Session):
+        # 文件摘要记录不参与硬链接索引
+        return db.query(FileState).filter(FileState.is_dir == 0,
+                                          FileState.inode.isnot(None),
+                                          FileState.digest.is_(None)).all()
+
+    @staticmethod
+    def get_by_inode(db: Session, root: str, device: int, inode: int):
+        return db.query(FileState).filter(FileState.root == root,
+                                          FileState.device == device,
+                                          FileState.inode == inode).first()
+
+    @staticmethod
+    def delete_by_inode(db: Session, root: str, device: int, inode: int):
+        db.query(FileState).filter(FileState.root == root,
+                                   FileState.device == device,
+                                   FileState.inode == inode).delete(synchronize_session=False)
+
+    @staticmethod
+    def get_by_path(db: Session, path: str):
+        return db.query(FileState).filter(FileState.path == path).first()
+
+    @staticmethod
+    def delete_by_paths(db: Session, root: str, paths: list):
+        db.query(FileState).filter(FileState.root == root,
+                                   FileState.path.in_(paths)).delete(synchronize_session=False)
+
+    @staticmethod
+    def delete_by_path_list(db: Session, paths: list):
+        db.query(FileState).filter(FileState.path.in_(paths)).delete(synchronize_session=False)
+
+    @staticmethod
+    def delete_by_root(db: Session, root: str):
+        db.query(FileState).filter(FileState.root == root).delete()
+        db.commit()
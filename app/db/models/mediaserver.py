@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from sqlalchemy import Column, Integer, String, Sequence
+from sqlalchemy import Column, Integer, String, Sequence, Index
 from sqlalchemy.orm import Session
 
 from app.db.models import Base
@@ -40,10 +40,23 @@ class MediaServerItem(Base):
     # 同步时间
     lst_mod_date = Column(String, default=datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
 
+    __table_args__ = (
+        Index('ix_mediaserveritem_server_itemid', 'server', 'item_id', unique=True),
+    )
+
     @staticmethod
     def get_by_itemid(db: Session, item_id: str):
         return db.query(MediaServerItem).filter(MediaServerItem.item_id == item_id).first()
 
+    @staticmethod
+    def list_itemids(db: Session, server: str):
+        return [item_id for item_id, in db.query(MediaServerItem.item_id).filter(MediaServerItem.server == server)]
+
+    @staticmethod
+    def delete_by_itemids(db: Session, server: str, item_ids: list):
+        db.query(MediaServerItem).filter(MediaServerItem.server == server,
+                                         MediaServerItem.item_id.in_(item_ids)).delete(synchronize_session=False)
+
     @staticmethod
     def empty(db: Session, server: str):
         db.query(MediaServerItem).filter(MediaServerItem.server == server).delete()
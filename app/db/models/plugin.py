@@ -25,6 +25,11 @@ class PluginData(Base):
     def del_plugin_data_by_key(db: Session, plugin_id: str, key: str):
         return db.query(PluginData).filter(PluginData.plugin_id == plugin_id, PluginData.key == key).delete()
 
+    @staticmethod
+    def del_plugin_data_by_keys(db: Session, plugin_id: str, keys: list):
+        return db.query(PluginData).filter(PluginData.plugin_id == plugin_id,
+                                           PluginData.key.in_(keys)).delete(synchronize_session=False)
+
     @staticmethod
     def get_plugin_data_by_plugin_id(db: Session, plugin_id: str):
         return db.query(PluginData).filter(PluginData.plugin_id == plugin_id).all()
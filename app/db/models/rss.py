@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Sequence
+from sqlalchemy import Column, Integer, String, Sequence, Index, or_
 from sqlalchemy.orm import Session
 
 from app.db.models import Base
@@ -51,6 +51,14 @@ class Rss(Base):
     note = Column(String)
     # 最后更新时间
     last_update = Column(String)
+    # RSS响应的ETag
+    etag = Column(String)
+    # RSS响应的Last-Modified
+    last_modified = Column(String)
+    # 已处理的最新条目GUID
+    last_guid = Column(String)
+    # 已处理的最新条目发布时间戳
+    last_pubdate = Column(Integer)
     # 状态 0-停用，1-启用
     state = Column(Integer, default=1)
 
@@ -64,3 +72,43 @@ class Rss(Base):
     @staticmethod
     def get_by_title(db: Session, title: str):
         return db.query(Rss).filter(Rss.title == title).first()
+
+
+class RssItem(Base):
+    """
+    RSS订阅已处理的条目
+    """
+    id = Column(Integer, Sequence('id'), primary_key=True, index=True)
+    # 订阅ID
+    rssid = Column(Integer, nullable=False)
+    # 条目唯一标识
+    guid = Column(String)
+    # 标题
+    title = Column(String)
+    # 季集
+    season_episode = Column(String)
+
+    __table_args__ = (
+        Index('ix_rssitem_rssid_guid', 'rssid', 'guid', unique=True),
+        Index('ix_rssitem_rssid_title', 'rssid', 'title'),
+    )
+
+    @staticmethod
+    def list_processed(db: Session, rssid: int, guids: list, titles: list):
+        """
+        查询GUID或标题已处理过的条目
+        """
+        return db.query(RssItem.guid, RssItem.title).filter(
+            RssItem.rssid == rssid,
+            or_(RssItem.guid.in_(guids), RssItem.title.in_(titles))
+        ).all()
+
+    @staticmethod
+    def list_season_episodes(db: Session, rssid: int):
+        return db.query(RssItem.season_episode).filter(RssItem.rssid == rssid,
+                                                       RssItem.season_episode.isnot(None)).distinct().all()
+
+    @staticmethod
+    def delete_by_rssid(db: Session, rssid: int):
+        db.query(RssItem).filter(RssItem.rssid == rssid).delete(synchronize_session=False)
+        db.commit()
@@ -0,0 +1,87 @@
+from sqlalchemy import Column, Integer, String, Sequence, Index
+from sqlalchemy.orm import Session
+
+from app.db.models import Base
+
+
+class SearchResult(Base):
+    """
+    搜索记录，每次搜索一条，同一次搜索的媒体信息只保存一份
+    """
+    id = Column(Integer, Sequence('id'), primary_key=True, index=True)
+    # 搜索ID
+    search_id = Column(String, nullable=False, unique=True, index=True)
+    # 用户ID
+    userid = Column(String, index=True)
+    # 搜索时间戳
+    created = Column(Integer, nullable=False, index=True)
+    # 搜索的媒体标题
+    title = Column(String)
+    # 结果数量
+    count = Column(Integer, default=0)
+    # 媒体信息JSON
+    media = Column(String)
+
+    @staticmethod
+    def get_by_search_id(db: Session, search_id: str, userid: str = None):
+        query = db.query(SearchResult).filter(SearchResult.search_id == search_id)
+        if userid:
+            query = query.filter(SearchResult.userid == userid)
+        else:
+            query = query.filter(SearchResult.userid.is_(None))
+        return query.first()
+
+    @staticmethod
+    def get_last(db: Session, userid: str = None):
+        query = db.query(SearchResult)
+        if userid:
+            query = query.filter(SearchResult.userid == userid)
+        return query.order_by(SearchResult.created.desc(), SearchResult.id.desc()).first()
+
+    @staticmethod
+    def list_expired(db: Session, before: int, keep: int, userid: str = None):
+        """
+        查询过期的搜索记录：早于指定时间，或超过每个用户保留数量的记录
+        """
+        expired = db.query(SearchResult.search_id).filter(SearchResult.created < before).all()
+        query = db.query(SearchResult.search_id)
+        if userid:
+            query = query.filter(SearchResult.userid == userid)
+        else:
+            query = query.filter(SearchResult.userid.is_(None))
+        extra = query.order_by(SearchResult.created.desc(), SearchResult.id.desc()).offset(keep).all()
+        return list({row.search_id for row in expired + extra})
+
+    @staticmethod
+    def delete_by_search_ids(db: Session, search_ids: list):
+        db.query(SearchResult).filter(SearchResult.search_id.in_(search_ids)).delete(synchronize_session=False)
+        db.query(SearchResultItem).filter(SearchResultItem.search_id.in_(search_ids)).delete(
+            synchronize_session=False)
+        db.commit()
+
+
+class SearchResultItem(Base):
+    """
+    搜索结果，按排序后的顺序保存识别信息和种子信息
+    """
+    id = Column(Integer, Sequence('id'), primary_key=True, index=True)
+    # 搜索ID
+    search_id = Column(String, nullable=False)
+    # 序号
+    seq = Column(Integer, nullable=False)
+    # 识别信息JSON
+    meta = Column(String)
+    # 种子信息JSON
+    torrent = Column(String)
+
+    __table_args__ = (
+        Index('ix_searchresultitem_search_seq', 'search_id', 'seq'),
+    )
+
+    @staticmethod
+    def list_by_page(db: Session, search_id: str, page: int = None, count: int = 30):
+        query = db.query(SearchResultItem).filter(SearchResultItem.search_id == search_id).order_by(
+            SearchResultItem.seq)
+        if page:
+            query = query.offset((page - 1) * count).limit(count)
+        return query.all()
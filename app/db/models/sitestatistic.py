@@ -0,0 +1,156 @@
+from sqlalchemy import Column, Integer, String, Sequence, Float, Index, func, and_, cast
+from sqlalchemy.orm import Session
+
+from app.db.models import Base
+
+
+class SiteStatisticPoint(Base):
+    """
+    站点数据时间序列，每次刷新站点数据时每个站点记录一条
+    """
+    id = Column(Integer, Sequence('id'), primary_key=True, index=True)
+    # 站点名称
+    site = Column(String, nullable=False)
+    # 时间戳
+    ts = Column(Integer, nullable=False, index=True)
+    # 用户名
+    username = Column(String)
+    # 用户等级
+    user_level = Column(String)
+    # 上传量
+    upload = Column(Integer)
+    # 下载量
+    download = Column(Integer)
+    # 分享率
+    ratio = Column(Float)
+    # 做种数
+    seeding = Column(Integer)
+    # 做种体积
+    seeding_size = Column(Integer)
+    # 魔力值
+    bonus = Column(Float)
+
+    __table_args__ = (
+        Index('ix_sitestatisticpoint_site_ts', 'site', 'ts'),
+    )
+
+    @staticmethod
+    def snapshot(db: Session, ts: int = None):
+        """
+        每个站点在指定时间（含）之前的最后一条数据，不指定时间时为最新数据，返回子查询
+        """
+        last = db.query(SiteStatisticPoint.site, func.max(SiteStatisticPoint.ts).label("ts"))
+        if ts is not None:
+            last = last.filter(SiteStatisticPoint.ts <= ts)
+        last = last.group_by(SiteStatisticPoint.site).subquery()
+        return db.query(SiteStatisticPoint).join(
+            last, and_(SiteStatisticPoint.site == last.c.site, SiteStatisticPoint.ts == last.c.ts)
+        ).subquery()
+
+    @staticmethod
+    def list_latest(db: Session):
+        snapshot = SiteStatisticPoint.snapshot(db)
+        return db.query(snapshot).all()
+
+    @staticmethod
+    def list_deltas(db: Session, start: int, end: int = None):
+        """
+        每个站点在两个时间点之间的增量，开始时间之前没有数据的站点按全量计算
+        """
+        cur = SiteStatisticPoint.snapshot(db, end)
+        prev = SiteStatisticPoint.snapshot(db, start)
+        return db.query(
+            cur.c.site,
+            cur.c.ts,
+            (cur.c.upload - func.coalesce(prev.c.upload, 0)).label("upload"),
+            (cur.c.download - func.coalesce(prev.c.download, 0)).label("download"),
+            (cur.c.seeding - func.coalesce(prev.c.seeding, 0)).label("seeding"),
+            (cur.c.seeding_size - func.coalesce(prev.c.seeding_size, 0)).label("seeding_size"),
+            (cur.c.bonus - func.coalesce(prev.c.bonus, 0)).label("bonus")
+        ).outerjoin(prev, cur.c.site == prev.c.site).filter(cur.c.ts > start).all()
+
+    @staticmethod
+    def last_ts(db: Session, before: int = None) -> int:
+        query = db.query(func.max(SiteStatisticPoint.ts))
+        if before is not None:
+            query = query.filter(SiteStatisticPoint.ts < before)
+        return query.scalar()
+
+    @staticmethod
+    def list_by_range(db: Session, site: str = None, start: int = None, end: int = None):
+        query = db.query(SiteStatisticPoint)
+        if site:
+            query = query.filter(SiteStatisticPoint.site == site)
+        if start is not None:
+            query = query.filter(SiteStatisticPoint.ts >= start)
+        if end is not None:
+            query = query.filter(SiteStatisticPoint.ts <= end)
+        return query.order_by(SiteStatisticPoint.site, SiteStatisticPoint.ts).all()
+
+    @staticmethod
+    def delete_before(db: Session, ts: int):
+        db.query(SiteStatisticPoint).filter(SiteStatisticPoint.ts < ts).delete(synchronize_session=False)
+        db.commit()
+
+
+class SiteStatisticDaily(Base):
+    """
+    站点数据按天汇总，保存每个站点每天最后一次刷新的数据，用于长时间范围的趋势查询
+    """
+    id = Column(Integer, Sequence('id'), primary_key=True, index=True)
+    # 站点名称
+    site = Column(String, nullable=False)
+    # 日期 YYYY-MM-DD
+    day = Column(String, nullable=False, index=True)
+    # 当天最后一次刷新的时间戳
+    ts = Column(Integer)
+    # 用户名
+    username = Column(String)
+    # 用户等级
+    user_level = Column(String)
+    # 上传量
+    upload = Column(Integer)
+    # 下载量
+    download = Column(Integer)
+    # 分享率
+    ratio = Column(Float)
+    # 做种数
+    seeding = Column(Integer)
+    # 做种体积
+    seeding_size = Column(Integer)
+    # 魔力值
+    bonus = Column(Float)
+
+    __table_args__ = (
+        Index('ix_sitestatisticdaily_site_day', 'site', 'day', unique=True),
+    )
+
+    @staticmethod
+    def list_by_range(db: Session, site: str = None, start: str = None, end: str = None):
+        query = db.query(SiteStatisticDaily)
+        if site:
+            query = query.filter(SiteStatisticDaily.site == site)
+        if start:
+            query = query.filter(SiteStatisticDaily.day >= start)
+        if end:
+            query = query.filter(SiteStatisticDaily.day <= end)
+        return query.order_by(SiteStatisticDaily.site, SiteStatisticDaily.day).all()
+
+    @staticmethod
+    def list_weekly(db: Session, site: str = None, start: str = None, end: str = None):
+        """
+        按周汇总，取每个站点每周最后一天的数据
+        """
+        # 从1970-01-05（周一）起按天数计算周序号，跨年的一周不会被拆成两周
+        week = cast((func.julianday(SiteStatisticDaily.day) - func.julianday('1970-01-05')) / 7, Integer)
+        last = db.query(SiteStatisticDaily.site, func.max(SiteStatisticDaily.day).label("day"))
+        if site:
+            last = last.filter(SiteStatisticDaily.site == site)
+        if start:
+            last = last.filter(SiteStatisticDaily.day >= start)
+        if end:
+            last = last.filter(SiteStatisticDaily.day <= end)
+        last = last.group_by(SiteStatisticDaily.site, week).subquery()
+        return db.query(SiteStatisticDaily).join(
+            last, and_(SiteStatisticDaily.site == last.c.site, SiteStatisticDaily.day == last.c.day)
+        ).order_by(SiteStatisticDaily.site, SiteStatisticDaily.day).all()
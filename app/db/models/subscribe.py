@@ -2,6 +2,7 @@ from sqlalchemy import Column, Integer, String, Sequence
 from sqlalchemy.orm import Session
 
 from app.db.models import Base
+from app.db.models.subscribestate import SubscribeState
 
 
 class Subscribe(Base):
@@ -88,10 +89,12 @@ class Subscribe(Base):
         subscrbies = self.get_by_tmdbid(db, tmdbid, season)
         for subscrbie in subscrbies:
             subscrbie.delete(db, subscrbie.id)
+            SubscribeState.delete_by_subscribe(db, subscrbie.id)
         return True
 
     def delete_by_doubanid(self, db: Session, doubanid: str):
         subscribe = self.get_by_doubanid(db, doubanid)
         if subscribe:
             subscribe.delete(db, subscribe.id)
+            SubscribeState.delete_by_subscribe(db, subscribe.id)
         return True
@@ -0,0 +1,43 @@
+from sqlalchemy import Column, Integer, String, Sequence, Float
+from sqlalchemy.orm import Session
+
+from app.db.models import Base
+
+
+class SubscribeState(Base):
+    """
+    订阅状态快照，缓存订阅的媒体信息和媒体库缺失情况，减少每次刷新时的识别和媒体库查询
+    """
+    id = Column(Integer, Sequence('id'), primary_key=True, index=True)
+    # 订阅ID
+    subscribe_id = Column(Integer, nullable=False, index=True)
+    tmdbid = Column(Integer, index=True)
+    # 季号
+    season = Column(Integer)
+    # 媒体信息JSON
+    mediainfo = Column(String)
+    # 媒体信息识别时间
+    media_time = Column(Float)
+    # 媒体库中是否已存在
+    exist_flag = Column(Integer)
+    # 缺失季集JSON
+    no_exists = Column(String)
+    # 媒体库查询时间，为空时需要重新查询
+    exists_time = Column(Float)
+
+    @staticmethod
+    def get_by_subscribe(db: Session, subscribe_id: int):
+        return db.query(SubscribeState).filter(SubscribeState.subscribe_id == subscribe_id).first()
+
+    @staticmethod
+    def delete_by_subscribe(db: Session, subscribe_id: int):
+        db.query(SubscribeState).filter(SubscribeState.subscribe_id == subscribe_id).delete()
+        db.commit()
+
+    @staticmethod
+    def expire_exists(db: Session, tmdbid: int = None):
+        query = db.query(SubscribeState)
+        if tmdbid:
+            query = query.filter(SubscribeState.tmdbid == tmdbid)
+        query.update({SubscribeState.exists_time: None}, synchronize_session=False)
+        db.commit()
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Sequence
+from sqlalchemy import Column, Integer, String, Sequence, cast, func
 from sqlalchemy.orm import Session
 
 from app.db.models import Base
@@ -18,6 +18,28 @@ class SystemConfig(Base):
     def get_by_key(db: Session, key: str):
         return db.query(SystemConfig).filter(SystemConfig.key == key).first()
 
+    @staticmethod
+    def list_values(db: Session):
+        """
+        查询所有配置项的值，不经过会话缓存
+        """
+        return db.query(SystemConfig.key, SystemConfig.value).all()
+
+    @staticmethod
+    def increase(db: Session, key: str) -> int:
+        """
+        配置项的值按整数原子加1，返回加1后的值
+        """
+        updated = db.query(SystemConfig).filter(SystemConfig.key == key).update(
+            {SystemConfig.value: cast(func.coalesce(cast(SystemConfig.value, Integer), 0) + 1, String)},
+            synchronize_session=False)
+        if not updated:
+            db.add(SystemConfig(key=key, value="1"))
+            db.flush()
+        value = db.query(SystemConfig.value).filter(SystemConfig.key == key).scalar()
+        db.commit()
+        return int(value or 0)
+
     def delete_by_key(self, db: Session, key: str):
         systemconfig = self.get_by_key(db, key)
         if systemconfig:
@@ -1,6 +1,6 @@
 import time
 
-from sqlalchemy import Column, Integer, String, Sequence, Boolean, func
+from sqlalchemy import Column, Integer, String, Sequence, Boolean, Index, func, or_, and_
 from sqlalchemy.orm import Session
 
 from app.db.models import Base
@@ -46,16 +46,48 @@ class TransferHistory(Base):
     # 文件清单，以JSON存储
     files = Column(String)
 
+    __table_args__ = (
+        Index('ix_transferhistory_tmdbid_seasons_episodes', 'tmdbid', 'seasons', 'episodes'),
+    )
+
+    @staticmethod
+    def title_filter(db: Session, title: str):
+        """
+        按标题、路径、季集查询的条件，优先使用全文索引
+        """
+        fts = TransferHistory.fts_filter(db, title)
+        if fts is not None:
+            return fts
+        # 关键字过短或不支持全文索引时，按全文索引相同的字段模糊查询
+        return or_(*[column.like(f'%{title}%') for column in (TransferHistory.title,
+                                                              TransferHistory.src,
+                                                              TransferHistory.dest,
+                                                              TransferHistory.seasons,
+                                                              TransferHistory.episodes)])
+
     @staticmethod
     def list_by_title(db: Session, title: str, page: int = 1, count: int = 30):
-        return db.query(TransferHistory).filter(TransferHistory.title.like(f'%{title}%')).order_by(
-            TransferHistory.date.desc()).offset((page - 1) * count).limit(
+        return db.query(TransferHistory).filter(TransferHistory.title_filter(db, title)).order_by(
+            TransferHistory.date.desc(), TransferHistory.id.desc()).offset((page - 1) * count).limit(
             count).all()
 
     @staticmethod
     def list_by_page(db: Session, page: int = 1, count: int = 30):
-        return db.query(TransferHistory).order_by(TransferHistory.date.desc()).offset((page - 1) * count).limit(
-            count).all()
+        return db.query(TransferHistory).order_by(
+            TransferHistory.date.desc(), TransferHistory.id.desc()).offset((page - 1) * count).limit(count).all()
+
+    @staticmethod
+    def list_by_cursor(db: Session, title: str = None, date: str = None, hid: int = None, count: int = 30):
+        """
+        按(时间, ID)倒序游标分页，从上一页最后一条记录之后开始查询，不需要跳过前面的记录
+        """
+        query = db.query(TransferHistory)
+        if title:
+            query = query.filter(TransferHistory.title_filter(db, title))
+        if date is not None and hid is not None:
+            query = query.filter(or_(TransferHistory.date < date,
+                                     and_(TransferHistory.date == date, TransferHistory.id < hid)))
+        return query.order_by(TransferHistory.date.desc(), TransferHistory.id.desc()).limit(count).all()
 
     @staticmethod
     def get_by_hash(db: Session, download_hash: str):
@@ -65,6 +97,15 @@ class TransferHistory(Base):
     def get_by_src(db: Session, src: str):
         return db.query(TransferHistory).filter(TransferHistory.src == src).first()
 
+    @staticmethod
+    def list_paths_by_mode(db: Session, mode: str):
+        return db.query(TransferHistory.src, TransferHistory.dest).filter(TransferHistory.mode == mode,
+                                                                          TransferHistory.status == 1).all()
+
+    @staticmethod
+    def delete_by_srcs(db: Session, srcs: list):
+        db.query(TransferHistory).filter(TransferHistory.src.in_(srcs)).delete(synchronize_session=False)
+
     @staticmethod
     def statistic(db: Session, days: int = 7):
         """
@@ -82,7 +123,7 @@ class TransferHistory(Base):
 
     @staticmethod
     def count_by_title(db: Session, title: str):
-        return db.query(func.count(TransferHistory.id)).filter(TransferHistory.title.like(f'%{title}%')).first()[0]
+        return db.query(func.count(TransferHistory.id)).filter(TransferHistory.title_filter(db, title)).first()[0]
 
     @staticmethod
     def list_by(db: Session, title: str = None, year: int = None, season: str = None,
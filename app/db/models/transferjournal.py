@@ -0,0 +1,58 @@
+import time
+
+from sqlalchemy import Column, Integer, String, Sequence
+from sqlalchemy.orm import Session
+
+from app.db.models import Base
+
+
+class TransferJournal(Base):
+    """
+    转移日志，每个待转移路径一条记录，用于中断后恢复
+    """
+    id = Column(Integer, Sequence('id'), primary_key=True, index=True)
+    # 下载器hash
+    download_hash = Column(String, index=True)
+    # 种子名称
+    torrent_title = Column(String)
+    # 源路径
+    src = Column(String, index=True)
+    # 目标路径，转移中为目的目录，转移完成后为实际的目标路径
+    dest = Column(String)
+    # 转移模式 move/copy/link...
+    mode = Column(String)
+    # 类型 电影/电视剧
+    type = Column(String)
+    tmdbid = Column(Integer)
+    # 识别到的元数据标题，恢复时用于重建元数据
+    meta_title = Column(String)
+    # 状态：planned-待转移，running-转移中，done-已完成
+    state = Column(String, nullable=False, index=True, default='planned')
+    # 时间
+    date = Column(String)
+
+    @staticmethod
+    def list_by_hash(db: Session, download_hash: str):
+        return db.query(TransferJournal).filter(TransferJournal.download_hash == download_hash).all()
+
+    @staticmethod
+    def list_unfinished(db: Session):
+        return db.query(TransferJournal).filter(TransferJournal.state != 'done').order_by(
+            TransferJournal.id).all()
+
+    @staticmethod
+    def get_by_src(db: Session, download_hash: str, src: str):
+        return db.query(TransferJournal).filter(TransferJournal.download_hash == download_hash,
+                                                TransferJournal.src == src).first()
+
+    @staticmethod
+    def delete_by_hash(db: Session, download_hash: str):
+        db.query(TransferJournal).filter(TransferJournal.download_hash == download_hash).delete()
+        db.commit()
+
+    def update_state(self, db: Session, state: str, dest: str = None):
+        self.update(db, {
+            "state": state,
+            "dest": dest,
+            "date": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
+        })
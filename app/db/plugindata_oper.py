@@ -1,5 +1,5 @@
 import json
-from typing import Any
+from typing import Any, List, Tuple, Dict
 
 from app.db import DbOper
 from app.db.models import Base
@@ -31,6 +31,28 @@ class PluginDataOper(DbOper):
             plugin = PluginData(plugin_id=plugin_id, key=key, value=value)
             return plugin.create(self._db)
 
+    def save_batch(self, datas: List[Tuple[str, str, Any]]) -> int:
+        """
+        批量保存插件数据，已存在的数据会被覆盖，一次提交
+        :param datas: (插件id, 数据key, 数据值)列表
+        """
+        if not datas:
+            return 0
+        # 同一批中相同的key只保留最后一条
+        rows = {}
+        for plugin_id, key, value in datas:
+            if ObjectUtils.is_obj(value):
+                value = json.dumps(value)
+            rows[(plugin_id, key)] = {"plugin_id": plugin_id, "key": key, "value": value}
+        keys: Dict[str, List[str]] = {}
+        for plugin_id, key in rows.keys():
+            keys.setdefault(plugin_id, []).append(key)
+        with self.unit_of_work():
+            for plugin_id, plugin_keys in keys.items():
+                for i in range(0, len(plugin_keys), self._batch_size):
+                    PluginData.del_plugin_data_by_keys(self._db, plugin_id, plugin_keys[i:i + self._batch_size])
+            return self.bulk_insert(PluginData, list(rows.values()), commit=False)
+
     def get_data(self, plugin_id: str, key: str) -> Any:
         """
         获取插件数据
@@ -1,9 +1,10 @@
-from typing import List
+import json
+from typing import List, Set
 
 from sqlalchemy.orm import Session
 
 from app.db import DbOper
-from app.db.models.rss import Rss
+from app.db.models.rss import Rss, RssItem
 
 
 class RssOper(DbOper):
@@ -42,7 +43,8 @@ class RssOper(DbOper):
         """
         item = Rss.get(self._db, rssid)
         if item:
-            item.delete(self._db)
+            item.delete(self._db, rssid)
+            RssItem.delete_by_rssid(self._db, rssid)
             return True
         return False
 
@@ -55,3 +57,67 @@ class RssOper(DbOper):
             item.update(self._db, kwargs)
             return True
         return False
+
+    def reset_state(self, rssid: int) -> bool:
+        """
+        清除RSS响应缓存和已处理位置，下次刷新时重新解析全部条目
+        """
+        return self.update(rssid, etag="", last_modified="", last_guid="", last_pubdate=0)
+
+    def processed(self, rssid: int, items: List[dict]) -> Set[str]:
+        """
+        查询已处理过的条目
+        :param rssid: 订阅ID
+        :param items: RSS条目
+        :return: 已处理条目的GUID和标题
+        """
+        # 每批GUID和标题各一组参数，避免超出SQLite参数数量限制
+        batch = self._batch_size // 2
+        ret = set()
+        for i in range(0, len(items), batch):
+            chunk = items[i:i + batch]
+            for guid, title in RssItem.list_processed(self._db, rssid,
+                                                      guids=[item.get("guid") for item in chunk if item.get("guid")],
+                                                      titles=[item.get("title") for item in chunk]):
+                if guid:
+                    ret.add(guid)
+                if title:
+                    ret.add(title)
+        return ret
+
+    def season_episodes(self, rssid: int) -> Set[str]:
+        """
+        查询已处理过的季集
+        """
+        return {row.season_episode for row in RssItem.list_season_episodes(self._db, rssid)}
+
+    def add_processed(self, rssid: int, items: List[dict]) -> int:
+        """
+        记录已处理的条目
+        :param rssid: 订阅ID
+        :param items: 条目，包括guid、title、season_episode
+        """
+        rows = [{**item, "rssid": rssid} for item in items]
+        return self.bulk_upsert(RssItem, rows, index_elements=["rssid", "guid"],
+                                update_fields=["title", "season_episode"])
+
+    def import_note(self, rss: Rss) -> int:
+        """
+        将旧版本保存在附加信息中的已处理数据导入已处理条目表
+        """
+        if not rss.note:
+            return 0
+        try:
+            processed_data = json.loads(rss.note)
+        except ValueError:
+            processed_data = {}
+        titles = processed_data.get("titles") or []
+        season_episodes = processed_data.get("season_episodes") or []
+        # 标题和季集是成对记录的
+        rows = [{"rssid": rss.id, "guid": None, "title": title,
+                 "season_episode": season_episodes[i] if i < len(season_episodes) else None}
+                for i, title in enumerate(titles)]
+        with self.unit_of_work():
+            self.bulk_insert(RssItem, rows, commit=False)
+            rss.note = ""
+        return len(rows)
@@ -0,0 +1,98 @@
+import json
+import time
+import uuid
+from enum import Enum
+from typing import List, Optional, Any
+
+from sqlalchemy.orm import Session
+
+from app.core.context import Context
+from app.db import DbOper
+from app.db.models.searchresult import SearchResult, SearchResultItem
+
+
+class SearchResultOper(DbOper):
+    """
+    搜索结果管理
+    """
+    # 搜索结果保留时间（秒）
+    _ttl = 7 * 24 * 3600
+    # 每个用户保留的搜索次数
+    _keep = 5
+
+    def __init__(self, db: Session = None):
+        super().__init__(db)
+
+    @staticmethod
+    def __dumps(value: Any) -> Optional[str]:
+        if value is None:
+            return None
+        return json.dumps(value, ensure_ascii=False, separators=(",", ":"),
+                          default=lambda obj: obj.value if isinstance(obj, Enum) else str(obj))
+
+    @staticmethod
+    def __loads(value: Optional[str]) -> Any:
+        return json.loads(value) if value else None
+
+    def save(self, contexts: List[Context], userid: str = None) -> str:
+        """
+        保存一次搜索的结果，同时清理过期的搜索记录
+        :param contexts: 排序后的搜索结果
+        :param userid: 用户ID
+        :return: 搜索ID
+        """
+        search_id = uuid.uuid4().hex
+        userid = str(userid) if userid else None
+        mediainfo = next((context.media_info for context in contexts if context.media_info), None)
+        with self.unit_of_work():
+            self._db.add(SearchResult(search_id=search_id,
+                                      userid=userid,
+                                      created=int(time.time()),
+                                      title=mediainfo.title_year if mediainfo else None,
+                                      count=len(contexts),
+                                      media=self.__dumps(mediainfo.to_dict() if mediainfo else None)))
+            self.bulk_insert(SearchResultItem, [{
+                "search_id": search_id,
+                "seq": seq,
+                "meta": self.__dumps(context.meta_info.to_dict() if context.meta_info else None),
+                "torrent": self.__dumps(context.torrent_info.to_dict() if context.torrent_info else None)
+            } for seq, context in enumerate(contexts)], commit=False)
+        self.evict(userid)
+        return search_id
+
+    def evict(self, userid: str = None):
+        """
+        清理过期和超出保留数量的搜索记录
+        """
+        search_ids = SearchResult.list_expired(self._db, before=int(time.time()) - self._ttl,
+                                               keep=self._keep, userid=userid)
+        for i in range(0, len(search_ids), self._batch_size):
+            SearchResult.delete_by_search_ids(self._db, search_ids[i:i + self._batch_size])
+
+    def get_last(self, userid: str = None) -> Optional[SearchResult]:
+        """
+        查询用户最近一次搜索
+        """
+        return SearchResult.get_last(self._db, str(userid) if userid else None)
+
+    def get(self, search_id: str, userid: str = None) -> Optional[SearchResult]:
+        """
+        按搜索ID查询用户的搜索记录，不能查询其他用户的搜索
+        """
+        return SearchResult.get_by_search_id(self._db, search_id, str(userid) if userid else None)
+
+    def list_items(self, search: SearchResult, page: int = None, count: int = 30) -> List[dict]:
+        """
+        查询搜索结果，返回与Context.to_dict()相同结构的字典
+        :param search: 搜索记录
+        :param page: 页码，为空时返回全部
+        :param count: 每页数量
+        """
+        if not search:
+            return []
+        media = self.__loads(search.media)
+        return [{
+            "meta_info": self.__loads(item.meta),
+            "torrent_info": self.__loads(item.torrent),
+            "media_info": media
+        } for item in SearchResultItem.list_by_page(self._db, search.search_id, page, count)]
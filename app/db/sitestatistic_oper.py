@@ -0,0 +1,117 @@
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.db import DbOper
+from app.db.models.sitestatistic import SiteStatisticPoint, SiteStatisticDaily
+
+
+class SiteStatisticOper(DbOper):
+    """
+    站点数据统计管理
+    """
+
+    # 记录的数据项
+    _fields = ["username", "user_level", "upload", "download", "ratio",
+               "seeding", "seeding_size", "bonus"]
+
+    def __init__(self, db: Session = None):
+        super().__init__(db)
+
+    @staticmethod
+    def __to_dict(row) -> dict:
+        """
+        查询结果转为字典
+        """
+        if hasattr(row, "_asdict"):
+            data = row._asdict()
+        else:
+            data = row.to_dict()
+        data.pop("id", None)
+        return data
+
+    def add_points(self, datas: Dict[str, dict], ts: int = None) -> int:
+        """
+        记录一次刷新的站点数据，同时更新当天的汇总数据
+        :param datas: 站点名称 -> 站点数据，有错误信息的站点不记录
+        :param ts: 时间戳，默认为当前时间
+        :return: 记录数量
+        """
+        if not ts:
+            ts = int(time.time())
+        day = datetime.fromtimestamp(ts).strftime("%Y-%m-%d")
+        points = []
+        for site, data in datas.items():
+            if not data or data.get("err_msg"):
+                continue
+            point = {field: data.get(field) for field in self._fields}
+            point.update({"site": site, "ts": ts})
+            points.append(point)
+        if not points:
+            return 0
+        with self.unit_of_work():
+            self.bulk_insert(SiteStatisticPoint, points, commit=False)
+            self.bulk_upsert(SiteStatisticDaily, [{**point, "day": day} for point in points],
+                             index_elements=["site", "day"], commit=False)
+        return len(points)
+
+    def latest(self) -> Dict[str, dict]:
+        """
+        每个站点的最新数据
+        """
+        return {row.site: self.__to_dict(row) for row in SiteStatisticPoint.list_latest(self._db)}
+
+    def last_ts(self, before: int = None) -> Optional[int]:
+        """
+        最后一次记录的时间
+        :param before: 只查找该时间之前的记录
+        """
+        return SiteStatisticPoint.last_ts(self._db, before)
+
+    def deltas(self, start: int, end: int = None) -> Dict[str, dict]:
+        """
+        每个站点在时间范围内的增量
+        :param start: 开始时间戳
+        :param end: 结束时间戳，默认为最新数据
+        """
+        return {row.site: self.__to_dict(row) for row in SiteStatisticPoint.list_deltas(self._db, start, end)}
+
+    def range(self, site: str = None, start: int = None, end: int = None,
+              period: str = "day") -> List[dict]:
+        """
+        按时间范围查询站点数据
+        :param site: 站点名称，为空时查询全部站点
+        :param start: 开始时间戳
+        :param end: 结束时间戳
+        :param period: 粒度，raw 每次刷新的数据，day 每天，week 每周
+        """
+        if period == "raw":
+            rows = SiteStatisticPoint.list_by_range(self._db, site, start, end)
+            return [self.__to_dict(row) for row in rows]
+        start_day = datetime.fromtimestamp(start).strftime("%Y-%m-%d") if start else None
+        end_day = datetime.fromtimestamp(end).strftime("%Y-%m-%d") if end else None
+        if period == "week":
+            rows = SiteStatisticDaily.list_weekly(self._db, site, start_day, end_day)
+        else:
+            rows = SiteStatisticDaily.list_by_range(self._db, site, start_day, end_day)
+        return [self.__to_dict(row) for row in rows]
+
+    def import_daily(self, day: str, datas: Dict[str, dict]) -> int:
+        """
+        导入按天保存的历史数据，时间记为当天最后一秒，已存在的数据不覆盖
+        """
+        try:
+            ts = int(datetime.strptime(day, "%Y-%m-%d").replace(hour=23, minute=59, second=59).timestamp())
+        except ValueError:
+            return 0
+        if SiteStatisticDaily.list_by_range(self._db, start=day, end=day):
+            return 0
+        return self.add_points(datas, ts)
+
+    def prune(self, days: int) -> None:
+        """
+        清理指定天数之前的明细数据，按天汇总的数据保留
+        """
+        SiteStatisticPoint.delete_before(self._db, int(time.time()) - days * 24 * 3600)
@@ -3,6 +3,7 @@ from typing import Tuple, List
 from app.core.context import MediaInfo
 from app.db import DbOper
 from app.db.models.subscribe import Subscribe
+from app.db.models.subscribestate import SubscribeState
 
 
 class SubscribeOper(DbOper):
@@ -60,6 +61,22 @@ class SubscribeOper(DbOper):
         删除订阅
         """
         Subscribe.delete(self._db, rid=sid)
+        SubscribeState.delete_by_subscribe(self._db, sid)
+
+    def delete_by_tmdbid(self, tmdbid: int, season: int = None):
+        """
+        按TMDBID删除订阅
+        """
+        for subscribe in Subscribe.get_by_tmdbid(self._db, tmdbid, season):
+            self.delete(subscribe.id)
+
+    def delete_by_doubanid(self, doubanid: str):
+        """
+        按豆瓣ID删除订阅
+        """
+        subscribe = Subscribe.get_by_doubanid(self._db, doubanid)
+        if subscribe:
+            self.delete(subscribe.id)
 
     def update(self, sid: int, payload: dict):
         """
@@ -0,0 +1,125 @@
+import json
+import time
+from typing import Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.core.context import MediaInfo
+from app.db import DbOper
+from app.db.models.subscribe import Subscribe
+from app.db.models.subscribestate import SubscribeState
+from app.schemas import NotExistMediaInfo
+
+
+class SubscribeStateOper(DbOper):
+    """
+    订阅状态快照管理
+    - 媒体信息超过SUBSCRIBE_MEDIA_TTL后重新识别
+    - 媒体库缺失情况超过SUBSCRIBE_EXISTS_TTL，或有转移完成、媒体服务器入库删除通知时重新查询
+    """
+
+    def __get(self, subscribe: Subscribe) -> Optional[SubscribeState]:
+        """
+        查询订阅的快照，订阅的TMDBID或季有变化时视为无效
+        """
+        state = SubscribeState.get_by_subscribe(self._db, subscribe.id)
+        if not state:
+            return None
+        if state.tmdbid != subscribe.tmdbid or state.season != subscribe.season:
+            return None
+        return state
+
+    def __get_or_create(self, subscribe: Subscribe) -> SubscribeState:
+        state = SubscribeState.get_by_subscribe(self._db, subscribe.id)
+        if state and (state.tmdbid != subscribe.tmdbid or state.season != subscribe.season):
+            SubscribeState.delete_by_subscribe(self._db, subscribe.id)
+            state = None
+        if not state:
+            state = SubscribeState(subscribe_id=subscribe.id,
+                                   tmdbid=subscribe.tmdbid,
+                                   season=subscribe.season).create(self._db)
+        return state
+
+    def get_mediainfo(self, subscribe: Subscribe) -> Optional[MediaInfo]:
+        """
+        获取快照中的媒体信息，过期返回None
+        """
+        if not settings.SUBSCRIBE_MEDIA_TTL:
+            return None
+        state = self.__get(subscribe)
+        if not state or not state.mediainfo or not state.media_time:
+            return None
+        if time.time() - state.media_time > settings.SUBSCRIBE_MEDIA_TTL * 3600:
+            return None
+        mediainfo = MediaInfo()
+        mediainfo.from_dict(json.loads(state.mediainfo))
+        # JSON的键都是字符串，还原为季号
+        mediainfo.seasons = {int(k): v for k, v in (mediainfo.seasons or {}).items()}
+        mediainfo.season_years = {int(k): v for k, v in (mediainfo.season_years or {}).items()}
+        return mediainfo
+
+    def save_mediainfo(self, subscribe: Subscribe, mediainfo: MediaInfo):
+        """
+        保存媒体信息到快照，不保存TMDB和豆瓣的原始数据
+        """
+        if not settings.SUBSCRIBE_MEDIA_TTL:
+            return
+        data = mediainfo.to_dict()
+        for key in ["tmdb_info", "douban_info", "detail_link", "title_year"]:
+            data.pop(key, None)
+        state = self.__get_or_create(subscribe)
+        state.update(self._db, {
+            "mediainfo": json.dumps(data),
+            "media_time": time.time()
+        })
+
+    def get_no_exists(self, subscribe: Subscribe
+                      ) -> Optional[Tuple[bool, Dict[int, Dict[int, NotExistMediaInfo]]]]:
+        """
+        获取快照中的媒体库缺失情况，过期或已失效返回None
+        :return: 媒体库中是否已存在，缺失的季集信息
+        """
+        if not settings.SUBSCRIBE_EXISTS_TTL:
+            return None
+        state = self.__get(subscribe)
+        if not state or not state.exists_time:
+            return None
+        if time.time() - state.exists_time > settings.SUBSCRIBE_EXISTS_TTL * 3600:
+            return None
+        no_exists = {
+            int(tmdbid): {
+                int(season): NotExistMediaInfo(**info) for season, info in seasons.items()
+            } for tmdbid, seasons in json.loads(state.no_exists or "{}").items()
+        }
+        return bool(state.exist_flag), no_exists
+
+    def save_no_exists(self, subscribe: Subscribe, exist_flag: bool,
+                       no_exists: Dict[int, Dict[int, NotExistMediaInfo]]):
+        """
+        保存媒体库缺失情况到快照
+        """
+        if not settings.SUBSCRIBE_EXISTS_TTL:
+            return
+        data = {
+            tmdbid: {
+                season: info.dict() for season, info in seasons.items()
+            } for tmdbid, seasons in (no_exists or {}).items()
+        }
+        state = self.__get_or_create(subscribe)
+        state.update(self._db, {
+            "exist_flag": 1 if exist_flag else 0,
+            "no_exists": json.dumps(data),
+            "exists_time": time.time()
+        })
+
+    def expire_exists(self, tmdbid: int = None):
+        """
+        媒体库发生变化，使缺失情况失效
+        :param tmdbid: 为空时全部失效
+        """
+        SubscribeState.expire_exists(self._db, tmdbid=tmdbid)
+
+    def delete(self, sid: int):
+        """
+        删除订阅的快照
+        """
+        SubscribeState.delete_by_subscribe(self._db, sid)
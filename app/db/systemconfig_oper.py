@@ -1,10 +1,15 @@
 import json
-from typing import Any, Union
+import sqlite3
+import threading
+import time
+from typing import Any, Union, Callable, Dict, List, Optional, Tuple
 
 from sqlalchemy.orm import Session
 
+from app.core.config import settings
 from app.db import DbOper
 from app.db.models.systemconfig import SystemConfig
+from app.log import logger
 from app.schemas.types import SystemConfigKey
 from app.utils.object import ObjectUtils
 from app.utils.singleton import Singleton
@@ -13,17 +18,142 @@ from app.utils.singleton import Singleton
 class SystemConfigOper(DbOper, metaclass=Singleton):
     # 配置对象
     __SYSTEMCONF: dict = {}
+    # 检查其它进程修改的最小间隔（秒）
+    _check_interval = 2
+    # 配置版本计数，每次写入配置时在数据库中加1，用于检测其它进程的修改
+    _version_key = "_SystemConfigVersion"
 
     def __init__(self, db: Session = None):
         """
         加载配置到内存
         """
         super().__init__(db)
+        self._lock = threading.RLock()
+        # 配置版本，每次配置变化时加1
+        self._version = 0
+        # 变化回调：(回调函数, 关注的配置项)
+        self._callbacks: List[Tuple[Callable[[str, Any], None], Optional[set]]] = []
+        # 用于检测配置变化的独立连接，只查询版本计数，其它表的写入不会触发重新加载
+        self._watch_conn: Optional[sqlite3.Connection] = None
+        self._data_version = None
+        self._last_check = time.monotonic()
         for item in SystemConfig.list(self._db):
-            if ObjectUtils.is_obj(item.value):
-                self.__SYSTEMCONF[item.key] = json.loads(item.value)
-            else:
-                self.__SYSTEMCONF[item.key] = item.value
+            if item.key == self._version_key:
+                continue
+            self.__SYSTEMCONF[item.key] = self.__load_value(item.value)
+        self._data_version = self.__get_data_version()
+
+    @staticmethod
+    def __load_value(value: Any) -> Any:
+        if ObjectUtils.is_obj(value):
+            return json.loads(value)
+        return value
+
+    @property
+    def version(self) -> int:
+        """
+        配置版本，可用于判断缓存的配置是否需要更新
+        """
+        self.__check()
+        return self._version
+
+    def register(self, callback: Callable[[str, Any], None],
+                 keys: List[Union[str, SystemConfigKey]] = None):
+        """
+        注册配置变化回调，本进程设置或检测到其它进程修改时调用
+        :param callback: 回调函数，参数为配置项和新的值
+        :param keys: 关注的配置项，为空时所有配置变化都回调
+        """
+        if keys:
+            keys = {key.value if isinstance(key, SystemConfigKey) else key for key in keys}
+        with self._lock:
+            self._callbacks.append((callback, keys or None))
+
+    def unregister(self, callback: Callable[[str, Any], None]):
+        """
+        取消配置变化回调
+        """
+        with self._lock:
+            self._callbacks = [item for item in self._callbacks if item[0] != callback]
+
+    def __notify(self, key: str, value: Any):
+        """
+        配置变化，更新版本并调用回调
+        """
+        self._version += 1
+        for callback, keys in list(self._callbacks):
+            if keys and key not in keys:
+                continue
+            try:
+                callback(key, value)
+            except Exception as e:
+                logger.error(f"配置 {key} 变化回调出错：{str(e)}")
+
+    def __get_data_version(self) -> Optional[str]:
+        """
+        查询数据库中的配置版本计数，任何进程写入配置后会变化
+        """
+        try:
+            if not self._watch_conn:
+                self._watch_conn = sqlite3.connect(settings.CONFIG_PATH / "user.db",
+                                                   timeout=settings.DB_BUSY_TIMEOUT,
+                                                   check_same_thread=False)
+            row = self._watch_conn.execute("SELECT value FROM systemconfig WHERE key = ?",
+                                           (self._version_key,)).fetchone()
+            return row[0] if row else ""
+        except Exception as e:
+            logger.debug(f"查询配置版本失败：{str(e)}")
+            return None
+
+    def __increase_data_version(self):
+        """
+        写入配置后增加数据库中的配置版本计数
+        """
+        try:
+            version = SystemConfig.increase(self._db, self._version_key)
+        except Exception as e:
+            logger.debug(f"更新配置版本失败：{str(e)}")
+            return
+        # 期间没有其它进程写入时记录为已同步，否则留待下次检查时重新加载
+        if str(version - 1) == str(self._data_version or 0):
+            self._data_version = str(version)
+
+    def __check(self):
+        """
+        检查数据库是否有变化，有变化时重新加载配置，按间隔节流
+        """
+        now = time.monotonic()
+        if now - self._last_check < self._check_interval:
+            return
+        with self._lock:
+            if now - self._last_check < self._check_interval:
+                return
+            self._last_check = now
+            data_version = self.__get_data_version()
+            if data_version is None or data_version == self._data_version:
+                return
+            self._data_version = data_version
+            self.reload()
+
+    def reload(self):
+        """
+        从数据库重新加载配置，对变化的配置项调用回调
+        """
+        with self._lock:
+            values: Dict[str, Any] = {}
+            for key, value in SystemConfig.list_values(self._db):
+                if key == self._version_key:
+                    continue
+                try:
+                    values[key] = self.__load_value(value)
+                except ValueError:
+                    values[key] = value
+            changed = [key for key in set(values.keys()) | set(self.__SYSTEMCONF.keys())
+                       if values.get(key) != self.__SYSTEMCONF.get(key)]
+            # 整体替换，避免其它线程读取到不完整的配置
+            self.__SYSTEMCONF = values
+            for key in changed:
+                self.__notify(key, values.get(key))
 
     def set(self, key: Union[str, SystemConfigKey], value: Any):
         """
@@ -31,25 +161,29 @@ class SystemConfigOper(DbOper, metaclass=Singleton):
         """
         if isinstance(key, SystemConfigKey):
             key = key.value
-        # 更新内存
-        self.__SYSTEMCONF[key] = value
-        # 写入数据库
-        if ObjectUtils.is_obj(value):
-            if value is not None:
-                value = json.dumps(value)
+        with self._lock:
+            # 更新内存
+            self.__SYSTEMCONF[key] = value
+            # 写入数据库
+            if ObjectUtils.is_obj(value):
+                if value is not None:
+                    value = json.dumps(value)
+                else:
+                    value = ''
+            conf = SystemConfig.get_by_key(self._db, key)
+            if conf:
+                conf.update(self._db, {"value": value})
             else:
-                value = ''
-        conf = SystemConfig.get_by_key(self._db, key)
-        if conf:
-            conf.update(self._db, {"value": value})
-        else:
-            conf = SystemConfig(key=key, value=value)
-            conf.create(self._db)
+                conf = SystemConfig(key=key, value=value)
+                conf.create(self._db)
+            self.__increase_data_version()
+            self.__notify(key, self.__SYSTEMCONF[key])
 
     def get(self, key: Union[str, SystemConfigKey] = None):
         """
         获取系统设置
         """
+        self.__check()
         if isinstance(key, SystemConfigKey):
             key = key.value
         if not key:
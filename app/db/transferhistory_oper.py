@@ -1,5 +1,5 @@
 import time
-from typing import Any
+from typing import Any, List, Tuple
 
 from app.db import DbOper
 from app.db.models.transferhistory import TransferHistory
@@ -31,6 +31,13 @@ class TransferHistoryOper(DbOper):
         """
         return TransferHistory.get_by_src(self._db, src)
 
+    def list_paths_by_mode(self, mode: str) -> List[Tuple[str, str]]:
+        """
+        查询指定转移模式下转移成功的源路径和目标路径
+        :param mode: 转移模式
+        """
+        return [(item.src, item.dest) for item in TransferHistory.list_paths_by_mode(self._db, mode)]
+
     def add(self, **kwargs):
         """
         新增转移历史
@@ -79,3 +86,17 @@ class TransferHistoryOper(DbOper):
             if transferhistory:
                 transferhistory.delete(self._db, transferhistory.id)
         return TransferHistory(**kwargs).create(self._db)
+
+    def add_force_batch(self, histories: List[dict]) -> int:
+        """
+        批量新增转移历史，相同源目录的记录会被删除，一次提交
+        """
+        if not histories:
+            return 0
+        # 同一批中相同源目录只保留最后一条
+        histories = list({history.get("src"): history for history in histories}.values())
+        with self.unit_of_work():
+            srcs = [history.get("src") for history in histories if history.get("src")]
+            for i in range(0, len(srcs), self._batch_size):
+                TransferHistory.delete_by_srcs(self._db, srcs[i:i + self._batch_size])
+            return self.bulk_insert(TransferHistory, histories, commit=False)
@@ -0,0 +1,68 @@
+import time
+from pathlib import Path
+from typing import List, Optional
+
+from app.db import DbOper
+from app.db.models.transferjournal import TransferJournal
+
+
+class TransferJournalOper(DbOper):
+    """
+    转移日志管理，先写日志再执行转移，进程中断后据此恢复
+    """
+
+    def plan(self, download_hash: str, torrent_title: str, src: Path, mode: str,
+             mtype: str = None, tmdbid: int = None, meta_title: str = None) -> TransferJournal:
+        """
+        登记一个待转移路径，已存在时复用原记录
+        """
+        journal = TransferJournal.get_by_src(self._db, download_hash, str(src))
+        if journal:
+            return journal
+        return TransferJournal(download_hash=download_hash,
+                               torrent_title=torrent_title,
+                               src=str(src),
+                               mode=mode,
+                               type=mtype,
+                               tmdbid=tmdbid,
+                               meta_title=meta_title,
+                               state='planned',
+                               date=time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())).create(self._db)
+
+    def start(self, journal: TransferJournal, dest: Optional[Path] = None):
+        """
+        标记为转移中
+        :param dest: 目的目录，中断后只在该目录下清理残留的临时文件
+        """
+        journal.update_state(self._db, 'running', dest=str(dest) if dest else None)
+
+    def finish(self, journal: TransferJournal, dest: Optional[Path] = None):
+        """
+        标记为已完成
+        """
+        journal.update_state(self._db, 'done', dest=str(dest) if dest else None)
+
+    def list_unfinished(self) -> List[TransferJournal]:
+        """
+        查询未完成的转移日志
+        """
+        return TransferJournal.list_unfinished(self._db)
+
+    def list_by_hash(self, download_hash: str) -> List[TransferJournal]:
+        """
+        查询种子的所有转移日志
+        """
+        return TransferJournal.list_by_hash(self._db, download_hash)
+
+    def is_done(self, download_hash: str) -> bool:
+        """
+        种子的所有路径是否均已转移完成
+        """
+        journals = self.list_by_hash(download_hash)
+        return bool(journals) and all(journal.state == 'done' for journal in journals)
+
+    def clear(self, download_hash: str):
+        """
+        种子转移完成后清理日志
+        """
+        TransferJournal.delete_by_hash(self._db, download_hash)
@@ -0,0 +1,137 @@
+import hashlib
+import mmap
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+from app.db.filestate_oper import FileStateOper
+from app.log import logger
+from app.utils.singleton import Singleton
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+try:
+    import blake3
+except ImportError:
+    blake3 = None
+
+
+class ChecksumHelper(metaclass=Singleton):
+    """
+    媒体文件校验，按块读取计算摘要，多个文件并行计算
+    - 优先使用xxhash，其次BLAKE3，都未安装时使用标准库的BLAKE2
+    - 按(设备号, inode, 大小, 修改时间)缓存摘要，文件未变化时不重复计算；摘要同时保存到数据库，重启后仍可复用
+    """
+    # 每次读取的块大小
+    _chunk_size = 8 * 1024 * 1024
+    # 缓存的摘要数量上限
+    _cache_size = 10000
+    # 并行计算的线程数
+    _workers = 4
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (设备号, inode, 大小, 修改时间) -> 摘要
+        self._cache: OrderedDict = OrderedDict()
+        self._executor = ThreadPoolExecutor(max_workers=self._workers)
+
+    @property
+    def algorithm(self) -> str:
+        """
+        当前使用的摘要算法
+        """
+        if xxhash:
+            return "xxh3_128"
+        if blake3:
+            return "blake3"
+        return "blake2b"
+
+    @staticmethod
+    def __new_hasher():
+        if xxhash:
+            return xxhash.xxh3_128()
+        if blake3:
+            return blake3.blake3()
+        return hashlib.blake2b()
+
+    @staticmethod
+    def __cache_key(st: os.stat_result) -> Tuple[int, int, int, float]:
+        return st.st_dev, st.st_ino, st.st_size, st.st_mtime
+
+    def __hash_file(self, path: Path, st: os.stat_result) -> str:
+        """
+        按块计算文件摘要，使用mmap避免大文件读取时的内存拷贝
+        """
+        hasher = self.__new_hasher()
+        with open(path, "rb") as f:
+            if st.st_size:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    # 切片memoryview不会复制数据
+                    with memoryview(mm) as view:
+                        for offset in range(0, len(view), self._chunk_size):
+                            hasher.update(view[offset:offset + self._chunk_size])
+        return hasher.hexdigest()
+
+    def __load_digest(self, st: os.stat_result) -> Optional[str]:
+        """
+        查询已保存的摘要，算法变化后不再使用
+        """
+        try:
+            value = FileStateOper().get_digest(st.st_dev, st.st_ino, st.st_size, st.st_mtime)
+        except Exception as err:
+            logger.debug(f"查询文件摘要失败：{err}")
+            return None
+        if not value or not value.startswith(f"{self.algorithm}:"):
+            return None
+        return value.split(":", 1)[1]
+
+    def __save_digest(self, path: Path, st: os.stat_result, value: str):
+        """
+        保存摘要，保存失败不影响本次校验
+        """
+        try:
+            FileStateOper().save_digest(str(path), st.st_dev, st.st_ino, st.st_size, st.st_mtime,
+                                        f"{self.algorithm}:{value}")
+        except Exception as err:
+            logger.debug(f"保存文件 {path} 摘要失败：{err}")
+
+    def digest(self, path: Union[str, Path]) -> Optional[str]:
+        """
+        计算单个文件的摘要，文件不存在或读取失败时返回None
+        """
+        path = Path(path)
+        try:
+            st = path.stat()
+        except OSError:
+            return None
+        key = self.__cache_key(st)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+        value = self.__load_digest(st)
+        if not value:
+            try:
+                value = self.__hash_file(path, st)
+            except (OSError, ValueError) as err:
+                logger.error(f"计算文件 {path} 摘要失败：{err}")
+                return None
+            self.__save_digest(path, st, value)
+        with self._lock:
+            self._cache[key] = value
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        return value
+
+    def digests(self, paths: List[Union[str, Path]]) -> Dict[str, Optional[str]]:
+        """
+        并行计算多个文件的摘要
+        """
+        paths = [str(path) for path in paths]
+        return dict(zip(paths, self._executor.map(self.digest, paths)))
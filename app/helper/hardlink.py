@@ -0,0 +1,288 @@
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Set, Tuple, Optional, Union
+
+from app.core.config import settings
+from app.db.filestate_oper import FileStateOper, FileStat
+from app.db.systemconfig_oper import SystemConfigOper
+from app.db.transferhistory_oper import TransferHistoryOper
+from app.log import logger
+from app.schemas.types import SystemConfigKey
+from app.utils.singleton import Singleton
+from app.utils.system import SystemUtils
+
+
+class HardLinkHelper(metaclass=Singleton):
+    """
+    硬链接索引，按设备号和inode记录下载目录与媒体库中共享同一数据的文件
+    索引由目录扫描和文件转移增量建立，查询时不需要遍历目录
+    """
+    # 转移登记的文件单独保存，不与目录监控扫描的索引根目录混用
+    _root_prefix = "hardlink:"
+    # 补充登记时每批处理的文件数量
+    _batch_size = 500
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (设备号, inode) -> 路径集合
+        self._inodes: Dict[Tuple[int, int], Set[str]] = {}
+        # 路径 -> (设备号, inode, 大小)
+        self._files: Dict[str, Tuple[int, int, int]] = {}
+        self._loaded = False
+
+    def __load(self):
+        """
+        首次使用时从数据库加载索引
+        """
+        if self._loaded:
+            return
+        for path, stat in FileStateOper().load_files().items():
+            self.__put(path, stat)
+        self._loaded = True
+        logger.info(f"硬链接索引加载完成，共 {len(self._files)} 个文件")
+
+    def __put(self, path: str, stat: FileStat):
+        """
+        记录一个文件
+        """
+        self.__pop(path)
+        key = (stat[4], stat[3])
+        self._files[path] = (stat[4], stat[3], stat[1])
+        self._inodes.setdefault(key, set()).add(path)
+
+    def __pop(self, path: str):
+        """
+        移除一个文件
+        """
+        old = self._files.pop(path, None)
+        if not old:
+            return
+        paths = self._inodes.get(old[:2])
+        if paths:
+            paths.discard(path)
+            if not paths:
+                del self._inodes[old[:2]]
+
+    @staticmethod
+    def __stat(path: str) -> Optional[FileStat]:
+        try:
+            st = os.stat(path)
+            return 0, st.st_size, st.st_mtime, st.st_ino, st.st_dev
+        except OSError:
+            return None
+
+    @staticmethod
+    def __get_root(path: str) -> str:
+        """
+        查找文件所属的下载目录或媒体库目录，作为索引的根目录（加前缀）
+        """
+        roots = [settings.DOWNLOAD_PATH, settings.DOWNLOAD_MOVIE_PATH,
+                 settings.DOWNLOAD_TV_PATH, settings.DOWNLOAD_ANIME_PATH]
+        roots.extend(str(settings.LIBRARY_PATH or "").split(","))
+        matched = ""
+        for root in roots:
+            if not root:
+                continue
+            root = str(Path(root))
+            if path.startswith(root + os.sep) and len(root) > len(matched):
+                matched = root
+        return HardLinkHelper._root_prefix + (matched or os.path.dirname(path))
+
+    @staticmethod
+    def __library_roots() -> List[str]:
+        return [str(Path(path)) for path in str(settings.LIBRARY_PATH or "").split(",") if path]
+
+    def update(self, changed: Dict[str, FileStat], removed: List[str] = None):
+        """
+        目录扫描结果同步到索引（扫描方已持久化）
+        """
+        with self._lock:
+            if not self._loaded:
+                return
+            for path, stat in changed.items():
+                if not stat[0]:
+                    self.__put(path, stat)
+            for path in removed or []:
+                self.__pop(path)
+
+    def add_paths(self, paths: List[Union[str, Path]]):
+        """
+        登记文件（如转移完成后的源文件和目的文件），并持久化
+        """
+        roots: Dict[str, Dict[str, FileStat]] = {}
+        with self._lock:
+            self.__load()
+            for path in paths:
+                path = str(path)
+                stat = self.__stat(path)
+                if not stat:
+                    continue
+                self.__put(path, stat)
+                roots.setdefault(self.__get_root(path), {})[path] = stat
+        oper = FileStateOper()
+        for root, changed in roots.items():
+            oper.save(root, changed)
+
+    def remove_paths(self, paths: List[Union[str, Path]]):
+        """
+        文件删除后从索引中移除
+        """
+        roots: Dict[str, List[str]] = {}
+        with self._lock:
+            self.__load()
+            for path in paths:
+                path = str(path)
+                if path not in self._files:
+                    continue
+                self.__pop(path)
+                roots.setdefault(self.__get_root(path), []).append(path)
+        oper = FileStateOper()
+        for root, removed in roots.items():
+            oper.save(root, {}, removed)
+
+    def get_links(self, path: Union[str, Path]) -> Set[str]:
+        """
+        查询与该文件共享同一inode的所有已知路径（包括自身）
+        """
+        path = str(path)
+        with self._lock:
+            self.__load()
+            stat = self._files.get(path)
+            if not stat:
+                return set()
+            return set(self._inodes.get(stat[:2]) or [])
+
+    def is_linked_to_library(self, path: Union[str, Path], exclude: List[Union[str, Path]] = None) -> bool:
+        """
+        下载文件是否仍有硬链接在媒体库中，按设备号和inode核对，已删除或已被替换的链接顺便更新索引
+        :param path: 下载文件路径
+        :param exclude: 不计入的路径，如即将删除的媒体库文件
+        """
+        path = str(path)
+        # 按下载文件当前的inode查询，下载文件已删除时使用索引中的inode
+        current = self.__stat(path)
+        with self._lock:
+            self.__load()
+            stat = self._files.get(path)
+            key = (current[4], current[3]) if current else (stat[:2] if stat else None)
+            if not key:
+                return False
+            links = set(self._inodes.get(key) or [])
+        excludes = {str(p) for p in exclude or []}
+        library_roots = self.__library_roots()
+        linked = False
+        missing, changed = [], []
+        for link in links:
+            if link == path or link in excludes:
+                continue
+            if not any(link.startswith(root + os.sep) for root in library_roots):
+                continue
+            link_stat = self.__stat(link)
+            if not link_stat:
+                missing.append(link)
+            elif (link_stat[4], link_stat[3]) != key:
+                # 同一路径已是另一个文件（如洗版替换）
+                changed.append(link)
+            else:
+                linked = True
+        self.__remove_missing(missing)
+        if changed:
+            self.add_paths(changed)
+        return linked
+
+    def __remove_missing(self, paths: List[str]):
+        """
+        从索引中删除已不存在的文件，包括目录扫描登记的记录
+        """
+        if not paths:
+            return
+        with self._lock:
+            for path in paths:
+                self.__pop(path)
+        FileStateOper().remove(paths)
+
+    def backfill(self):
+        """
+        从转移历史补充登记硬链接模式转移的文件，只执行一次，用于建立索引前已转移的文件
+        """
+        if SystemConfigOper().get(SystemConfigKey.HardLinkBackfill):
+            return
+        logger.info("开始从转移历史补充登记硬链接索引 ...")
+        paths = set()
+        for src, dest in TransferHistoryOper().list_paths_by_mode("link"):
+            for path in [src, dest]:
+                if not path:
+                    continue
+                path = Path(path)
+                if path.is_file():
+                    paths.add(str(path))
+                elif path.is_dir():
+                    paths.update(str(file) for file in SystemUtils.list_files(path, settings.RMT_MEDIAEXT))
+        paths = list(paths)
+        for i in range(0, len(paths), self._batch_size):
+            self.add_paths(paths[i:i + self._batch_size])
+        SystemConfigOper().set(SystemConfigKey.HardLinkBackfill, int(time.time()))
+        logger.info(f"硬链接索引补充登记完成，共 {len(paths)} 个文件")
+
+    def prune(self):
+        """
+        删除索引中已不存在的文件
+        """
+        with self._lock:
+            self.__load()
+            paths = list(self._files.keys())
+        missing = [path for path in paths if not os.path.exists(path)]
+        if not missing:
+            return
+        self.__remove_missing(missing)
+        logger.info(f"已从硬链接索引中删除 {len(missing)} 个不存在的文件")
+
+    def maintain(self):
+        """
+        定时维护：首次运行时从转移历史补充登记，之后删除已不存在的文件
+        """
+        try:
+            self.backfill()
+            self.prune()
+        except Exception as e:
+            logger.error(f"硬链接索引维护出错：{str(e)}")
+
+    def reclaimable_size(self, paths: List[Union[str, Path]]) -> int:
+        """
+        删除这些文件后可以释放的空间：同一inode的所有链接都在删除范围内时才会释放
+        """
+        targets = {str(p) for p in paths}
+        counted = set()
+        total = 0
+        with self._lock:
+            self.__load()
+            for path in targets:
+                stat = self._files.get(path)
+                if not stat:
+                    # 不在索引中的文件，没有其它硬链接时可以释放
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    if (st.st_dev, st.st_ino) in counted:
+                        continue
+                    counted.add((st.st_dev, st.st_ino))
+                    if st.st_nlink <= 1:
+                        total += st.st_size
+                    continue
+                if stat[:2] in counted:
+                    continue
+                counted.add(stat[:2])
+                links = self._inodes.get(stat[:2]) or set()
+                if not links.issubset(targets):
+                    continue
+                # 索引外还有链接时不能释放
+                try:
+                    if os.stat(path).st_nlink > len(links):
+                        continue
+                except OSError:
+                    continue
+                total += stat[2]
+        return total
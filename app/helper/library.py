@@ -0,0 +1,245 @@
+import json
+import threading
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+from app.core.config import settings
+from app.core.context import MediaInfo
+from app.db import SessionLocal
+from app.db.models.mediaserver import MediaServerItem
+from app.log import logger
+from app.schemas import ExistMediaInfo
+from app.schemas.types import MediaType
+from app.utils.singleton import Singleton
+
+
+class LibraryHelper(metaclass=Singleton):
+    """
+    媒体库内存索引，由同步到本地的媒体服务器数据建立，用于快速判断媒体是否已入库
+    - TMDBID -> 季 -> 集位图，没有TMDBID时按标题、年份查找
+    - 媒体服务器同步、整理入库时更新，开启媒体服务器同步后代替媒体服务器的实时查询
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._loaded = False
+        # 项目ID -> (类型, TMDBID, 标题, 年份, 季 -> 集位图)
+        self._items: Dict[str, Tuple[str, Optional[int], str, str, Dict[int, int]]] = {}
+        # (类型, TMDBID) -> 项目ID
+        self._tmdb_index: Dict[Tuple[str, int], Set[str]] = {}
+        # (类型, 标题, 年份) -> 项目ID
+        self._title_index: Dict[Tuple[str, str, str], Set[str]] = {}
+        # 已整理入库但媒体服务器尚未同步的季集：(类型, TMDBID) -> 季 -> 集位图
+        self._transferred: Dict[Tuple[str, int], Dict[int, int]] = {}
+        # 登记时间：(类型, TMDBID) -> 时间戳，同步完成后移除同步开始前登记的数据
+        self._transferred_time: Dict[Tuple[str, int], float] = {}
+
+    @property
+    def ready(self) -> bool:
+        """
+        索引是否可用，未开启媒体服务器同步或还没有同步过数据时不可用
+        """
+        if not settings.MEDIASERVER_SYNC_INTERVAL:
+            return False
+        self.__load()
+        return bool(self._items)
+
+    @staticmethod
+    def __to_bits(episodes: List[int]) -> int:
+        bits = 0
+        for episode in episodes or []:
+            if isinstance(episode, int) and episode >= 0:
+                bits |= 1 << episode
+        return bits
+
+    @staticmethod
+    def __from_bits(bits: int) -> List[int]:
+        return [episode for episode in range(bits.bit_length()) if bits >> episode & 1]
+
+    def __load(self):
+        """
+        从数据库加载当前媒体服务器的数据
+        """
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            db = SessionLocal()
+            try:
+                items = db.query(MediaServerItem).filter(MediaServerItem.server == settings.MEDIASERVER).all()
+                for item in items:
+                    self.__put(item.item_id, item.item_type, item.tmdbid, item.title, item.year, item.seasoninfo)
+            finally:
+                db.close()
+            self._loaded = True
+            logger.info(f"媒体库索引加载完成，共 {len(self._items)} 条")
+
+    def __put(self, item_id: str, item_type: str, tmdbid: Optional[int],
+              title: str, year: str, seasoninfo: Optional[str]):
+        if not item_id:
+            return
+        self.__pop(item_id)
+        seasons = {}
+        try:
+            for season, episodes in (json.loads(seasoninfo) if seasoninfo else {}).items():
+                seasons[int(season)] = self.__to_bits(episodes)
+        except (ValueError, TypeError, AttributeError):
+            pass
+        tmdbid = int(tmdbid) if tmdbid else None
+        year = str(year) if year else None
+        self._items[item_id] = (item_type, tmdbid, title, year, seasons)
+        if tmdbid:
+            self._tmdb_index.setdefault((item_type, tmdbid), set()).add(item_id)
+        if title:
+            self._title_index.setdefault((item_type, title, year), set()).add(item_id)
+
+    def __pop(self, item_id: str):
+        item = self._items.pop(item_id, None)
+        if not item:
+            return
+        item_type, tmdbid, title, year, _ = item
+        for index, key in [(self._tmdb_index, (item_type, tmdbid)),
+                           (self._title_index, (item_type, title, year))]:
+            ids = index.get(key)
+            if ids:
+                ids.discard(item_id)
+                if not ids:
+                    index.pop(key, None)
+
+    def update(self, server: str, items: List[dict]):
+        """
+        更新同步到的项目
+        """
+        if server != settings.MEDIASERVER:
+            return
+        with self._lock:
+            if not self._loaded:
+                return
+            for item in items:
+                self.__put(str(item.get("item_id")), item.get("item_type"), item.get("tmdbid"),
+                           item.get("title"), item.get("year"), item.get("seasoninfo"))
+
+    def remove(self, server: str, item_ids: List[str]):
+        """
+        删除已不存在的项目
+        """
+        if server != settings.MEDIASERVER:
+            return
+        with self._lock:
+            if not self._loaded:
+                return
+            for item_id in item_ids:
+                self.__pop(item_id)
+
+    def clear(self, server: str):
+        """
+        清空媒体服务器的数据，下次使用时重新加载
+        """
+        if server != settings.MEDIASERVER:
+            return
+        with self._lock:
+            self._items.clear()
+            self._tmdb_index.clear()
+            self._title_index.clear()
+            self._loaded = False
+
+    def add_transferred(self, mtype: MediaType, tmdbid: int, season: int = None, episodes: List[int] = None):
+        """
+        登记整理入库的媒体，媒体服务器同步前也视为已存在
+        """
+        if not tmdbid:
+            return
+        with self._lock:
+            key = (mtype.value, int(tmdbid))
+            seasons = self._transferred.setdefault(key, {})
+            if mtype == MediaType.TV and season is not None:
+                seasons[season] = seasons.get(season, 0) | self.__to_bits(episodes)
+            self._transferred_time[key] = time.time()
+
+    def remove_transferred(self, tmdbid: int, mtype: MediaType = None,
+                           season: int = None, episodes: List[int] = None):
+        """
+        媒体被删除时移除登记的整理入库数据
+        :param tmdbid: TMDBID
+        :param mtype: 类型，为空时电影和电视剧都移除
+        :param season: 季，为空时移除整个媒体
+        :param episodes: 集，为空时移除整季
+        """
+        if not tmdbid or not str(tmdbid).isdigit():
+            return
+        mtypes = [mtype] if mtype else [MediaType.MOVIE, MediaType.TV]
+        with self._lock:
+            for _mtype in mtypes:
+                key = (_mtype.value, int(tmdbid))
+                seasons = self._transferred.get(key)
+                if seasons is None:
+                    continue
+                if season is None or _mtype == MediaType.MOVIE:
+                    self._transferred.pop(key, None)
+                    self._transferred_time.pop(key, None)
+                elif not episodes:
+                    seasons.pop(season, None)
+                elif season in seasons:
+                    seasons[season] &= ~self.__to_bits(episodes)
+
+    def reset_transferred(self, before: float = None):
+        """
+        媒体服务器同步完成后，移除同步开始前登记的整理入库数据，以媒体服务器的数据为准
+        :param before: 同步开始时间，为空时全部移除
+        """
+        with self._lock:
+            for key in list(self._transferred.keys()):
+                if before is None or self._transferred_time.get(key, 0) < before:
+                    self._transferred.pop(key, None)
+                    self._transferred_time.pop(key, None)
+
+    def __find(self, mtype: MediaType, tmdbid: int = None,
+               title: str = None, year: str = None) -> Tuple[Optional[str], Optional[Dict[int, int]]]:
+        """
+        查找媒体，优先按TMDBID查找，找不到时按标题、年份查找
+        :return: 项目ID，季 -> 集位图，不存在时为None
+        """
+        self.__load()
+        with self._lock:
+            item_ids = set()
+            if tmdbid:
+                item_ids = self._tmdb_index.get((mtype.value, int(tmdbid))) or set()
+            if not item_ids and title:
+                item_ids = self._title_index.get((mtype.value, title, str(year) if year else None)) or set()
+            transferred = self._transferred.get((mtype.value, int(tmdbid))) if tmdbid else None
+            if not item_ids and transferred is None:
+                return None, None
+            seasons: Dict[int, int] = dict(transferred or {})
+            for item_id in sorted(item_ids):
+                for season, bits in self._items[item_id][4].items():
+                    seasons[season] = seasons.get(season, 0) | bits
+            return (min(item_ids) if item_ids else None), seasons
+
+    def get_item_id(self, mtype: MediaType, tmdbid: int = None, title: str = None,
+                    year: str = None, season: int = None) -> Optional[str]:
+        """
+        查询媒体在媒体服务器中的项目ID，指定季时该季不存在返回None
+        """
+        item_id, seasons = self.__find(mtype=mtype, tmdbid=tmdbid, title=title, year=year)
+        if not item_id:
+            return None
+        if season and season not in seasons:
+            return None
+        return item_id
+
+    def media_exists(self, mediainfo: MediaInfo) -> Optional[ExistMediaInfo]:
+        """
+        判断媒体是否存在
+        :return: 如不存在返回None，存在时返回信息，包括每季已存在所有集
+        """
+        item_id, seasons = self.__find(mtype=mediainfo.type, tmdbid=mediainfo.tmdb_id,
+                                       title=mediainfo.title, year=mediainfo.year)
+        if seasons is None:
+            return None
+        if mediainfo.type == MediaType.MOVIE:
+            return ExistMediaInfo(type=MediaType.MOVIE)
+        tvs = {season: self.__from_bits(bits) for season, bits in seasons.items() if bits}
+        if not tvs:
+            return None
+        return ExistMediaInfo(type=MediaType.TV, seasons=tvs)
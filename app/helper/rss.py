@@ -1,14 +1,20 @@
-import xml.dom.minidom
-from typing import List
+import re
+from contextlib import closing
+from typing import Iterable, List, Optional, Tuple
+
+import requests
+from lxml import etree
 
 from app.core.config import settings
-from app.utils.dom import DomUtils
+from app.log import logger
 from app.utils.http import RequestUtils
 from app.utils.string import StringUtils
 
 
 class RssHelper:
-    
+    # XML声明中的编码
+    _xml_encoding_re = re.compile(rb"^(\xef\xbb\xbf)?\s*<\?xml[^>]*encoding=")
+
     @staticmethod
     def parse(url, proxy: bool = False) -> List[dict]:
         """
@@ -17,64 +23,172 @@ class RssHelper:
         :param proxy: 是否使用代理
         :return: 种子信息列表，如为None代表Rss过期
         """
-        # 开始处理
-        ret_array: list = []
+        items, _ = RssHelper.fetch(url, proxy=proxy)
+        return items or []
+
+    @staticmethod
+    def fetch(url, proxy: bool = False,
+              etag: str = None, last_modified: str = None,
+              last_guid: str = None, last_pubdate: int = None) -> Tuple[Optional[List[dict]], dict]:
+        """
+        条件请求并流式解析RSS，遇到已处理过的条目即停止解析
+        :param url: RSS地址
+        :param proxy: 是否使用代理
+        :param etag: 上次响应的ETag
+        :param last_modified: 上次响应的Last-Modified
+        :param last_guid: 上次处理的最新条目GUID，解析到该条目时停止
+        :param last_pubdate: 上次处理的最新条目发布时间戳，解析到更早的条目时停止
+        :return: (种子信息列表, 响应缓存信息)，RSS未变化时种子信息列表为None；
+                 请求或解析失败时缓存信息为None，此时种子信息可能不完整，不能据此更新缓存和已处理位置
+        """
         if not url:
-            return []
+            return [], None
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
         try:
-            ret = RequestUtils(proxies=settings.PROXY if proxy else None).get_res(url)
-            if not ret:
-                return []
-            ret.encoding = ret.apparent_encoding
+            ret = RequestUtils(proxies=settings.PROXY if proxy else None,
+                               headers=headers or None).get_res(url, stream=True)
         except Exception as err:
-            print(str(err))
-            return []
-        if ret:
-            ret_xml = ret.text
-            try:
-                # 解析XML
-                dom_tree = xml.dom.minidom.parseString(ret_xml)
-                rootNode = dom_tree.documentElement
-                items = rootNode.getElementsByTagName("item")
-                for item in items:
+            logger.error(f"RSS请求失败：{url} - {str(err)}")
+            return [], None
+        if ret is None:
+            return [], None
+        with closing(ret):
+            if ret.status_code == 304:
+                return None, {"etag": etag, "last_modified": last_modified}
+            if not ret.ok:
+                logger.error(f"RSS请求失败：{url} - {ret.status_code}")
+                return [], None
+            # 没有返回时清空，避免继续使用过期的缓存信息
+            cache = {
+                "etag": ret.headers.get("ETag") or "",
+                "last_modified": ret.headers.get("Last-Modified") or ""
+            }
+            # 直接从连接中边下载边解析
+            items, success = RssHelper.__iter_parse(ret.iter_content(chunk_size=16 * 1024),
+                                                    charset=RssHelper.__get_charset(ret),
+                                                    last_guid=last_guid, last_pubdate=last_pubdate)
+        if not success:
+            return items, None
+        return items, cache
+
+    @staticmethod
+    def __get_charset(ret) -> Optional[str]:
+        """
+        响应头Content-Type中指定的编码
+        """
+        if "charset" not in (ret.headers.get("Content-Type") or "").lower():
+            # 未指定编码时requests默认的ISO-8859-1不可信，交给XML解析器判断
+            return None
+        return requests.utils.get_encoding_from_headers(ret.headers)
+
+    @staticmethod
+    def __iter_parse(chunks: Iterable[bytes], charset: str = None,
+                     last_guid: str = None, last_pubdate: int = None) -> Tuple[List[dict], bool]:
+        """
+        边下载边解析item，解析完的节点立即释放
+        :param chunks: 响应内容
+        :param charset: 响应头中的编码，XML声明中有编码时以声明为准
+        :return: 种子信息列表，是否完整解析（到达文档结尾或上次处理的位置）
+        """
+        ret_array: list = []
+        parser = None
+        try:
+            for chunk in chunks:
+                if not chunk:
+                    continue
+                if parser is None:
+                    # XML声明中没有编码时（部分GBK站点只在响应头中声明）使用响应头中的编码
+                    encoding = None
+                    if charset and not RssHelper._xml_encoding_re.match(chunk):
+                        encoding = charset
+                    parser = etree.XMLPullParser(events=("end",), encoding=encoding, recover=True,
+                                                 resolve_entities=False, no_network=True)
+                parser.feed(chunk)
+                for _, elem in parser.read_events():
+                    if elem.getparent() is None:
+                        # 根节点结束，已到达文档结尾
+                        return ret_array, True
+                    if not isinstance(elem.tag, str) or etree.QName(elem).localname != "item":
+                        continue
                     try:
-                        # 标题
-                        title = DomUtils.tag_value(item, "title", default="")
-                        if not title:
-                            continue
-                        # 描述
-                        description = DomUtils.tag_value(item, "description", default="")
-                        # 种子页面
-                        link = DomUtils.tag_value(item, "link", default="")
-                        # 种子链接
-                        enclosure = DomUtils.tag_value(item, "enclosure", "url", default="")
-                        if not enclosure and not link:
-                            continue
-                        # 部分RSS只有link没有enclosure
-                        if not enclosure and link:
-                            enclosure = link
-                        # 大小
-                        size = DomUtils.tag_value(item, "enclosure", "length", default=0)
-                        if size and str(size).isdigit():
-                            size = int(size)
-                        else:
-                            size = 0
-                        # 发布日期
-                        pubdate = DomUtils.tag_value(item, "pubDate", default="")
-                        if pubdate:
-                            # 转换为时间
-                            pubdate = StringUtils.get_time(pubdate)
-                        # 返回对象
-                        tmp_dict = {'title': title,
-                                    'enclosure': enclosure,
-                                    'size': size,
-                                    'description': description,
-                                    'link': link,
-                                    'pubdate': pubdate}
-                        ret_array.append(tmp_dict)
-                    except Exception as e1:
-                        print(str(e1))
+                        item = RssHelper.__parse_item(elem)
+                    except Exception as err:
+                        logger.debug(f"RSS条目解析失败：{str(err)}")
+                        item = None
+                    finally:
+                        # 释放已解析的节点
+                        elem.clear()
+                        while elem.getprevious() is not None:
+                            del elem.getparent()[0]
+                    if not item:
                         continue
-            except Exception as e2:
-                print(str(e2))
-        return ret_array
+                    # 到达上次处理的位置，之后的条目都已处理过
+                    if last_guid and item.get("guid") == last_guid:
+                        return ret_array, True
+                    if last_pubdate and item.get("pubdate") \
+                            and item["pubdate"].timestamp() < last_pubdate:
+                        return ret_array, True
+                    ret_array.append(item)
+        except Exception as err:
+            logger.error(f"RSS解析失败：{str(err)}")
+            return ret_array, False
+        # 内容不完整，没有读到根节点结束
+        logger.error("RSS内容不完整")
+        return ret_array, False
+
+    @staticmethod
+    def __parse_item(elem) -> Optional[dict]:
+        """
+        解析一个item节点
+        """
+        values = {}
+        enclosure_attrs = {}
+        for child in elem:
+            if not isinstance(child.tag, str):
+                continue
+            name = etree.QName(child).localname
+            # 同名节点只取第一个
+            if name in values:
+                continue
+            if name == "enclosure":
+                enclosure_attrs = dict(child.attrib)
+            values[name] = (child.text or "").strip()
+        # 标题
+        title = values.get("title")
+        if not title:
+            return None
+        # 描述
+        description = values.get("description", "")
+        # 种子页面
+        link = values.get("link", "")
+        # 种子链接
+        enclosure = enclosure_attrs.get("url", "")
+        if not enclosure and not link:
+            return None
+        # 部分RSS只有link没有enclosure
+        if not enclosure and link:
+            enclosure = link
+        # 大小
+        size = enclosure_attrs.get("length", 0)
+        if size and str(size).isdigit():
+            size = int(size)
+        else:
+            size = 0
+        # 发布日期
+        pubdate = values.get("pubDate", "")
+        if pubdate:
+            # 转换为时间
+            pubdate = StringUtils.get_time(pubdate)
+        # 唯一标识，没有guid时使用种子链接
+        guid = values.get("guid") or enclosure
+        return {'title': title,
+                'enclosure': enclosure,
+                'size': size,
+                'description': description,
+                'link': link,
+                'pubdate': pubdate,
+                'guid': guid}
@@ -0,0 +1,106 @@
+import threading
+import time
+from collections import deque
+from typing import Dict, Deque, Tuple
+
+from app.db.site_oper import SiteOper
+from app.helper.sites import SitesHelper
+from app.log import logger
+
+
+class SiteBudget:
+    """
+    站点搜索配额，按站点设置的流控规则（单位周期、周期内次数、访问间隔）控制并发搜索时对站点的访问
+    同一次任务中共享，需要等待的时间过长时放弃该站点，由调用方在下次运行时补搜
+    等待后的访问同样计入站点流控，任务开始前其它功能对站点的访问也由站点流控检查
+    """
+
+    def __init__(self, max_wait: int = 60):
+        """
+        :param max_wait: 单次最长等待时间（秒）
+        """
+        self._max_wait = max_wait
+        self._lock = threading.Lock()
+        # 站点ID -> (单位周期, 周期内次数, 访问间隔)
+        self._limits: Dict[int, Tuple[int, int, int]] = {
+            site.id: (site.limit_interval or 0, site.limit_count or 0, site.limit_seconds or 0)
+            for site in SiteOper().list()
+        }
+        # 站点ID -> 已预约的访问时间
+        self._history: Dict[int, Deque[float]] = {}
+        # 配额已用尽的站点
+        self._exhausted = set()
+        self._siteshelper = SitesHelper()
+
+    def __reserve(self, site_id: int) -> float:
+        """
+        预约一次访问，返回需要等待的秒数，超过最长等待时间时返回-1
+        """
+        interval, count, seconds = self._limits.get(site_id) or (0, 0, 0)
+        if not seconds and not (interval and count):
+            return 0
+        now = time.time()
+        history = self._history.setdefault(site_id, deque())
+        start = now
+        if seconds and history:
+            # 访问间隔
+            start = max(start, history[-1] + seconds)
+        if interval and count:
+            # 单位周期内的次数，按最近count次访问计算
+            while history and history[0] <= now - interval:
+                history.popleft()
+            if len(history) >= count:
+                start = max(start, history[-count] + interval)
+        if start - now > self._max_wait:
+            return -1
+        history.append(start)
+        return start - now
+
+    def acquire(self, indexer: dict) -> bool:
+        """
+        获取一次站点访问配额，必要时等待
+        :param indexer: 站点索引配置
+        :return: 是否可以访问，为False时本次不访问该站点
+        """
+        site_id = indexer.get("id")
+        with self._lock:
+            if site_id in self._exhausted:
+                return False
+            wait = self.__reserve(site_id)
+            if wait < 0:
+                self._exhausted.add(site_id)
+                logger.warn(f"站点 {indexer.get('name')} 已达到流控限制，本次不再搜索")
+                return False
+        if wait > 0:
+            time.sleep(wait)
+        # 计入站点流控，同时检查任务外的访问是否已用尽配额
+        state, msg = self._siteshelper.check(indexer.get("domain"))
+        if state:
+            with self._lock:
+                self._exhausted.add(site_id)
+            logger.warn(msg)
+            return False
+        return True
+
+    def for_task(self) -> "TaskBudget":
+        """
+        生成单个任务使用的配额，用于记录该任务是否有站点被跳过
+        """
+        return TaskBudget(self)
+
+
+class TaskBudget:
+    """
+    单个任务的站点配额
+    """
+
+    def __init__(self, budget: SiteBudget):
+        self._budget = budget
+        # 是否有站点因流控未搜索
+        self.deferred = False
+
+    def acquire(self, indexer: dict) -> bool:
+        if self._budget.acquire(indexer):
+            return True
+        self.deferred = True
+        return False
@@ -12,6 +12,7 @@ from app.core.plugin import PluginManager
 from app.db.init import init_db, update_db
 from app.helper.display import DisplayHelper
 from app.helper.sites import SitesHelper
+from app.monitor import Monitor
 from app.scheduler import Scheduler
 
 # App
@@ -25,6 +26,7 @@ App.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Search-Id"],
 )
 
 # uvicorn服务
@@ -59,6 +61,8 @@ def shutdown_server():
     DisplayHelper().stop()
     # 停止定时服务
     Scheduler().stop()
+    # 停止下载完成监控
+    Monitor().stop()
 
 
 @App.on_event("startup")
@@ -76,6 +80,8 @@ def start_module():
     PluginManager()
     # 启动定时服务
     Scheduler()
+    # 启动下载完成监控
+    Monitor()
     # 启动事件消费
     Command()
     # 初始化路由
@@ -1,8 +1,11 @@
 import json
 import re
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from pathlib import Path
 from typing import List, Optional, Union, Dict, Generator
 
+import requests
 from requests import Response
 
 from app.core.config import settings
@@ -15,8 +18,16 @@ from app.utils.string import StringUtils
 
 
 class Emby(metaclass=Singleton):
+    # 分页获取项目时每页的数量
+    _page_size = 200
+    # 并发获取的页数
+    _page_workers = 4
+    # 同步时需要的项目字段
+    _item_fields = "ProviderIds,Path,ProductionYear,OriginalTitle,ParentId"
 
     def __init__(self):
+        # 复用连接
+        self._session = requests.Session()
         self._host = settings.EMBY_HOST
         if self._host:
             if not self._host.endswith("/"):
@@ -496,48 +507,144 @@ class Emby(metaclass=Singleton):
             return {}
         req_url = "%semby/Users/%s/Items/%s?api_key=%s" % (self._host, self._user, itemid, self._apikey)
         try:
-            res = RequestUtils().get_res(req_url)
+            res = RequestUtils(session=self._session).get_res(req_url)
             if res and res.status_code == 200:
                 return res.json()
         except Exception as e:
             logger.error(f"连接Items/Id出错：" + str(e))
             return {}
 
+    @staticmethod
+    def __format_item(item_info: dict) -> dict:
+        """
+        转换项目信息为同步数据
+        """
+        return {"id": item_info.get("Id"),
+                "library": item_info.get("ParentId"),
+                "type": item_info.get("Type"),
+                "title": item_info.get("Name"),
+                "original_title": item_info.get("OriginalTitle"),
+                "year": item_info.get("ProductionYear"),
+                "tmdbid": (item_info.get("ProviderIds") or {}).get("Tmdb"),
+                "imdbid": (item_info.get("ProviderIds") or {}).get("Imdb"),
+                "tvdbid": (item_info.get("ProviderIds") or {}).get("Tvdb"),
+                "path": item_info.get("Path"),
+                "json": str(item_info)}
+
+    def __get_items_page(self, query: str, start: int) -> dict:
+        """
+        获取一页项目，失败时抛出异常
+        """
+        req_url = "%semby/Users/%s/Items?%s&StartIndex=%s&Limit=%s" \
+                  "&EnableImages=false&EnableUserData=false&api_key=%s" % (
+                      self._host, self._user, query, start, self._page_size, self._apikey)
+        res = RequestUtils(session=self._session).get_res(req_url)
+        if not res or res.status_code != 200:
+            raise IOError(f"Users/Items 获取第 {start} 条起的数据失败")
+        return res.json()
+
+    def __crawl_items(self, query: str) -> Generator:
+        """
+        分页获取项目，第一页确定总数后并发获取其余页，按顺序逐页返回
+        :param query: 查询参数
+        """
+        first = self.__get_items_page(query, 0)
+        for item in first.get("Items") or []:
+            yield item
+        total = first.get("TotalRecordCount") or 0
+        if total <= self._page_size:
+            return
+        with ThreadPoolExecutor(max_workers=self._page_workers) as executor:
+            futures = [executor.submit(self.__get_items_page, query, start)
+                       for start in range(self._page_size, total, self._page_size)]
+            try:
+                for future in futures:
+                    for item in future.result().get("Items") or []:
+                        yield item
+            finally:
+                for future in futures:
+                    future.cancel()
+
     def get_items(self, parent: str) -> Generator:
         """
-        获取媒体服务器所有媒体库列表
+        获取媒体库中所有电影和电视剧，获取失败时抛出异常，避免调用方把不完整的结果当作同步成功
         """
-        if not parent:
-            yield {}
-        if not self._host or not self._apikey:
-            yield {}
-        req_url = "%semby/Users/%s/Items?ParentId=%s&api_key=%s" % (self._host, self._user, parent, self._apikey)
+        if not parent or not self._host or not self._apikey:
+            return
+        query = "ParentId=%s&Recursive=true&IncludeItemTypes=Movie,Series" \
+                "&Fields=%s" % (parent, self._item_fields)
         try:
-            res = RequestUtils().get_res(req_url)
-            if res and res.status_code == 200:
-                results = res.json().get("Items") or []
-                for result in results:
-                    if not result:
-                        continue
-                    if result.get("Type") in ["Movie", "Series"]:
-                        item_info = self.get_iteminfo(result.get("Id"))
-                        yield {"id": result.get("Id"),
-                               "library": item_info.get("ParentId"),
-                               "type": item_info.get("Type"),
-                               "title": item_info.get("Name"),
-                               "original_title": item_info.get("OriginalTitle"),
-                               "year": item_info.get("ProductionYear"),
-                               "tmdbid": item_info.get("ProviderIds", {}).get("Tmdb"),
-                               "imdbid": item_info.get("ProviderIds", {}).get("Imdb"),
-                               "tvdbid": item_info.get("ProviderIds", {}).get("Tvdb"),
-                               "path": item_info.get("Path"),
-                               "json": str(item_info)}
-                    elif "Folder" in result.get("Type"):
-                        for item in self.get_items(parent=result.get('Id')):
-                            yield item
+            for item in self.__crawl_items(query):
+                yield self.__format_item(item)
+        except Exception as e:
+            logger.error(f"连接Users/Items出错：" + str(e))
+            raise
+
+    def get_items_since(self, parent: str, since: datetime) -> Generator:
+        """
+        获取媒体库中指定时间后新增或修改过的电影和电视剧，剧集有变化时返回所属的电视剧，获取失败时抛出异常
+        :param parent: 媒体库ID
+        :param since: 起始时间（UTC）
+        """
+        if not parent or not self._host or not self._apikey:
+            return
+        query = "ParentId=%s&Recursive=true&IncludeItemTypes=Movie,Series,Episode" \
+                "&MinDateLastSaved=%s&Fields=%s,SeriesId" % (
+                    parent, since.strftime("%Y-%m-%dT%H:%M:%SZ"), self._item_fields)
+        item_ids = set()
+        series_ids = set()
+        try:
+            for result in self.__crawl_items(query):
+                if result.get("Type") in ["Movie", "Series"]:
+                    item_ids.add(result.get("Id"))
+                    yield self.__format_item(result)
+                elif result.get("Type") == "Episode" and result.get("SeriesId"):
+                    series_ids.add(result.get("SeriesId"))
+        except Exception as e:
+            logger.error(f"连接Users/Items出错：" + str(e))
+            raise
+        # 只有剧集变化的电视剧
+        for series_id in series_ids - item_ids:
+            item_info = self.get_iteminfo(series_id)
+            if item_info:
+                yield self.__format_item(item_info)
+
+    def get_episodes_inventory(self, parent: str) -> Optional[Dict[str, Dict[int, list]]]:
+        """
+        分页获取媒体库中所有剧集，按电视剧汇总每一季的已有集数，出错时返回None
+        :param parent: 媒体库ID
+        :return: 电视剧ID -> 季 -> 集列表
+        """
+        if not parent or not self._host or not self._apikey:
+            return None
+        query = "ParentId=%s&Recursive=true&IncludeItemTypes=Episode&IsMissing=false" \
+                "&Fields=SeriesId,ParentIndexNumber,IndexNumber" % parent
+        inventory = {}
+        try:
+            for episode in self.__crawl_items(query):
+                series_id = episode.get("SeriesId")
+                season_index = episode.get("ParentIndexNumber")
+                episode_index = episode.get("IndexNumber")
+                if not series_id or not season_index or not episode_index:
+                    continue
+                inventory.setdefault(str(series_id), {}).setdefault(season_index, []).append(episode_index)
         except Exception as e:
             logger.error(f"连接Users/Items出错：" + str(e))
-        yield {}
+            return None
+        return inventory
+
+    def get_item_ids(self, parent: str) -> Optional[List[str]]:
+        """
+        获取媒体库中所有电影和电视剧的ID，用于检查已删除的项目，出错时返回None
+        """
+        if not parent or not self._host or not self._apikey:
+            return None
+        query = "ParentId=%s&Recursive=true&IncludeItemTypes=Movie,Series" % parent
+        try:
+            return [str(item.get("Id")) for item in self.__crawl_items(query)]
+        except Exception as e:
+            logger.error(f"连接Users/Items出错：" + str(e))
+        return None
 
     def get_webhook_message(self, message_str: str) -> WebhookEventInfo:
         """
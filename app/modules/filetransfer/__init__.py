@@ -1,7 +1,7 @@
 import re
 from pathlib import Path
 from threading import Lock
-from typing import Optional, List, Tuple, Union
+from typing import Optional, List, Tuple, Union, Callable
 
 from jinja2 import Template
 
@@ -9,6 +9,7 @@ from app.core.context import MediaInfo
 from app.core.metainfo import MetaInfo
 from app.core.config import settings
 from app.core.meta import MetaBase
+from app.helper.checksum import ChecksumHelper
 from app.log import logger
 from app.modules import _ModuleBase
 from app.modules.filetransfer.format_parser import FormatParser
@@ -62,12 +63,14 @@ class FileTransferModule(_ModuleBase):
                                    min_filesize=min_filesize)
 
     @staticmethod
-    def __transfer_command(file_item: Path, target_file: Path, transfer_type: str) -> int:
+    def __transfer_command(file_item: Path, target_file: Path, transfer_type: str,
+                           verify: Callable[[Path, Path], bool] = None) -> int:
         """
         使用系统命令处理单个文件
         :param file_item: 文件路径
         :param target_file: 目标文件路径
         :param transfer_type: RmtMode转移方式
+        :param verify: 复制（含跨设备移动）时的校验函数，校验通过后才替换目标文件、删除源文件
         """
         with lock:
 
@@ -80,10 +83,10 @@ class FileTransferModule(_ModuleBase):
                 retcode, retmsg = SystemUtils.softlink(file_item, target_file)
             elif transfer_type == 'move':
                 # 移动
-                retcode, retmsg = SystemUtils.move(file_item, target_file)
+                retcode, retmsg = SystemUtils.move(file_item, target_file, verify=verify)
             else:
                 # 复制
-                retcode, retmsg = SystemUtils.copy(file_item, target_file)
+                retcode, retmsg = SystemUtils.copy(file_item, target_file, verify=verify)
 
         if retcode != 0:
             logger.error(retmsg)
@@ -288,13 +291,15 @@ class FileTransferModule(_ModuleBase):
         return retcode
 
     def __transfer_file(self, file_item: Path, new_file: Path, transfer_type: str,
-                        over_flag: bool = False, old_file: Path = None) -> int:
+                        over_flag: bool = False, old_file: Path = None,
+                        verify: Callable[[Path, Path], bool] = None) -> int:
         """
         转移一个文件，同时处理其他相关文件
         :param file_item: 原文件路径
         :param new_file: 新文件路径
         :param transfer_type: RmtMode转移方式
         :param over_flag: 是否覆盖，为True时会先删除再转移
+        :param verify: 校验函数，校验通过后才替换目标文件
         """
         if not over_flag and new_file.exists():
             logger.warn(f"文件已存在：{new_file}")
@@ -307,7 +312,8 @@ class FileTransferModule(_ModuleBase):
         new_file.parent.mkdir(parents=True, exist_ok=True)
         retcode = self.__transfer_command(file_item=file_item,
                                           target_file=new_file,
-                                          transfer_type=transfer_type)
+                                          transfer_type=transfer_type,
+                                          verify=verify)
         if retcode == 0:
             logger.info(f"文件 {file_item} {transfer_type}完成")
         else:
@@ -319,6 +325,41 @@ class FileTransferModule(_ModuleBase):
                                            transfer_type=transfer_type,
                                            over_flag=over_flag)
 
+    @staticmethod
+    def __need_verify(file_item: Path, new_file: Path, transfer_type: str) -> bool:
+        """
+        是否需要校验转移后的文件：复制，以及跨设备的移动（同设备移动只改名，数据不变）
+        """
+        if not settings.TRANSFER_VERIFY:
+            return False
+        if transfer_type == "copy":
+            return True
+        if transfer_type != "move":
+            return False
+        # 目标目录可能尚未创建，取已存在的上级目录
+        target = new_file.parent
+        while not target.exists() and target != target.parent:
+            target = target.parent
+        try:
+            return file_item.stat().st_dev != target.stat().st_dev
+        except OSError:
+            return True
+
+    @staticmethod
+    def __get_verifier(results: dict) -> Callable[[Path, Path], bool]:
+        """
+        生成校验函数，并行计算源文件和复制出的临时文件摘要并比对
+        :param results: 记录校验结果
+        """
+
+        def _verify(src: Path, temp: Path) -> bool:
+            digests = ChecksumHelper().digests([src, temp])
+            src_digest, dest_digest = digests.get(str(src)), digests.get(str(temp))
+            results["matched"] = bool(src_digest and dest_digest and src_digest == dest_digest)
+            return results["matched"]
+
+        return _verify
+
     def transfer_media(self,
                        in_path: Path,
                        mediainfo: MediaInfo,
@@ -346,27 +387,8 @@ class FileTransferModule(_ModuleBase):
         if not target_dir.exists():
             return TransferInfo(message=f"{target_dir} 目标路径不存在")
 
-        if mediainfo.type == MediaType.MOVIE:
-            # 电影
-            if settings.LIBRARY_MOVIE_NAME:
-                target_dir = target_dir / settings.LIBRARY_MOVIE_NAME / mediainfo.category
-            else:
-                # 目的目录加上类型和二级分类
-                target_dir = target_dir / mediainfo.type.value / mediainfo.category
-
-        if mediainfo.type == MediaType.TV:
-            # 电视剧
-            if settings.LIBRARY_ANIME_NAME \
-                    and mediainfo.genre_ids \
-                    and set(mediainfo.genre_ids).intersection(set(settings.ANIME_GENREIDS)):
-                # 动漫
-                target_dir = target_dir / settings.LIBRARY_ANIME_NAME / mediainfo.category
-            elif settings.LIBRARY_TV_NAME:
-                # 电视剧
-                target_dir = target_dir / settings.LIBRARY_TV_NAME / mediainfo.category
-            else:
-                # 目的目录加上类型和二级分类
-                target_dir = target_dir / mediainfo.type.value / mediainfo.category
+        # 目的目录加上类型和二级分类
+        target_dir = self.get_media_dir(target_dir=target_dir, mediainfo=mediainfo)
 
         # 重命名格式
         rename_format = settings.TV_RENAME_FORMAT \
@@ -492,11 +514,24 @@ class FileTransferModule(_ModuleBase):
                             logger.info(f"目标文件已存在，但文件大小更小，将覆盖：{new_file}")
                             overflag = True
 
+                    # 校验，已存在且不覆盖的文件不会转移，无需校验
+                    # 复制到临时文件后先校验，通过后才替换目标文件、删除源文件，失败时源文件和原目标文件都保持不变
+                    verify_results = {}
+                    verifier = self.__get_verifier(verify_results) \
+                        if (overflag or not new_file.exists()) \
+                        and self.__need_verify(transfer_file, new_file, transfer_type) else None
+
                     # 转移文件
                     retcode = self.__transfer_file(file_item=transfer_file,
                                                    new_file=new_file,
                                                    transfer_type=transfer_type,
-                                                   over_flag=overflag)
+                                                   over_flag=overflag,
+                                                   verify=verifier)
+                    if verify_results.get("matched") is False:
+                        logger.error(f"{new_file} 校验失败，与源文件不一致")
+                        err_msgs.append(f"{transfer_file.name}：文件校验失败")
+                        fail_list.append(transfer_file)
+                        continue
                     if retcode != 0:
                         logger.error(f"{transfer_file} 转移文件失败，错误码：{retcode}")
                         err_msgs.append(f"{transfer_file.name}：错误码 {retcode}")
@@ -589,6 +624,46 @@ class FileTransferModule(_ModuleBase):
         else:
             return Path(render_str)
 
+    def media_target_dir(self, path: Path, mediainfo: MediaInfo) -> Optional[Path]:
+        """
+        转移到媒体库时的目的目录（含类型和二级分类），未配置媒体库目录时返回None
+        :param path: 源路径
+        :param mediainfo: 媒体信息
+        """
+        target = self.get_target_path(in_path=path)
+        if not target:
+            return None
+        return self.get_media_dir(target_dir=target, mediainfo=mediainfo)
+
+    @staticmethod
+    def get_media_dir(target_dir: Path, mediainfo: MediaInfo) -> Path:
+        """
+        媒体库目录下按类型和二级分类的目的目录
+        :param target_dir: 媒体库目录
+        :param mediainfo: 媒体信息
+        """
+        if mediainfo.type == MediaType.MOVIE:
+            # 电影
+            if settings.LIBRARY_MOVIE_NAME:
+                return target_dir / settings.LIBRARY_MOVIE_NAME / mediainfo.category
+            # 目的目录加上类型和二级分类
+            return target_dir / mediainfo.type.value / mediainfo.category
+
+        if mediainfo.type == MediaType.TV:
+            # 电视剧
+            if settings.LIBRARY_ANIME_NAME \
+                    and mediainfo.genre_ids \
+                    and set(mediainfo.genre_ids).intersection(set(settings.ANIME_GENREIDS)):
+                # 动漫
+                return target_dir / settings.LIBRARY_ANIME_NAME / mediainfo.category
+            if settings.LIBRARY_TV_NAME:
+                # 电视剧
+                return target_dir / settings.LIBRARY_TV_NAME / mediainfo.category
+            # 目的目录加上类型和二级分类
+            return target_dir / mediainfo.type.value / mediainfo.category
+
+        return target_dir
+
     @staticmethod
     def get_target_path(in_path: Path = None) -> Optional[Path]:
         """
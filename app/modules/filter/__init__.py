@@ -3,15 +3,23 @@ from typing import List, Tuple, Union, Dict, Optional
 
 from app.core.context import TorrentInfo
 from app.core.metainfo import MetaInfo
+from app.db.systemconfig_oper import SystemConfigOper
 from app.log import logger
 from app.modules import _ModuleBase
 from app.modules.filter.RuleParser import RuleParser
+from app.schemas.types import SystemConfigKey
 
 
 class FilterModule(_ModuleBase):
 
     # 规则解析器
     parser: RuleParser = None
+    # 已解析的规则：规则字符串 -> 各级规则组
+    _parsed_rules: Dict[str, list] = {}
+    # 编译后的规则项：规则名称 -> (包含项, 排除项)
+    _compiled_rules: Dict[str, Tuple[list, list]] = {}
+    # 是否已注册过滤规则变化回调
+    _registered: bool = False
 
     # 内置规则集
     rule_set: Dict[str, dict] = {
@@ -98,9 +106,47 @@ class FilterModule(_ModuleBase):
 
     def init_module(self) -> None:
         self.parser = RuleParser()
+        self._parsed_rules = {}
+        self._compiled_rules = {
+            name: ([re.compile(include, re.IGNORECASE) for include in rule.get("include") or []],
+                   [re.compile(exclude, re.IGNORECASE) for exclude in rule.get("exclude") or []])
+            for name, rule in self.rule_set.items()
+        }
+        self._registered = False
+
+    def __register(self):
+        """
+        首次解析规则时注册规则变化回调，过滤规则变化时丢弃已解析的旧规则
+        初始化模块时不访问数据库，数据库不可用时只记录日志，下次解析时再注册
+        """
+        if self._registered:
+            return
+        try:
+            SystemConfigOper().register(self.__on_rules_changed,
+                                        [SystemConfigKey.FilterRules, SystemConfigKey.FilterRules2])
+            self._registered = True
+        except Exception as e:
+            logger.debug(f"注册过滤规则变化回调失败：{str(e)}")
+
+    def __on_rules_changed(self, key: str, value: str):
+        self._parsed_rules = {}
+
+    def __parse_rules(self, rule_str: str) -> list:
+        """
+        解析多级规则，结果按规则字符串缓存
+        """
+        parsed = self._parsed_rules.get(rule_str)
+        if parsed is None:
+            self.__register()
+            parsed = [self.parser.parse(rule_group.strip()).as_list()[0]
+                      for rule_group in rule_str.split('>')]
+            self._parsed_rules[rule_str] = parsed
+        return parsed
 
     def stop(self):
-        pass
+        if self._registered:
+            SystemConfigOper().unregister(self.__on_rules_changed)
+            self._registered = False
 
     def init_setting(self) -> Tuple[str, Union[str, bool]]:
         pass
@@ -167,17 +213,14 @@ class FilterModule(_ModuleBase):
         """
         获取种子匹配的规则优先级，值越大越优先，未匹配时返回None
         """
-        # 多级规则
-        rule_groups = rule_str.split('>')
         # 优先级
         res_order = 100
         # 是否匹配
         matched = False
 
-        for rule_group in rule_groups:
-            # 解析规则组
-            parsed_group = self.parser.parse(rule_group.strip())
-            if self.__match_group(torrent, parsed_group.as_list()[0]):
+        # 多级规则
+        for parsed_group in self.__parse_rules(rule_str):
+            if self.__match_group(torrent, parsed_group):
                 # 出现匹配时中断
                 matched = True
                 logger.info(f"种子 {torrent.site_name} - {torrent.title} 优先级为 {100 - res_order + 1}")
@@ -215,20 +258,18 @@ class FilterModule(_ModuleBase):
         if not self.rule_set.get(rule_name):
             # 规则不存在
             return False
-        # 包含规则项
-        includes = self.rule_set[rule_name].get("include") or []
-        # 排除规则项
-        excludes = self.rule_set[rule_name].get("exclude") or []
+        # 包含规则项、排除规则项
+        includes, excludes = self._compiled_rules.get(rule_name) or ([], [])
         # FREE规则
         downloadvolumefactor = self.rule_set[rule_name].get("downloadvolumefactor")
         # 匹配项
         content = f"{torrent.title} {torrent.description} {' '.join(torrent.labels or [])}"
         for include in includes:
-            if not re.search(r"%s" % include, content, re.IGNORECASE):
+            if not include.search(content):
                 # 未发现包含项
                 return False
         for exclude in excludes:
-            if re.search(r"%s" % exclude, content, re.IGNORECASE):
+            if exclude.search(content):
                 # 发现排除项
                 return False
         if downloadvolumefactor is not None:
@@ -28,12 +28,13 @@ class IndexerModule(_ModuleBase):
         return "INDEXER", "builtin"
 
     def search_torrents(self, site: CommentedMap, mediainfo: MediaInfo = None,
-                        keyword: str = None, page: int = 0, area: str = "title") -> List[TorrentInfo]:
+                        keyword: Union[str, List[str]] = None, page: int = 0,
+                        area: str = "title") -> List[TorrentInfo]:
         """
         搜索一个站点
         :param mediainfo:  识别的媒体信息
         :param site:  站点
-        :param keyword:  搜索关键词，如有按关键词搜索，否则按媒体信息名称搜索
+        :param keyword:  搜索关键词，如有按关键词搜索，否则按媒体信息名称搜索，为列表时按站点的批量查询配置进行或查询
         :param page:  页码
         :param area:  搜索区域 title or imdbid
         :return: 资源列表
@@ -46,7 +47,16 @@ class IndexerModule(_ModuleBase):
         else:
             search_word = None
 
-        if search_word \
+        if isinstance(search_word, list):
+            if not site.get('batch') or site.get('parser') in ["TNodeSpider", "TorrentLeech"]:
+                logger.warn(f"{site.get('name')} 不支持批量查询")
+                return []
+            if site.get('language') == "en":
+                # 不支持中文，去掉中文关键词
+                search_word = [word for word in search_word if not StringUtils.is_chinese(word)]
+                if not search_word:
+                    return []
+        elif search_word \
                 and site.get('language') == "en" \
                 and StringUtils.is_chinese(search_word):
             # 不支持中文
@@ -101,7 +111,7 @@ class IndexerModule(_ModuleBase):
 
     @staticmethod
     def __spider_search(indexer: CommentedMap,
-                        keyword: str = None,
+                        keyword: Union[str, List[str]] = None,
                         imdbid: str = None,
                         mtype: MediaType = None,
                         page: int = 0) -> (bool, List[dict]):
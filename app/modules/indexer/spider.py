@@ -164,7 +164,6 @@ class TorrentSpider:
                 if self.imdbid and search_area:
                     search_word = self.imdbid
                 else:
-                    search_word = self.keyword
                     # 不启用IMDBID搜索时需要将search_area移除
                     if search_area:
                         indexer_params.pop('search_area')
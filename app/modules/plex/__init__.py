@@ -1,5 +1,6 @@
+from datetime import datetime
 from pathlib import Path
-from typing import Optional, Tuple, Union, Any, List, Generator
+from typing import Optional, Tuple, Union, Any, List, Generator, Dict
 
 from app import schemas
 from app.core.context import MediaInfo
@@ -109,11 +110,16 @@ class PlexModule(_ModuleBase):
             path=library.get("path")
         ) for library in librarys]
 
-    def mediaserver_items(self, library_id: str) -> Generator:
+    def mediaserver_items(self, library_id: str, since: datetime = None) -> Generator:
         """
-        媒体库项目列表
+        媒体库项目列表，获取失败时在迭代过程中抛出异常
+        :param library_id: 媒体库ID
+        :param since: 只返回该时间（UTC）后新增或修改过的项目
         """
-        items = self.plex.get_items(library_id)
+        if since:
+            items = self.plex.get_items_since(library_id, since)
+        else:
+            items = self.plex.get_items(library_id)
         for item in items:
             yield schemas.MediaServerItem(
                 server="plex",
@@ -129,6 +135,18 @@ class PlexModule(_ModuleBase):
                 path=item.get("path"),
             )
 
+    def mediaserver_item_ids(self, library_id: str) -> Optional[List[str]]:
+        """
+        媒体库中所有项目的ID，获取失败时返回None
+        """
+        return self.plex.get_item_ids(library_id)
+
+    def mediaserver_episodes_inventory(self, library_id: str) -> Optional[Dict[str, Dict[int, list]]]:
+        """
+        媒体库中所有电视剧的季集信息，获取失败时返回None
+        """
+        return self.plex.get_episodes_inventory(library_id)
+
     def mediaserver_tv_episodes(self, item_id: Union[str, int]) -> List[schemas.MediaServerSeasonInfo]:
         """
         获取剧集信息
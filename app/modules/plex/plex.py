@@ -1,4 +1,5 @@
 import json
+from datetime import datetime, timezone
 from pathlib import Path
 from typing import List, Optional, Dict, Tuple, Generator, Any
 from urllib.parse import quote_plus
@@ -165,6 +166,9 @@ class Plex(metaclass=Singleton):
             episodes = videos.episodes()
         season_episodes = {}
         for episode in episodes:
+            # 与Emby、Jellyfin一致，不统计特别季（第0季）
+            if not episode.seasonNumber:
+                continue
             if season and episode.seasonNumber != int(season):
                 continue
             if episode.seasonNumber not in season_episodes:
@@ -288,37 +292,101 @@ class Plex(metaclass=Singleton):
                         break
         return ids
 
+    def __format_item(self, item: Any) -> dict:
+        """
+        转换项目信息为同步数据
+        """
+        ids = self.__get_ids(item.guids)
+        path = None
+        if item.locations:
+            path = item.locations[0]
+        return {"id": item.key,
+                "library": item.librarySectionID,
+                "type": item.type,
+                "title": item.title,
+                "original_title": item.originalTitle,
+                "year": item.year,
+                "tmdbid": ids['tmdb_id'],
+                "imdbid": ids['imdb_id'],
+                "tvdbid": ids['tvdb_id'],
+                "path": path}
+
     def get_items(self, parent: str) -> Generator:
         """
-        获取媒体服务器所有媒体库列表
+        获取媒体库中所有电影和电视剧，获取失败时抛出异常
         """
-        if not parent:
-            yield {}
-        if not self._plex:
-            yield {}
+        if not parent or not self._plex:
+            return
         try:
             section = self._plex.library.sectionByID(int(parent))
             if section:
                 for item in section.all():
                     if not item:
                         continue
-                    ids = self.__get_ids(item.guids)
-                    path = None
-                    if item.locations:
-                        path = item.locations[0]
-                    yield {"id": item.key,
-                           "library": item.librarySectionID,
-                           "type": item.type,
-                           "title": item.title,
-                           "original_title": item.originalTitle,
-                           "year": item.year,
-                           "tmdbid": ids['tmdb_id'],
-                           "imdbid": ids['imdb_id'],
-                           "tvdbid": ids['tvdb_id'],
-                           "path": path}
+                    yield self.__format_item(item)
+        except Exception as err:
+            logger.error(f"获取媒体库列表出错：{err}")
+            raise
+
+    def get_items_since(self, parent: str, since: datetime) -> Generator:
+        """
+        获取媒体库中指定时间后新增或修改过的电影和电视剧，剧集有新增时返回所属的电视剧，获取失败时抛出异常
+        :param parent: 媒体库ID
+        :param since: 起始时间（UTC）
+        """
+        if not parent or not self._plex:
+            return
+        try:
+            section = self._plex.library.sectionByID(int(parent))
+            if not section:
+                return
+            since = since.replace(tzinfo=timezone.utc).astimezone().replace(tzinfo=None)
+            items = {item.key: item for item in section.search(filters={"updatedAt>>": since})}
+            if section.type == "show":
+                for episode in section.search(libtype="episode", filters={"episode.addedAt>>": since}):
+                    if episode.grandparentKey and episode.grandparentKey not in items:
+                        items[episode.grandparentKey] = self._plex.fetchItem(episode.grandparentKey)
+            for item in items.values():
+                if item:
+                    yield self.__format_item(item)
+        except Exception as err:
+            logger.error(f"获取媒体库变化出错：{err}")
+            raise
+
+    def get_episodes_inventory(self, parent: str) -> Optional[Dict[str, Dict[int, list]]]:
+        """
+        通过allLeaves获取媒体库中所有剧集，按电视剧汇总每一季的已有集数，出错时返回None
+        :param parent: 媒体库ID
+        :return: 电视剧ID -> 季 -> 集列表
+        """
+        if not parent or not self._plex:
+            return None
+        inventory = {}
+        try:
+            for episode in self._plex.fetchItems(f"/library/sections/{parent}/allLeaves"):
+                # 与Emby、Jellyfin一致，不统计特别季（第0季）
+                if not episode.grandparentKey or not episode.parentIndex or episode.index is None:
+                    continue
+                inventory.setdefault(str(episode.grandparentKey), {}).setdefault(
+                    int(episode.parentIndex), []).append(episode.index)
+        except Exception as err:
+            logger.error(f"获取媒体库剧集出错：{err}")
+            return None
+        return inventory
+
+    def get_item_ids(self, parent: str) -> Optional[List[str]]:
+        """
+        获取媒体库中所有电影和电视剧的ID，用于检查已删除的项目，出错时返回None
+        """
+        if not parent or not self._plex:
+            return None
+        try:
+            section = self._plex.library.sectionByID(int(parent))
+            if section:
+                return [str(item.key) for item in section.all()]
         except Exception as err:
             logger.error(f"获取媒体库列表出错：{err}")
-        yield {}
+        return None
 
     def get_webhook_message(self, message_str: str) -> WebhookEventInfo:
         """
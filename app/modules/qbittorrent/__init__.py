@@ -100,7 +100,7 @@ class QbittorrentModule(_ModuleBase):
         :return: 下载器中符合状态的种子列表
         """
         ret_torrents = []
-        if hashs:
+        if hashs and status != TorrentStatus.TRANSFER:
             # 按Hash获取
             torrents, _ = self.qbittorrent.get_torrents(ids=hashs, tags=settings.TORRENT_TAG)
             for torrent in torrents or []:
@@ -116,8 +116,8 @@ class QbittorrentModule(_ModuleBase):
                     tags=torrent.get('tags')
                 ))
         elif status == TorrentStatus.TRANSFER:
-            # 获取已完成且未整理的
-            torrents = self.qbittorrent.get_completed_torrents(tags=settings.TORRENT_TAG)
+            # 获取已完成且未整理的，指定Hash时只查询这些种子
+            torrents = self.qbittorrent.get_completed_torrents(ids=hashs, tags=settings.TORRENT_TAG)
             for torrent in torrents or []:
                 tags = torrent.get("tags") or []
                 if "已整理" in tags:
@@ -88,7 +88,7 @@ class TransmissionModule(_ModuleBase):
         :return: 下载器中符合状态的种子列表
         """
         ret_torrents = []
-        if hashs:
+        if hashs and status != TorrentStatus.TRANSFER:
             # 按Hash获取
             torrents, _ = self.transmission.get_torrents(ids=hashs, tags=settings.TORRENT_TAG)
             for torrent in torrents or []:
@@ -99,8 +99,8 @@ class TransmissionModule(_ModuleBase):
                     tags=torrent.labels
                 ))
         elif status == TorrentStatus.TRANSFER:
-            # 获取已完成且未整理的
-            torrents = self.transmission.get_completed_torrents(tags=settings.TORRENT_TAG)
+            # 获取已完成且未整理的，指定Hash时只查询这些种子
+            torrents = self.transmission.get_completed_torrents(ids=hashs, tags=settings.TORRENT_TAG)
             for torrent in torrents or []:
                 # 含"已整理"tag的不处理
                 if "已整理" in torrent.labels or []:
@@ -0,0 +1,170 @@
+import time
+import traceback
+from pathlib import Path
+from threading import Thread, Event, Lock
+from typing import Set, List, Tuple
+
+from watchdog.events import FileSystemEventHandler
+from watchdog.observers import Observer
+
+from app.chain.transfer import TransferChain
+from app.core.config import settings
+from app.db import SessionLocal
+from app.log import logger
+from app.utils.singleton import Singleton
+
+
+class DownloadPathHandler(FileSystemEventHandler):
+    """
+    下载目录变化响应类
+    """
+
+    def __init__(self, monitor: "Monitor", **kwargs):
+        super(DownloadPathHandler, self).__init__(**kwargs)
+        self.monitor = monitor
+
+    def on_moved(self, event):
+        self.monitor.put_path(event.dest_path, is_directory=event.is_directory)
+
+    def on_closed(self, event):
+        self.monitor.put_path(event.src_path, is_directory=event.is_directory)
+
+
+class Monitor(metaclass=Singleton):
+    """
+    下载完成事件监控，接收下载器完成通知和下载目录变化，防抖后触发整理
+    """
+    # 防抖时间（秒），窗口内的多个事件合并处理
+    _debounce = 10
+
+    # 退出事件
+    _event = Event()
+
+    def __init__(self):
+        # 数据库连接
+        self._db = SessionLocal()
+        # 待处理的种子Hash
+        self._hashs: Set[str] = set()
+        # 待处理的下载目录变化文件
+        self._paths: Set[Path] = set()
+        # 是否需要处理所有已完成的种子
+        self._full = False
+        # 最后一次收到事件的时间
+        self._last_time = 0
+        self._lock = Lock()
+        self._observers: List[Observer] = []
+        # 调试模式不启动监控
+        if settings.DEV or not settings.DOWNLOADER_MONITOR:
+            return
+        # 启动后先整理一次，恢复中断的转移并处理停机期间完成的下载
+        self._full = True
+        # 下载目录监控
+        if settings.DOWNLOADER_MONITOR_PATH:
+            self.__start_observers()
+        # 事件处理线程
+        self._thread = Thread(target=self.__run, daemon=True)
+        self._thread.start()
+
+    def __start_observers(self):
+        """
+        启动下载目录监控
+        """
+        paths = set()
+        for path in [settings.DOWNLOAD_PATH, settings.DOWNLOAD_MOVIE_PATH,
+                     settings.DOWNLOAD_TV_PATH, settings.DOWNLOAD_ANIME_PATH]:
+            if not path or not Path(path).exists():
+                continue
+            paths.add(str(path))
+        for path in paths:
+            try:
+                observer = Observer(timeout=10)
+                observer.schedule(DownloadPathHandler(self), path=path, recursive=True)
+                observer.daemon = True
+                observer.start()
+                self._observers.append(observer)
+                logger.info(f"{path} 的下载目录监控服务启动")
+            except Exception as e:
+                logger.error(f"{path} 启动下载目录监控失败：{e}")
+
+    def put_hash(self, download_hash: str):
+        """
+        下载器通知种子下载完成
+        """
+        if not download_hash:
+            return
+        logger.info(f"收到下载完成通知：{download_hash}")
+        with self._lock:
+            self._hashs.add(download_hash.lower())
+            self._last_time = time.time()
+
+    def put_path(self, path: str, is_directory: bool = False):
+        """
+        下载目录发生变化，处理时按路径匹配对应的已完成种子
+        """
+        if is_directory or not path:
+            return
+        file_path = Path(path)
+        if file_path.name.startswith(".") \
+                or file_path.suffix.lower() not in settings.RMT_MEDIAEXT:
+            return
+        # 媒体库在下载目录下时，整理入库产生的文件变化不能再触发整理
+        if settings.LIBRARY_PATH \
+                and any(file_path.is_relative_to(library_path)
+                        for library_path in str(settings.LIBRARY_PATH).split(",") if library_path):
+            return
+        logger.debug(f"下载目录文件变化：{path}")
+        with self._lock:
+            self._paths.add(file_path)
+            self._last_time = time.time()
+
+    def __pop(self) -> Tuple[List[str], List[Path], bool]:
+        """
+        防抖时间到达后取出待处理任务
+        :return: 种子Hash列表，变化文件列表，是否处理所有已完成的种子
+        """
+        with self._lock:
+            if not self._hashs and not self._paths and not self._full:
+                return [], [], False
+            if time.time() - self._last_time < self._debounce:
+                return [], [], False
+            hashs, paths, full = list(self._hashs), list(self._paths), self._full
+            self._hashs.clear()
+            self._paths.clear()
+            self._full = False
+            return hashs, paths, full
+
+    def __run(self):
+        """
+        事件处理线程
+        """
+        while not self._event.is_set():
+            self._event.wait(1)
+            hashs, paths, full = self.__pop()
+            if not hashs and not paths and not full:
+                continue
+            try:
+                chain = TransferChain(self._db)
+                if full:
+                    chain.process()
+                else:
+                    # 一批事件只查询一次下载器
+                    chain.process(hashs=hashs, paths=paths)
+            except Exception as e:
+                logger.error(f"下载完成整理出错：{e} - {traceback.format_exc()}")
+
+    def stop(self):
+        """
+        停止监控
+        """
+        self._event.set()
+        for observer in self._observers:
+            try:
+                observer.stop()
+                observer.join()
+            except Exception as e:
+                logger.error(f"停止下载目录监控出错：{e}")
+        self._observers = []
+
+    def __del__(self):
+        if self._db:
+            self._db.close()
@@ -3,6 +3,7 @@ import shutil
 import threading
 import time
 import traceback
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 from threading import Event
@@ -11,18 +12,20 @@ from typing import List, Tuple, Dict, Any
 from apscheduler.schedulers.background import BackgroundScheduler
 from watchdog.events import FileSystemEventHandler
 from watchdog.observers import Observer
-from watchdog.observers.polling import PollingObserver
 
 from app.chain.transfer import TransferChain
 from app.core.config import settings
 from app.core.context import MediaInfo
 from app.core.metainfo import MetaInfo
+from app.db import SessionLocal
 from app.db.downloadhistory_oper import DownloadHistoryOper
 from app.db.transferhistory_oper import TransferHistoryOper
+from app.helper.hardlink import HardLinkHelper
 from app.log import logger
 from app.modules.qbittorrent import Qbittorrent
 from app.modules.transmission import Transmission
-from app.plugins import _PluginBase
+from app.plugins import _PluginBase, PluginChian
+from app.plugins.dirmonitor.scanner import IncrementalScanner
 from app.schemas import Notification, NotificationType, TransferInfo
 from app.schemas.types import EventType, MediaType
 from app.utils.system import SystemUtils
@@ -72,7 +75,18 @@ class DirMonitor(_PluginBase):
     auth_level = 1
 
     # 已处理的文件清单
-    _synced_files = []
+    _synced_files = set()
+    # 待处理事件队列：文件路径 -> (监控目录, 最后事件时间)
+    _queue: Dict[str, Tuple[str, float]] = {}
+    # 事件防抖时间（秒）
+    _debounce = 3
+    # 兼容模式扫描间隔（秒）
+    _scan_interval = 10
+    # 每个监控目录的文件索引
+    _scanners: Dict[str, IncrementalScanner] = {}
+    # 每个监控目录的处理锁，不同目录并发处理
+    _dir_locks: Dict[str, threading.Lock] = {}
+    _executor = None
 
     # 私有属性
     _scheduler = None
@@ -103,6 +117,8 @@ class DirMonitor(_PluginBase):
 
         # 清空配置
         self._dirconf = {}
+        self._scanners = {}
+        self._dir_locks = {}
 
         # 读取配置
         if config:
@@ -148,17 +164,24 @@ class DirMonitor(_PluginBase):
                     logger.debug(str(e))
                     pass
 
+                # 文件状态索引
+                self._scanners[mon_path] = IncrementalScanner(mon_path)
+                self._dir_locks[mon_path] = threading.Lock()
+
                 try:
                     if self._mode == "compatibility":
-                        # 兼容模式，目录同步性能降低且NAS不能休眠，但可以兼容挂载的远程共享目录如SMB
-                        observer = PollingObserver(timeout=10)
+                        # 兼容模式，按文件状态索引增量扫描，可以兼容挂载的远程共享目录如SMB、NFS
+                        self._scheduler.add_job(self.__scan, trigger='interval', seconds=self._scan_interval,
+                                                args=[mon_path], next_run_time=datetime.now())
                     else:
                         # 内部处理系统操作类型选择最优解
                         observer = Observer(timeout=10)
-                    self._observer.append(observer)
-                    observer.schedule(FileMonitorHandler(mon_path, self), path=mon_path, recursive=True)
-                    observer.daemon = True
-                    observer.start()
+                        self._observer.append(observer)
+                        observer.schedule(FileMonitorHandler(mon_path, self), path=mon_path, recursive=True)
+                        observer.daemon = True
+                        observer.start()
+                        # 启动时扫描一次，补充处理停机期间新增的文件
+                        self._scheduler.add_job(self.__scan, args=[mon_path, False], next_run_time=datetime.now())
                     logger.info(f"{mon_path} 的目录监控服务启动")
                 except Exception as e:
                     err_msg = str(e)
@@ -174,6 +197,10 @@ class DirMonitor(_PluginBase):
                         logger.error(f"{mon_path} 启动目录监控失败：{err_msg}")
                     self.systemmessage.put(f"{mon_path} 启动目录监控失败：{err_msg}")
 
+            # 不同监控目录并发处理
+            self._executor = ThreadPoolExecutor(max_workers=max(1, min(len(self._dir_locks), 5)))
+            # 批量处理防抖后的事件
+            self._scheduler.add_job(self.__flush_queue, trigger='interval', seconds=self._debounce)
             # 追加入库消息统一发送服务
             self._scheduler.add_job(self.send_msg, trigger='interval', seconds=15)
             # 启动服务
@@ -182,318 +209,416 @@ class DirMonitor(_PluginBase):
 
     def event_handler(self, event, mon_path: str, text: str, event_path: str):
         """
-        处理文件变化
+        处理文件变化，放入队列等待批量处理
         :param event: 事件
         :param mon_path: 监控目录
         :param text: 事件描述
         :param event_path: 事件文件路径
         """
         if not event.is_directory:
-            # 文件发生变化
-            file_path = Path(event_path)
-            try:
-                if not file_path.exists():
-                    return
+            logger.debug("文件%s：%s" % (text, event_path))
+            self.__put_event(mon_path=mon_path, event_path=event_path)
 
-                logger.debug("文件%s：%s" % (text, event_path))
+    def __put_event(self, mon_path: str, event_path: str):
+        """
+        文件事件入队，同一文件的多次事件合并
+        """
+        with lock:
+            self._queue[event_path] = (mon_path, time.time())
 
-                # 全程加锁
-                with lock:
-                    if event_path not in self._synced_files:
-                        self._synced_files.append(event_path)
+    def __scan(self, mon_path: str, wait_stable: bool = True):
+        """
+        按文件状态索引增量扫描监控目录
+        """
+        scanner = self._scanners.get(mon_path)
+        if not scanner:
+            return
+        try:
+            for event_path in scanner.scan(wait_stable=wait_stable):
+                logger.debug("文件新增：%s" % event_path)
+                self.__put_event(mon_path=mon_path, event_path=event_path)
+        except Exception as e:
+            logger.error("目录扫描发生错误：%s - %s" % (str(e), traceback.format_exc()))
+
+    def __flush_queue(self):
+        """
+        取出超过防抖时间的事件，按监控目录分组提交处理
+        """
+        batches: Dict[str, List[str]] = {}
+        with lock:
+            now = time.time()
+            for event_path, (mon_path, event_time) in list(self._queue.items()):
+                if now - event_time < self._debounce:
+                    continue
+                del self._queue[event_path]
+                batches.setdefault(mon_path, []).append(event_path)
+        for mon_path, event_paths in batches.items():
+            if self._executor:
+                self._executor.submit(self.__handle_batch, mon_path, event_paths)
+
+    def __handle_batch(self, mon_path: str, event_paths: List[str]):
+        """
+        处理一个监控目录的一批文件，同一目录串行，不同目录并发
+        """
+        dir_lock = self._dir_locks.get(mon_path)
+        if not dir_lock:
+            return
+        with dir_lock:
+            # 每个线程使用独立的数据库会话和处理链
+            db = SessionLocal()
+            try:
+                chain = PluginChian(db)
+                transferhis = TransferHistoryOper(db)
+                downloadhis = DownloadHistoryOper(db)
+                handled, failed = [], []
+                for event_path in sorted(event_paths):
+                    if self.__handle_file(mon_path=mon_path, event_path=event_path, chain=chain,
+                                          transferhis=transferhis, downloadhis=downloadhis):
+                        handled.append(event_path)
                     else:
-                        logger.debug("文件已处理过：%s" % event_path)
-                        return
-
-                    # 命中过滤关键字不处理
-                    if self._exclude_keywords:
-                        for keyword in self._exclude_keywords.split("\n"):
-                            if keyword and re.findall(keyword, event_path):
-                                logger.debug(f"{event_path} 命中过滤关键字 {keyword}")
-                                return
-
-                    # 回收站及隐藏的文件不处理
-                    if event_path.find('/@Recycle/') != -1 \
-                            or event_path.find('/#recycle/') != -1 \
-                            or event_path.find('/.') != -1 \
-                            or event_path.find('/@eaDir') != -1:
-                        logger.debug(f"{event_path} 是回收站或隐藏的文件")
-                        return
-
-                    # 不是媒体文件不处理
-                    if file_path.suffix not in settings.RMT_MEDIAEXT:
-                        logger.debug(f"{event_path} 不是媒体文件")
-                        return
-
-                    # 查询历史记录，已转移的不处理
-                    if self.transferhis.get_by_src(event_path):
-                        logger.info(f"{event_path} 已整理过")
-                        return
-
-                    # 上级目录元数据
-                    meta = MetaInfo(title=file_path.parent.name)
-                    # 文件元数据，不包含后缀
-                    file_meta = MetaInfo(title=file_path.stem)
-                    # 合并元数据
-                    file_meta.merge(meta)
-
-                    if not file_meta.name:
-                        logger.error(f"{file_path.name} 无法识别有效信息")
-                        return
-
-                    # 查询转移目的目录
-                    target: Path = self._dirconf.get(mon_path)
-
-                    # 识别媒体信息
-                    mediainfo: MediaInfo = self.chain.recognize_media(meta=file_meta)
-                    if not mediainfo:
-                        logger.warn(f'未识别到媒体信息，标题：{file_meta.name}')
-                        if self._notify:
-                            self.chain.post_message(Notification(
-                                mtype=NotificationType.Manual,
-                                title=f"{file_path.name} 未识别到媒体信息，无法入库！"
-                            ))
-                        # 新增转移成功历史记录
-                        self.transferhis.add_force(
-                            src=event_path,
-                            dest=str(target),
-                            mode=self._transfer_type,
-                            title=meta.name,
-                            year=meta.year,
-                            seasons=file_meta.season,
-                            episodes=file_meta.episode,
-                            status=0,
-                            errmsg="未识别到媒体信息",
-                            date=time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
-                        )
-                        return
-                    logger.info(f"{file_path.name} 识别为：{mediainfo.type.value} {mediainfo.title_year}")
-
-                    # 更新媒体图片
-                    self.chain.obtain_images(mediainfo=mediainfo)
-
-                    # 转移
-                    transferinfo: TransferInfo = self.chain.transfer(mediainfo=mediainfo,
-                                                                     path=file_path,
-                                                                     transfer_type=self._transfer_type,
-                                                                     target=target,
-                                                                     meta=file_meta)
-
-                    if not transferinfo:
-                        logger.error("文件转移模块运行失败")
-                        return
-                    if not transferinfo.target_path:
-                        # 转移失败
-                        logger.warn(f"{file_path.name} 入库失败：{transferinfo.message}")
-                        if self._notify:
-                            self.chain.post_message(Notification(
-                                title=f"{mediainfo.title_year}{file_meta.season_episode} 入库失败！",
-                                text=f"原因：{transferinfo.message or '未知'}",
-                                image=mediainfo.get_message_image()
-                            ))
-                        return
-
-                    # 获取downloadhash
-                    download_hash = self.get_download_hash(src=file_path,
-                                                           tmdb_id=mediainfo.tmdb_id)
-
-                    target_path = str(transferinfo.file_list_new[0]) if transferinfo.file_list_new else str(
-                        transferinfo.target_path)
-
-                    # 新增转移成功历史记录
-                    self.transferhis.add_force(
-                        src=event_path,
-                        dest=target_path,
-                        mode=self._transfer_type,
-                        type=mediainfo.type.value,
-                        category=mediainfo.category,
-                        title=mediainfo.title,
-                        year=mediainfo.year,
-                        tmdbid=mediainfo.tmdb_id,
-                        imdbid=mediainfo.imdb_id,
-                        tvdbid=mediainfo.tvdb_id,
-                        doubanid=mediainfo.douban_id,
-                        seasons=file_meta.season,
-                        episodes=file_meta.episode,
-                        image=mediainfo.get_poster_image(),
-                        download_hash=download_hash,
-                        status=1,
-                        date=time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
-                    )
-
-                    # 刮削元数据
-                    self.chain.scrape_metadata(path=Path(target_path), mediainfo=mediainfo)
-
-                    """
-                    {
-                        "title_year season": {
-                            "files": [
-                                {
-                                    "path":,
-                                    "mediainfo":,
-                                    "file_meta":,
-                                    "transferinfo":
-                                }
-                            ],
-                            "time": "2023-08-24 23:23:23.332"
-                        }
-                    }
-                    """
-                    # 发送消息汇总
-                    media_list = self._medias.get(mediainfo.title_year + " " + meta.season) or {}
-                    if media_list:
-                        media_files = media_list.get("files") or []
-                        if media_files:
-                            file_exists = False
-                            for file in media_files:
-                                if str(event_path) == file.get("path"):
-                                    file_exists = True
-                                    break
-                            if not file_exists:
-                                media_files.append({
-                                    "path": event_path,
-                                    "mediainfo": mediainfo,
-                                    "file_meta": file_meta,
-                                    "transferinfo": transferinfo
-                                })
-                            else:
-                                media_files = [
-                                    {
-                                        "path": event_path,
-                                        "mediainfo": mediainfo,
-                                        "file_meta": file_meta,
-                                        "transferinfo": transferinfo
-                                    }
-                                ]
-                        media_list = {
-                            "files": media_files,
-                            "time": datetime.now()
+                        failed.append(event_path)
+            finally:
+                db.close()
+            scanner = self._scanners.get(mon_path)
+            if scanner:
+                # 处理完成的登记到文件状态索引，失败的按间隔重试
+                scanner.mark(handled)
+                scanner.retry(failed)
+            if failed:
+                with lock:
+                    self._synced_files.difference_update(failed)
+
+    def __handle_file(self, mon_path: str, event_path: str, chain: PluginChian,
+                      transferhis: TransferHistoryOper, downloadhis: DownloadHistoryOper) -> bool:
+        """
+        识别并转移一个文件
+        :return: 是否已处理完成，转移模块未返回结果或发生异常时返回False，稍后重试；
+                 无法识别、目标文件已存在等重试也不会成功的失败记录到转移历史，返回True
+        """
+        file_path = Path(event_path)
+        try:
+            if not file_path.exists():
+                return True
+
+            with lock:
+                if event_path in self._synced_files:
+                    logger.debug("文件已处理过：%s" % event_path)
+                    return True
+                self._synced_files.add(event_path)
+
+            # 命中过滤关键字不处理
+            if self._exclude_keywords:
+                for keyword in self._exclude_keywords.split("\n"):
+                    if keyword and re.findall(keyword, event_path):
+                        logger.debug(f"{event_path} 命中过滤关键字 {keyword}")
+                        return True
+
+            # 回收站及隐藏的文件不处理
+            if event_path.find('/@Recycle/') != -1 \
+                    or event_path.find('/#recycle/') != -1 \
+                    or event_path.find('/.') != -1 \
+                    or event_path.find('/@eaDir') != -1:
+                logger.debug(f"{event_path} 是回收站或隐藏的文件")
+                return True
+
+            # 不是媒体文件不处理
+            if file_path.suffix not in settings.RMT_MEDIAEXT:
+                logger.debug(f"{event_path} 不是媒体文件")
+                return True
+
+            # 查询历史记录，已转移的不处理
+            if transferhis.get_by_src(event_path):
+                logger.info(f"{event_path} 已整理过")
+                return True
+
+            # 上级目录元数据
+            meta = MetaInfo(title=file_path.parent.name)
+            # 文件元数据，不包含后缀
+            file_meta = MetaInfo(title=file_path.stem)
+            # 合并元数据
+            file_meta.merge(meta)
+
+            if not file_meta.name:
+                logger.error(f"{file_path.name} 无法识别有效信息")
+                return True
+
+            # 查询转移目的目录
+            target: Path = self._dirconf.get(mon_path)
+
+            # 识别媒体信息
+            mediainfo: MediaInfo = chain.recognize_media(meta=file_meta)
+            if not mediainfo:
+                logger.warn(f'未识别到媒体信息，标题：{file_meta.name}')
+                if self._notify:
+                    chain.post_message(Notification(
+                        mtype=NotificationType.Manual,
+                        title=f"{file_path.name} 未识别到媒体信息，无法入库！"
+                    ))
+                # 新增转移成功历史记录
+                transferhis.add_force(
+                    src=event_path,
+                    dest=str(target),
+                    mode=self._transfer_type,
+                    title=meta.name,
+                    year=meta.year,
+                    seasons=file_meta.season,
+                    episodes=file_meta.episode,
+                    status=0,
+                    errmsg="未识别到媒体信息",
+                    date=time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
+                )
+                return True
+            logger.info(f"{file_path.name} 识别为：{mediainfo.type.value} {mediainfo.title_year}")
+
+            # 更新媒体图片
+            chain.obtain_images(mediainfo=mediainfo)
+
+            # 转移
+            transferinfo: TransferInfo = chain.transfer(mediainfo=mediainfo,
+                                                        path=file_path,
+                                                        transfer_type=self._transfer_type,
+                                                        target=target,
+                                                        meta=file_meta)
+
+            if not transferinfo:
+                logger.error("文件转移模块运行失败")
+                return False
+            if not transferinfo.target_path:
+                # 转移失败，记录到历史不再重试
+                logger.warn(f"{file_path.name} 入库失败：{transferinfo.message}")
+                if self._notify:
+                    chain.post_message(Notification(
+                        title=f"{mediainfo.title_year}{file_meta.season_episode} 入库失败！",
+                        text=f"原因：{transferinfo.message or '未知'}",
+                        image=mediainfo.get_message_image()
+                    ))
+                transferhis.add_force(
+                    src=event_path,
+                    dest=str(target),
+                    mode=self._transfer_type,
+                    type=mediainfo.type.value,
+                    category=mediainfo.category,
+                    title=mediainfo.title,
+                    year=mediainfo.year,
+                    tmdbid=mediainfo.tmdb_id,
+                    imdbid=mediainfo.imdb_id,
+                    tvdbid=mediainfo.tvdb_id,
+                    doubanid=mediainfo.douban_id,
+                    seasons=file_meta.season,
+                    episodes=file_meta.episode,
+                    image=mediainfo.get_poster_image(),
+                    status=0,
+                    errmsg=transferinfo.message or "未知错误",
+                    date=time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
+                )
+                return True
+
+            # 获取downloadhash
+            download_hash = self.get_download_hash(src=file_path,
+                                                   tmdb_id=mediainfo.tmdb_id,
+                                                   downloadhis=downloadhis)
+
+            target_path = str(transferinfo.file_list_new[0]) if transferinfo.file_list_new else str(
+                transferinfo.target_path)
+
+            # 新增转移成功历史记录
+            transferhis.add_force(
+                src=event_path,
+                dest=target_path,
+                mode=self._transfer_type,
+                type=mediainfo.type.value,
+                category=mediainfo.category,
+                title=mediainfo.title,
+                year=mediainfo.year,
+                tmdbid=mediainfo.tmdb_id,
+                imdbid=mediainfo.imdb_id,
+                tvdbid=mediainfo.tvdb_id,
+                doubanid=mediainfo.douban_id,
+                seasons=file_meta.season,
+                episodes=file_meta.episode,
+                image=mediainfo.get_poster_image(),
+                download_hash=download_hash,
+                status=1,
+                date=time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
+            )
+
+            if self._transfer_type == "link":
+                # 登记硬链接索引
+                HardLinkHelper().add_paths(transferinfo.file_list + transferinfo.file_list_new)
+
+            # 刮削元数据
+            chain.scrape_metadata(path=Path(target_path), mediainfo=mediainfo)
+
+            """
+            {
+                "title_year season": {
+                    "files": [
+                        {
+                            "path":,
+                            "mediainfo":,
+                            "file_meta":,
+                            "transferinfo":
                         }
-                    else:
-                        media_list = {
-                            "files": [
+                    ],
+                    "time": "2023-08-24 23:23:23.332"
+                }
+            }
+            """
+            # 发送消息汇总
+            with lock:
+                media_list = self._medias.get(mediainfo.title_year + " " + meta.season) or {}
+                if media_list:
+                    media_files = media_list.get("files") or []
+                    if media_files:
+                        file_exists = False
+                        for file in media_files:
+                            if str(event_path) == file.get("path"):
+                                file_exists = True
+                                break
+                        if not file_exists:
+                            media_files.append({
+                                "path": event_path,
+                                "mediainfo": mediainfo,
+                                "file_meta": file_meta,
+                                "transferinfo": transferinfo
+                            })
+                        else:
+                            media_files = [
                                 {
                                     "path": event_path,
                                     "mediainfo": mediainfo,
                                     "file_meta": file_meta,
                                     "transferinfo": transferinfo
                                 }
-                            ],
-                            "time": datetime.now()
-                        }
-                    self._medias[mediainfo.title_year + " " + meta.season] = media_list
-
-                    # 刷新媒体库
-                    self.chain.refresh_mediaserver(mediainfo=mediainfo, file_path=target_path)
-                    # 广播事件
-                    self.eventmanager.send_event(EventType.TransferComplete, {
-                        'meta': file_meta,
-                        'mediainfo': mediainfo,
-                        'transferinfo': transferinfo
-                    })
-
-                    # 移动模式删除空目录
-                    if self._transfer_type == "move":
-                        for file_dir in file_path.parents:
-                            if len(str(file_dir)) <= len(str(Path(mon_path))):
-                                # 重要，删除到监控目录为止
-                                break
-                            files = SystemUtils.list_files(file_dir, settings.RMT_MEDIAEXT)
-                            if not files:
-                                logger.warn(f"移动模式，删除空目录：{file_dir}")
-                                shutil.rmtree(file_dir, ignore_errors=True)
-
-            except Exception as e:
-                logger.error("目录监控发生错误：%s - %s" % (str(e), traceback.format_exc()))
+                            ]
+                    media_list = {
+                        "files": media_files,
+                        "time": datetime.now()
+                    }
+                else:
+                    media_list = {
+                        "files": [
+                            {
+                                "path": event_path,
+                                "mediainfo": mediainfo,
+                                "file_meta": file_meta,
+                                "transferinfo": transferinfo
+                            }
+                        ],
+                        "time": datetime.now()
+                    }
+                self._medias[mediainfo.title_year + " " + meta.season] = media_list
+
+            # 刷新媒体库
+            chain.refresh_mediaserver(mediainfo=mediainfo, file_path=target_path)
+            # 广播事件
+            self.eventmanager.send_event(EventType.TransferComplete, {
+                'meta': file_meta,
+                'mediainfo': mediainfo,
+                'transferinfo': transferinfo
+            })
+
+            # 移动模式删除空目录
+            if self._transfer_type == "move":
+                for file_dir in file_path.parents:
+                    if len(str(file_dir)) <= len(str(Path(mon_path))):
+                        # 重要，删除到监控目录为止
+                        break
+                    files = SystemUtils.list_files(file_dir, settings.RMT_MEDIAEXT)
+                    if not files:
+                        logger.warn(f"移动模式，删除空目录：{file_dir}")
+                        shutil.rmtree(file_dir, ignore_errors=True)
+            return True
+        except Exception as e:
+            logger.error("目录监控发生错误：%s - %s" % (str(e), traceback.format_exc()))
+            return False
 
     def send_msg(self):
         """
         定时检查是否有媒体处理完，发送统一消息
         """
-        if not self._medias or not self._medias.keys():
+        if not self._medias:
             return
 
-        # 遍历检查是否已刮削完，发送消息
-        for medis_title_year_season in list(self._medias.keys()):
-            media_list = self._medias.get(medis_title_year_season)
-            logger.info(f"开始处理媒体 {medis_title_year_season} 消息")
-
-            if not media_list:
-                continue
+        # 在锁内取出最后更新时间距现在已超过3秒的媒体，发送消息时不持有锁
+        expired: Dict[str, dict] = {}
+        with lock:
+            for medis_title_year_season, media_list in list(self._medias.items()):
+                if not media_list:
+                    continue
+                # 获取最后更新时间
+                last_update_time = media_list.get("time")
+                if not last_update_time or not media_list.get("files"):
+                    continue
+                if (datetime.now() - last_update_time).total_seconds() > 3:
+                    expired[medis_title_year_season] = self._medias.pop(medis_title_year_season)
 
-            # 获取最后更新时间
-            last_update_time = media_list.get("time")
+        # 遍历已刮削完的媒体，发送消息
+        for medis_title_year_season, media_list in expired.items():
+            logger.info(f"开始处理媒体 {medis_title_year_season} 消息")
             media_files = media_list.get("files")
-            if not last_update_time or not media_files:
-                continue
-
             transferinfo = media_files[0].get("transferinfo")
             file_meta = media_files[0].get("file_meta")
             mediainfo = media_files[0].get("mediainfo")
-            # 判断最后更新时间距现在是已超过3秒，超过则发送消息
-            if (datetime.now() - last_update_time).total_seconds() > 3:
-                # 发送通知
-                if self._notify:
+            # 发送通知
+            if self._notify:
+
+                # 汇总处理文件总大小
+                total_size = 0
+                file_count = 0
+
+                # 剧集汇总
+                episodes = []
+                for file in media_files:
+                    transferinfo = file.get("transferinfo")
+                    total_size += transferinfo.total_size
+                    file_count += 1
+
+                    file_meta = file.get("file_meta")
+                    if file_meta and file_meta.begin_episode:
+                        episodes.append(file_meta.begin_episode)
+
+                transferinfo.total_size = total_size
+                # 汇总处理文件数量
+                transferinfo.file_count = file_count
+
+                # 剧集季集信息 S01 E01-E04 || S01 E01、E02、E04
+                season_episode = None
+                # 处理文件多，说明是剧集，显示季入库消息
+                if mediainfo.type == MediaType.TV and len(episodes) > 1:
+                    # 剧集季
+                    season = "S%s" % str(file_meta.begin_season).rjust(2, "0")
+
+                    # 剧集按照升序排序
+                    episodes.sort()
+                    # 开始、结束index
+                    start = int(episodes[0])
+                    end = int(episodes[len(episodes) - 1])
+
+                    # 开始结束间所有的元素 1,2,3,4
+                    all_ele = [i for i in range(start, end + 1)]
+                    # 本次剧集组所有的元素 1,2,4
+                    episode_ele = [int(e) for e in episodes]
+
+                    # 如果本次剧集组所有元素=开始结束间所有元素，则表示区间内 S01 E01-E04
+                    if all_ele == episode_ele:
+                        season_episode = f"{season} E{str(episodes[0]).rjust(2, '0')}-E{str(episodes[len(episodes) - 1]).rjust(2, '0')}"
+                    else:
+                        # 否则所有剧集组逗号分隔显示 S01 E01、E02、E04
+                        episodes = ["E%s" % str(episode).rjust(2, "0") for episode in episodes]
+                        season_episode = f"{season} {'、'.join(episodes)}"
 
-                    # 汇总处理文件总大小
-                    total_size = 0
-                    file_count = 0
-
-                    # 剧集汇总
-                    episodes = []
-                    for file in media_files:
-                        transferinfo = file.get("transferinfo")
-                        total_size += transferinfo.total_size
-                        file_count += 1
-
-                        file_meta = file.get("file_meta")
-                        if file_meta and file_meta.begin_episode:
-                            episodes.append(file_meta.begin_episode)
-
-                    transferinfo.total_size = total_size
-                    # 汇总处理文件数量
-                    transferinfo.file_count = file_count
-
-                    # 剧集季集信息 S01 E01-E04 || S01 E01、E02、E04
-                    season_episode = None
-                    # 处理文件多，说明是剧集，显示季入库消息
-                    if mediainfo.type == MediaType.TV and len(episodes) > 1:
-                        # 剧集季
-                        season = "S%s" % str(file_meta.begin_season).rjust(2, "0")
-
-                        # 剧集按照升序排序
-                        episodes.sort()
-                        # 开始、结束index
-                        start = int(episodes[0])
-                        end = int(episodes[len(episodes) - 1])
-
-                        # 开始结束间所有的元素 1,2,3,4
-                        all_ele = [i for i in range(start, end + 1)]
-                        # 本次剧集组所有的元素 1,2,4
-                        episode_ele = [int(e) for e in episodes]
-
-                        # 如果本次剧集组所有元素=开始结束间所有元素，则表示区间内 S01 E01-E04
-                        if all_ele == episode_ele:
-                            season_episode = f"{season} E{str(episodes[0]).rjust(2, '0')}-E{str(episodes[len(episodes) - 1]).rjust(2, '0')}"
-                        else:
-                            # 否则所有剧集组逗号分隔显示 S01 E01、E02、E04
-                            episodes = ["E%s" % str(episode).rjust(2, "0") for episode in episodes]
-                            season_episode = f"{season} {'、'.join(episodes)}"
-
-                    self.transferchian.send_transfer_message(meta=file_meta,
-                                                             mediainfo=mediainfo,
-                                                             transferinfo=transferinfo,
-                                                             season_episode=season_episode)
-                # 发送完消息，移出key
-                del self._medias[medis_title_year_season]
-                continue
-
-    def get_download_hash(self, src: Path, tmdb_id: int):
+                self.transferchian.send_transfer_message(meta=file_meta,
+                                                         mediainfo=mediainfo,
+                                                         transferinfo=transferinfo,
+                                                         season_episode=season_episode)
+
+    def get_download_hash(self, src: Path, tmdb_id: int, downloadhis: DownloadHistoryOper = None):
         """
         获取download_hash
         """
         file_name = src.name
-        downloadHis = self.downloadhis.get_last_by(tmdbid=tmdb_id)
+        downloadHis = (downloadhis or self.downloadhis).get_last_by(tmdbid=tmdb_id)
         if downloadHis:
             for his in downloadHis:
                 # qb
@@ -727,3 +852,8 @@ class DirMonitor(_PluginBase):
                 self._scheduler.shutdown()
                 self._event.clear()
             self._scheduler = None
+        if self._executor:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        with lock:
+            self._queue = {}
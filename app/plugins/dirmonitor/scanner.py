@@ -0,0 +1,245 @@
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Set, Optional, Tuple
+
+from app.core.config import settings
+from app.db.filestate_oper import FileStateOper, FileStat
+from app.helper.hardlink import HardLinkHelper
+from app.log import logger
+
+
+class IncrementalScanner:
+    """
+    基于持久化文件状态索引的增量扫描，用于兼容模式下监控NFS/SMB等远程挂载目录
+    - 目录的修改时间未变化时不重新列出该目录，只递归检查已知的子目录
+    - 新文件的大小和修改时间在两次扫描间保持不变后才返回，避免处理未复制完成的文件
+    - 返回的文件处理成功后才登记到索引，处理失败的按递增的间隔重新返回，超过重试次数后登记到索引不再返回
+    - 索引及重试次数保存在数据库中，重启后只返回停机期间新增和未处理成功的文件
+    """
+    # 处理失败的最大重试次数
+    _max_retries = 5
+    # 首次重试间隔（秒），之后每次翻倍
+    _retry_interval = 60
+
+    def __init__(self, root: str):
+        self._root = str(Path(root))
+        self._oper = FileStateOper()
+        # 路径 -> 状态
+        self._index: Dict[str, FileStat] = self._oper.load(self._root)
+        # 目录 -> 子路径
+        self._children: Dict[str, Set[str]] = {}
+        for path in self._index.keys():
+            if path != self._root:
+                self._children.setdefault(os.path.dirname(path), set()).add(path)
+        # 等待稳定的新文件：路径 -> 上次观察到的状态
+        self._pending: Dict[str, FileStat] = {}
+        # 已返回等待处理结果的文件：路径 -> 状态
+        self._ready: Dict[str, FileStat] = {}
+        # 处理失败的文件：路径 -> (失败时的状态, 重试次数)
+        self._retries: Dict[str, Tuple[FileStat, int]] = self._oper.load_retries(self._root)
+        # 处理失败的文件下次允许返回的时间
+        self._retry_after: Dict[str, float] = {}
+        # 本次扫描中已删除的处理失败文件
+        self._retry_removed: List[str] = []
+        self._lock = threading.Lock()
+
+    @property
+    def seeded(self) -> bool:
+        """
+        是否已建立过索引
+        """
+        return self._root in self._index
+
+    @staticmethod
+    def __is_media(path: str) -> bool:
+        return os.path.splitext(path)[-1].lower() in settings.RMT_MEDIAEXT
+
+    @staticmethod
+    def __stat(path: str, st: os.stat_result = None, is_dir: bool = False) -> Optional[FileStat]:
+        try:
+            if not st:
+                st = os.stat(path)
+            return 1 if is_dir else 0, st.st_size, st.st_mtime, st.st_ino, st.st_dev
+        except OSError:
+            return None
+
+    def __remove(self, path: str, removed: List[str]):
+        """
+        从索引中移除路径及其所有下级
+        """
+        for child in self._children.pop(path, set()):
+            self.__remove(child, removed)
+        if self._index.pop(path, None) is not None:
+            removed.append(path)
+        self._pending.pop(path, None)
+        self._ready.pop(path, None)
+        self._retry_after.pop(path, None)
+        if self._retries.pop(path, None):
+            self._retry_removed.append(path)
+
+    def __record(self, path: str, stat: FileStat, changed: Dict[str, FileStat]):
+        """
+        记录路径状态到索引
+        """
+        self._index[path] = stat
+        changed[path] = stat
+        if path != self._root:
+            self._children.setdefault(os.path.dirname(path), set()).add(path)
+
+    def __walk(self, directory: str, changed: Dict[str, FileStat],
+               removed: List[str], seed: bool):
+        """
+        递归比对目录
+        """
+        stat = self.__stat(directory, is_dir=True)
+        if not stat:
+            self.__remove(directory, removed)
+            return
+        old = self._index.get(directory)
+        if old and old[2] == stat[2]:
+            # 目录未变化，只检查已知的子目录
+            for child in list(self._children.get(directory, set())):
+                if self._index.get(child, (0,))[0]:
+                    self.__walk(child, changed, removed, seed)
+            return
+        # 目录有变化，重新列出
+        current = set()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.name.startswith(".") or entry.name in ["@eaDir", "@Recycle", "#recycle"]:
+                        continue
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            current.add(entry.path)
+                            self.__walk(entry.path, changed, removed, seed)
+                        elif entry.is_file() and self.__is_media(entry.path):
+                            current.add(entry.path)
+                            if entry.path in self._index \
+                                    or entry.path in self._pending or entry.path in self._ready:
+                                continue
+                            file_stat = self.__stat(entry.path, st=entry.stat())
+                            if not file_stat:
+                                continue
+                            if seed:
+                                self.__record(entry.path, file_stat, changed)
+                            else:
+                                self._pending[entry.path] = file_stat
+                    except OSError as err:
+                        logger.debug(f"读取 {entry.path} 出错：{err}")
+        except OSError as err:
+            logger.warn(f"列出目录 {directory} 出错：{err}")
+            return
+        # 已删除的路径
+        for child in list(self._children.get(directory, set())):
+            if child not in current:
+                self.__remove(child, removed)
+        if any(path in self._pending or path in self._ready for path in current):
+            # 有未处理完成的文件时不记录目录的修改时间，下次扫描（包括重启后）重新列出
+            stat = stat[:2] + (0,) + stat[3:]
+        self.__record(directory, stat, changed)
+
+    def scan(self, wait_stable: bool = True) -> List[str]:
+        """
+        增量扫描，返回新增且已稳定的媒体文件
+        :param wait_stable: 是否等待文件大小稳定，为False时新增文件直接返回
+        """
+        with self._lock:
+            return self.__scan(wait_stable)
+
+    def __scan(self, wait_stable: bool) -> List[str]:
+        changed: Dict[str, FileStat] = {}
+        removed: List[str] = []
+        ready: List[str] = []
+        seed = not self.seeded
+        if seed:
+            logger.info(f"{self._root} 首次建立文件索引 ...")
+        # 记录本次扫描前已在等待的文件，新发现的文件至少等待一个周期
+        waiting = dict(self._pending)
+        self.__walk(self._root, changed, removed, seed)
+        if not wait_stable:
+            waiting = dict(self._pending)
+        now = time.time()
+        for path, last_stat in waiting.items():
+            if path not in self._pending:
+                continue
+            stat = self.__stat(path)
+            if not stat:
+                self._pending.pop(path, None)
+                continue
+            if self._retry_after.get(path, 0) > now:
+                # 处理失败的文件未到重试时间
+                self._pending[path] = stat
+                continue
+            if not wait_stable or stat[1:3] == last_stat[1:3]:
+                # 大小和修改时间已稳定，处理成功后再登记到索引
+                self._pending.pop(path, None)
+                self._ready[path] = stat
+                ready.append(path)
+            else:
+                self._pending[path] = stat
+        self._oper.save(self._root, changed, removed)
+        if self._retry_removed:
+            self._oper.save_retries(self._root, {}, self._retry_removed)
+            self._retry_removed = []
+        HardLinkHelper().update(changed, removed)
+        if seed:
+            logger.info(f"{self._root} 文件索引建立完成，共 {len(self._index)} 条")
+        return ready
+
+    def mark(self, paths: List[str]):
+        """
+        处理成功的文件登记到索引，避免重启后重复处理
+        """
+        if not paths:
+            return
+        with self._lock:
+            self.__mark(paths)
+
+    def __mark(self, paths: List[str]):
+        changed: Dict[str, FileStat] = {}
+        retry_removed: List[str] = []
+        for path in paths:
+            self._pending.pop(path, None)
+            self._ready.pop(path, None)
+            self._retry_after.pop(path, None)
+            if self._retries.pop(path, None):
+                retry_removed.append(path)
+            stat = self.__stat(path)
+            if stat:
+                self.__record(path, stat, changed)
+        self._oper.save(self._root, changed)
+        self._oper.save_retries(self._root, {}, retry_removed)
+        HardLinkHelper().update(changed)
+
+    def retry(self, paths: List[str]):
+        """
+        处理失败的文件重新等待，重试间隔逐次翻倍，超过最大重试次数后登记到索引不再返回
+        文件大小或修改时间变化后重新计数
+        """
+        if not paths:
+            return
+        with self._lock:
+            changed: Dict[str, Tuple[FileStat, int]] = {}
+            given_up: List[str] = []
+            now = time.time()
+            for path in paths:
+                stat = self._ready.pop(path, None) or self.__stat(path)
+                if not stat or path in self._index:
+                    continue
+                last_stat, retries = self._retries.get(path) or (None, 0)
+                if not last_stat or last_stat[1:3] != stat[1:3]:
+                    retries = 0
+                retries += 1
+                if retries > self._max_retries:
+                    logger.warn(f"{path} 已重试 {self._max_retries} 次仍处理失败，不再自动重试")
+                    given_up.append(path)
+                    continue
+                self._retries[path] = (stat, retries)
+                changed[path] = (stat, retries)
+                self._retry_after[path] = now + self._retry_interval * 2 ** (retries - 1)
+                self._pending[path] = stat
+            self._oper.save_retries(self._root, changed)
+            self.__mark(given_up)
@@ -14,6 +14,8 @@ from app.core.config import settings
 from app.core.event import eventmanager, Event
 from app.db.models.transferhistory import TransferHistory
 from app.db.transferhistory_oper import TransferHistoryOper
+from app.helper.hardlink import HardLinkHelper
+from app.helper.library import LibraryHelper
 from app.log import logger
 from app.modules.emby import Emby
 from app.modules.jellyfin import Jellyfin
@@ -21,7 +23,7 @@ from app.modules.qbittorrent import Qbittorrent
 from app.modules.themoviedb.tmdbv3api import Episode
 from app.modules.transmission import Transmission
 from app.plugins import _PluginBase
-from app.schemas.types import NotificationType, EventType
+from app.schemas.types import NotificationType, EventType, MediaType
 from app.utils.path_utils import PathUtils
 
 
@@ -521,16 +523,23 @@ class MediaSyncDel(_PluginBase):
         for transferhis in transfer_history:
             image = transferhis.image
             year = transferhis.year
+            # 媒体库索引中移除
+            self.__remove_library_index(transferhis, media_type)
             # 删除种子任务
             if self._del_source:
                 # 0、删除转移记录
                 self._transferhis.delete(transferhis.id)
                 # 1、直接删除源文件
                 if transferhis.src and Path(transferhis.src).suffix in settings.RMT_MEDIAEXT:
+                    # 源文件在媒体库中还有其它硬链接时保留
+                    if HardLinkHelper().is_linked_to_library(transferhis.src, exclude=[transferhis.dest]):
+                        logger.info(f"{transferhis.src} 在媒体库中仍有硬链接，不删除源文件")
+                        continue
                     source_name = os.path.basename(transferhis.src)
                     source_path = str(transferhis.src).replace(source_name, "")
                     self.delete_media_file(filedir=source_path,
                                            filename=source_name)
+                    HardLinkHelper().remove_paths([transferhis.src])
                     if transferhis.download_hash:
                         try:
                             # 2、判断种子是否被删除完
@@ -671,16 +680,23 @@ class MediaSyncDel(_PluginBase):
             for transferhis in transfer_history:
                 image = transferhis.image
                 self._transferhis.delete(transferhis.id)
+                # 媒体库索引中移除
+                self.__remove_library_index(transferhis, media_type)
                 # 删除种子任务
                 if self._del_source:
                     # 0、删除转移记录
                     self._transferhis.delete(transferhis.id)
                     # 1、直接删除源文件
                     if transferhis.src and Path(transferhis.src).suffix in settings.RMT_MEDIAEXT:
+                        # 源文件在媒体库中还有其它硬链接时保留
+                        if HardLinkHelper().is_linked_to_library(transferhis.src, exclude=[transferhis.dest]):
+                            logger.info(f"{transferhis.src} 在媒体库中仍有硬链接，不删除源文件")
+                            continue
                         source_name = os.path.basename(transferhis.src)
                         source_path = str(transferhis.src).replace(source_name, "")
                         self.delete_media_file(filedir=source_path,
                                                filename=source_name)
+                        HardLinkHelper().remove_paths([transferhis.src])
                         if transferhis.download_hash:
                             try:
                                 # 2、判断种子是否被删除完
@@ -721,6 +737,28 @@ class MediaSyncDel(_PluginBase):
 
         self.save_data("last_time", datetime.datetime.now())
 
+    @staticmethod
+    def __remove_library_index(transferhis: TransferHistory, media_type: str):
+        """
+        媒体库索引中移除已删除媒体的整理入库数据，避免媒体服务器同步前仍判断为已存在
+        :param transferhis: 转移记录
+        :param media_type: 删除的媒体类型 Movie|Series|Season|Episode
+        """
+        if not transferhis.tmdbid or transferhis.type not in [MediaType.MOVIE.value, MediaType.TV.value]:
+            return
+        season, episodes = None, None
+        if media_type in ["Season", "Episode"] and transferhis.seasons:
+            nums = re.findall(r"\d+", transferhis.seasons)
+            if nums:
+                season = int(nums[0])
+        if media_type == "Episode" and transferhis.episodes:
+            # E01 或 E01-E03
+            nums = [int(num) for num in re.findall(r"\d+", transferhis.episodes)]
+            if nums:
+                episodes = list(range(nums[0], nums[-1] + 1))
+        LibraryHelper().remove_transferred(tmdbid=transferhis.tmdbid, mtype=MediaType(transferhis.type),
+                                           season=season, episodes=episodes)
+
     def handle_torrent(self, src: str, torrent_hash: str):
         """
         判断种子是否局部删除
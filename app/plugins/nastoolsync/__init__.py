@@ -128,6 +128,7 @@ class NAStoolSync(_PluginBase):
             logger.info("MoviePilot插件记录已清空")
             self._plugindata.truncate()
 
+        plugin_datas = []
         for history in plugin_history:
             plugin_id = history[1]
             plugin_key = history[2]
@@ -161,9 +162,10 @@ class NAStoolSync(_PluginBase):
                                     sub_downloaders[0]):
                                 value["downloader"] = sub_downloaders[1]
 
-            self._plugindata.save(plugin_id=plugin_id,
-                                  key=plugin_key,
-                                  value=plugin_value)
+            plugin_datas.append((plugin_id, plugin_key, plugin_value))
+
+        # 批量写入
+        self._plugindata.save_batch(plugin_datas)
 
         # 计算耗时
         end_time = datetime.now()
@@ -182,6 +184,7 @@ class NAStoolSync(_PluginBase):
             logger.info("MoviePilot下载记录已清空")
             self._downloadhistory.truncate()
 
+        download_histories = []
         for history in download_history:
             mpath = history[0]
             mtype = history[1]
@@ -204,20 +207,23 @@ class NAStoolSync(_PluginBase):
                     if str(msite) == str(sub_sites[0]):
                         msite = str(sub_sites[1])
 
-            self._downloadhistory.add(
-                path=os.path.basename(mpath),
-                type=mtype,
-                title=mtitle,
-                year=myear,
-                tmdbid=mtmdbid,
-                seasons=mseasons,
-                episodes=mepisodes,
-                image=mimages,
-                download_hash=mdownload_hash,
-                torrent_name=mtorrent,
-                torrent_description=mdesc,
-                torrent_site=msite
-            )
+            download_histories.append({
+                "path": os.path.basename(mpath),
+                "type": mtype,
+                "title": mtitle,
+                "year": myear,
+                "tmdbid": mtmdbid,
+                "seasons": mseasons,
+                "episodes": mepisodes,
+                "image": mimages,
+                "download_hash": mdownload_hash,
+                "torrent_name": mtorrent,
+                "torrent_description": mdesc,
+                "torrent_site": msite
+            })
+
+        # 批量写入
+        self._downloadhistory.add_batch(download_histories)
 
         # 计算耗时
         end_time = datetime.now()
@@ -264,6 +270,9 @@ class NAStoolSync(_PluginBase):
         tr_torrents_all, _ = self.tr.get_torrents()
 
         # 处理数据，存入mp数据库
+        plugin_datas = []
+        download_histories = []
+        transfer_histories = []
         for history in transfer_history:
             msrc_path = history[0]
             msrc_filename = history[1]
@@ -327,37 +336,37 @@ class NAStoolSync(_PluginBase):
                         mdownload_hash = mate_torrents[0].get("hashString")
                         torrent_name = str(mate_torrents[0].get("name"))
                         # 补充转种记录
-                        self._plugindata.save(plugin_id="TorrentTransfer",
-                                              key=f"qbittorrent-{mdownload_hash}",
-                                              value={
-                                                  "to_download": "transmission",
-                                                  "to_download_id": mdownload_hash,
-                                                  "delete_source": True}
-                                              )
+                        plugin_datas.append(("TorrentTransfer",
+                                             f"qbittorrent-{mdownload_hash}",
+                                             {
+                                                 "to_download": "transmission",
+                                                 "to_download_id": mdownload_hash,
+                                                 "delete_source": True}
+                                             ))
                         # 补充辅种记录
                         if len(mate_torrents) > 1:
-                            self._plugindata.save(plugin_id="IYUUAutoSeed",
-                                                  key=mdownload_hash,
-                                                  value=[{"downloader": "transmission",
-                                                          "torrents": [torrent.get("hashString") for torrent in
-                                                                       mate_torrents[1:]]}]
-                                                  )
+                            plugin_datas.append(("IYUUAutoSeed",
+                                                 mdownload_hash,
+                                                 [{"downloader": "transmission",
+                                                   "torrents": [torrent.get("hashString") for torrent in
+                                                                mate_torrents[1:]]}]
+                                                 ))
 
                 # 补充下载历史
-                self._downloadhistory.add(
-                    path=msrc_filename,
-                    type=mtype,
-                    title=mtitle,
-                    year=myear,
-                    tmdbid=mtmdbid,
-                    seasons=mseasons,
-                    episodes=mepisodes,
-                    image=mimage,
-                    download_hash=mdownload_hash,
-                    torrent_name=torrent_name,
-                    torrent_description="",
-                    torrent_site=""
-                )
+                download_histories.append({
+                    "path": msrc_filename,
+                    "type": mtype,
+                    "title": mtitle,
+                    "year": myear,
+                    "tmdbid": mtmdbid,
+                    "seasons": mseasons,
+                    "episodes": mepisodes,
+                    "image": mimage,
+                    "download_hash": mdownload_hash,
+                    "torrent_name": torrent_name,
+                    "torrent_description": "",
+                    "torrent_site": ""
+                })
 
             # 处理路径映射
             if self._path:
@@ -367,24 +376,28 @@ class NAStoolSync(_PluginBase):
                     msrc = msrc.replace(sub_paths[0], sub_paths[1]).replace('\\', '/')
                     mdest = mdest.replace(sub_paths[0], sub_paths[1]).replace('\\', '/')
 
-            # 存库
-            self._transferhistory.add_force(
-                src=msrc,
-                dest=mdest,
-                mode=mmode,
-                type=mtype,
-                category=mcategory,
-                title=mtitle,
-                year=myear,
-                tmdbid=mtmdbid,
-                seasons=mseasons,
-                episodes=mepisodes,
-                image=mimage,
-                download_hash=mdownload_hash,
-                date=mdate
-            )
+            transfer_histories.append({
+                "src": msrc,
+                "dest": mdest,
+                "mode": mmode,
+                "type": mtype,
+                "category": mcategory,
+                "title": mtitle,
+                "year": myear,
+                "tmdbid": mtmdbid,
+                "seasons": mseasons,
+                "episodes": mepisodes,
+                "image": mimage,
+                "download_hash": mdownload_hash,
+                "date": mdate
+            })
             logger.debug(f"{mtitle} {myear} {mtmdbid} {mseasons} {mepisodes} 已同步")
 
+        # 批量存库
+        self._plugindata.save_batch(plugin_datas)
+        self._downloadhistory.add_batch(download_histories)
+        self._transferhistory.add_force_batch(transfer_histories)
+
         # 计算耗时
         end_time = datetime.now()
 
@@ -14,6 +14,7 @@ from app import schemas
 from app.core.config import settings
 from app.core.event import Event
 from app.core.event import eventmanager
+from app.db.sitestatistic_oper import SiteStatisticOper
 from app.helper.browser import PlaywrightHelper
 from app.helper.module import ModuleHelper
 from app.helper.sites import SitesHelper
@@ -58,6 +59,11 @@ class SiteStatistic(_PluginBase):
     _last_update_time: Optional[datetime] = None
     _sites_data: dict = {}
     _site_schema: List[ISiteUserInfo] = None
+    # 明细数据保留天数，按天汇总的数据不清理
+    _keep_days: int = 90
+    statisticoper: SiteStatisticOper = None
+    # 上一次统计的站点数据
+    _last_statistic: Dict[str, dict] = {}
 
     # 配置属性
     _enabled: bool = False
@@ -70,8 +76,11 @@ class SiteStatistic(_PluginBase):
 
     def init_plugin(self, config: dict = None):
         self.sites = SitesHelper()
+        self.statisticoper = SiteStatisticOper(self.db)
         # 停止现有任务
         self.stop_service()
+        # 导入按天保存的历史数据
+        self.__import_legacy_data()
 
         # 配置
         if config:
@@ -162,6 +171,18 @@ class SiteStatistic(_PluginBase):
             "methods": ["GET"],
             "summary": "刷新站点数据",
             "description": "刷新对应域名的站点数据",
+        }, {
+            "path": "/history",
+            "endpoint": self.history,
+            "methods": ["GET"],
+            "summary": "站点数据历史",
+            "description": "按时间范围查询站点数据，粒度可选 raw、day、week",
+        }, {
+            "path": "/deltas",
+            "endpoint": self.deltas,
+            "methods": ["GET"],
+            "summary": "站点数据增量",
+            "description": "查询时间范围内每个站点的上传、下载等增量",
         }]
 
     def get_form(self) -> Tuple[List[dict], Dict[str, Any]]:
@@ -322,16 +343,8 @@ class SiteStatistic(_PluginBase):
         """
         拼装插件详情页面，需要返回页面配置，同时附带数据
         """
-        #
-        # 最近两天的日期数组
-        date_list = [(datetime.now() - timedelta(days=i)).date() for i in range(2)]
-        # 最近一天的签到数据
-        stattistic_data: Dict[str, Dict[str, Any]] = {}
-        for day in date_list:
-            current_day = day.strftime("%Y-%m-%d")
-            stattistic_data = self.get_data(current_day)
-            if stattistic_data:
-                break
+        # 每个站点的最新数据
+        stattistic_data: Dict[str, Dict[str, Any]] = self.statisticoper.latest()
         if not stattistic_data:
             return [
                 {
@@ -900,7 +913,8 @@ class SiteStatistic(_PluginBase):
             if not site_schema:
                 logger.error("站点 %s 无法识别站点类型" % site_name)
                 return None
-            return site_schema(site_name, url, site_cookie, html_text, session=session, ua=ua, proxy=proxy)
+            return site_schema(site_name, url, site_cookie, html_text, session=session, ua=ua, proxy=proxy,
+                               last_seeding=self._last_statistic.get(site_name))
         return None
 
     def refresh_by_domain(self, domain: str) -> schemas.Response:
@@ -925,6 +939,54 @@ class SiteStatistic(_PluginBase):
             message=f"站点 {domain} 不存在"
         )
 
+    def history(self, site: str = None, start: int = None, end: int = None,
+                period: str = "day") -> schemas.Response:
+        """
+        查询站点数据历史，可由API调用
+        :param site: 站点名称，为空时查询全部站点
+        :param start: 开始时间戳
+        :param end: 结束时间戳
+        :param period: 粒度，raw 每次刷新的数据，day 每天，week 每周
+        """
+        if period not in ["raw", "day", "week"]:
+            return schemas.Response(success=False, message=f"不支持的粒度：{period}")
+        return schemas.Response(
+            success=True,
+            data=self.statisticoper.range(site=site, start=start, end=end, period=period)
+        )
+
+    def deltas(self, start: int, end: int = None) -> schemas.Response:
+        """
+        查询时间范围内每个站点的增量，可由API调用
+        :param start: 开始时间戳
+        :param end: 结束时间戳，默认为最新数据
+        """
+        return schemas.Response(
+            success=True,
+            data=self.statisticoper.deltas(start=start, end=end)
+        )
+
+    def __import_legacy_data(self):
+        """
+        将按天保存在插件数据中的历史数据导入时间序列表，导入后删除
+        """
+        if self.get_data("imported"):
+            return
+        count = 0
+        for data in self.plugindata.get_data_all(self.__class__.__name__) or []:
+            try:
+                datetime.strptime(data.key, "%Y-%m-%d")
+            except ValueError:
+                continue
+            value = self.get_data(data.key)
+            if isinstance(value, dict):
+                count += self.statisticoper.import_daily(data.key, value)
+            self.del_data(data.key)
+        self.del_data("last_update_time")
+        self.save_data("imported", True)
+        if count:
+            logger.info(f"站点数据统计历史数据导入完成，共 {count} 条")
+
     def __refresh_site_data(self, site_info: CommentedMap) -> Optional[ISiteUserInfo]:
         """
         更新单个site 数据信息
@@ -1031,33 +1093,36 @@ class SiteStatistic(_PluginBase):
             if not refresh_sites:
                 return
 
+            # 上一次的统计数据，做种数未变化的站点不再解析做种页面
+            self._last_statistic = self.statisticoper.latest()
+
             # 并发刷新
             with ThreadPool(min(len(refresh_sites), int(self._queue_cnt or 5))) as p:
                 p.map(self.__refresh_site_data, refresh_sites)
 
-            # 获取今天的日期
-            key = datetime.now().strftime('%Y-%m-%d')
-            # 保存数据
-            self.save_data(key, self._sites_data)
+            # 今天之前最后一次记录的时间，增量为与前一天数据的差值
+            today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+            last_ts = self.statisticoper.last_ts(before=int(today.timestamp()))
+            # 保存本次刷新的站点数据
+            refresh_names = [site.get("name") for site in refresh_sites]
+            self.statisticoper.add_points({name: self._sites_data.get(name) for name in refresh_names})
+            # 清理过期的明细数据
+            self.statisticoper.prune(self._keep_days)
 
             # 通知刷新完成
             if self._notify:
-                yesterday_sites_data = {}
-                # 增量数据
-                if self._statistic_type == "add":
-                    last_update_time = self.get_data("last_update_time")
-                    if last_update_time:
-                        yesterday_sites_data = self.get_data(last_update_time) or {}
+                if self._statistic_type == "add" and last_ts:
+                    # 增量数据，与前一天最后一次记录比较
+                    sites_data = self.statisticoper.deltas(start=last_ts)
+                else:
+                    sites_data = {name: self._sites_data.get(name) for name in refresh_names
+                                  if self._sites_data.get(name) and not self._sites_data[name].get("err_msg")}
 
                 messages = []
                 # 按照上传降序排序
-                sites = self._sites_data.keys()
-                uploads = [self._sites_data[site].get("upload") or 0 if not yesterday_sites_data.get(site) else
-                           (self._sites_data[site].get("upload") or 0) - (
-                                   yesterday_sites_data[site].get("upload") or 0) for site in sites]
-                downloads = [self._sites_data[site].get("download") or 0 if not yesterday_sites_data.get(site) else
-                             (self._sites_data[site].get("download") or 0) - (
-                                     yesterday_sites_data[site].get("download") or 0) for site in sites]
+                sites = sites_data.keys()
+                uploads = [sites_data[site].get("upload") or 0 for site in sites]
+                downloads = [sites_data[site].get("download") or 0 for site in sites]
                 data_list = sorted(list(zip(sites, uploads, downloads)),
                                    key=lambda x: x[1],
                                    reverse=True)
@@ -1085,8 +1150,6 @@ class SiteStatistic(_PluginBase):
                     self.post_message(mtype=NotificationType.SiteMessage,
                                       title="站点数据统计", text="\n".join(messages))
 
-        # 更新时间
-        self.save_data("last_update_time", key)
         logger.info("站点数据刷新完成")
 
     def __update_config(self):
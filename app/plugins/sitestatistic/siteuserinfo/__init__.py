@@ -2,12 +2,14 @@
 import json
 import re
 from abc import ABCMeta, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
-from typing import Optional
+from typing import Optional, List
 from urllib.parse import urljoin, urlsplit
 
 import requests
 from requests import Session
+from requests.adapters import HTTPAdapter
 
 from app.core.config import settings
 from app.helper.cloudflare import under_challenge
@@ -38,6 +40,8 @@ class ISiteUserInfo(metaclass=ABCMeta):
     schema = SiteSchema.NexusPhp
     # 站点解析时判断顺序，值越小越先解析
     order = SITE_BASE_ORDER
+    # 单个站点同时请求的页面数
+    _page_workers = 4
 
     def __init__(self, site_name: str,
                  url: str,
@@ -46,7 +50,8 @@ class ISiteUserInfo(metaclass=ABCMeta):
                  session: Session = None,
                  ua: str = None,
                  emulate: bool = False,
-                 proxy: bool = None):
+                 proxy: bool = None,
+                 last_seeding: dict = None):
         super().__init__()
         # 站点信息
         self.site_name = None
@@ -107,7 +112,13 @@ class ISiteUserInfo(metaclass=ABCMeta):
         self._site_cookie = site_cookie
         self._index_html = index_html
         self._session = session if session else requests.Session()
+        # 并发请求时复用连接
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self._page_workers)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
         self._ua = ua
+        # 上一次统计的做种数据，做种数未变化时不再解析做种页面
+        self._last_seeding = last_seeding or {}
 
         self._emulate = emulate
         self._proxy = proxy
@@ -168,27 +179,70 @@ class ISiteUserInfo(metaclass=ABCMeta):
 
                 unread_msg_links.extend(msg_links)
 
+        if not unread_msg_links:
+            return
         for msg_link in unread_msg_links:
             logger.debug(f"{self.site_name} 信息链接 {msg_link}")
-            head, date, content = self._parse_message_content(self._get_page_content(urljoin(self._base_url, msg_link)))
+        # 并发获取消息内容，按顺序解析
+        for html_text in self._get_pages_content([urljoin(self._base_url, msg_link)
+                                                  for msg_link in unread_msg_links]):
+            head, date, content = self._parse_message_content(html_text)
             logger.debug(f"{self.site_name} 标题 {head} 时间 {date} 内容 {content}")
             self.message_unread_contents.append((head, date, content))
 
     def _parse_seeding_pages(self):
-        if self._torrent_seeding_page:
-            # 第一页
-            next_page = self._parse_user_torrent_seeding_info(
-                self._get_page_content(urljoin(self._base_url, self._torrent_seeding_page),
-                                       self._torrent_seeding_params,
-                                       self._torrent_seeding_headers))
-
-            # 其他页处理
-            while next_page:
-                next_page = self._parse_user_torrent_seeding_info(
-                    self._get_page_content(urljoin(urljoin(self._base_url, self._torrent_seeding_page), next_page),
+        if not self._torrent_seeding_page:
+            return
+        # 做种数未变化时沿用上一次的做种体积
+        if self.seeding and self.seeding == self._last_seeding.get("seeding") \
+                and self._last_seeding.get("seeding_size"):
+            logger.debug(f"{self.site_name} 做种数未变化，跳过做种页面解析")
+            if not self.seeding_size:
+                self.seeding_size = self._last_seeding.get("seeding_size")
+            return
+        # 第一页
+        html_text = self._get_page_content(urljoin(self._base_url, self._torrent_seeding_page),
                                            self._torrent_seeding_params,
-                                           self._torrent_seeding_headers),
-                    multi_page=True)
+                                           self._torrent_seeding_headers)
+        seeding = self.seeding
+        next_page = self._parse_user_torrent_seeding_info(html_text)
+
+        # 其他页处理
+        while next_page:
+            page_url = urljoin(urljoin(self._base_url, self._torrent_seeding_page), next_page)
+            # 当前页有做种数据时，尝试从分页信息中获取剩余所有页面并发获取
+            if self.seeding != seeding:
+                page_urls = self._parse_seeding_page_urls(html_text, page_url)
+                if page_urls:
+                    logger.debug(f"{self.site_name} 做种页面共 {len(page_urls) + 1} 页，并发获取中 ...")
+                    for page_html in self._get_pages_content(page_urls,
+                                                             self._torrent_seeding_params,
+                                                             self._torrent_seeding_headers):
+                        self._parse_user_torrent_seeding_info(page_html, multi_page=True)
+                    return
+            html_text = self._get_page_content(page_url,
+                                               self._torrent_seeding_params,
+                                               self._torrent_seeding_headers)
+            seeding = self.seeding
+            next_page = self._parse_user_torrent_seeding_info(html_text, multi_page=True)
+
+    def _parse_seeding_page_urls(self, html_text: str, next_page_url: str) -> Optional[List[str]]:
+        """
+        从做种页面的分页信息中解析剩余所有页面的地址，不支持时返回None，逐页获取
+        :param html_text: 当前页面
+        :param next_page_url: 下一页地址
+        :return: 从下一页开始的所有页面地址
+        """
+        return None
+
+    def _get_pages_content(self, urls: List[str], params: dict = None, headers: dict = None) -> List[str]:
+        """
+        并发获取多个页面，按传入顺序返回
+        """
+        if len(urls) <= 1:
+            return [self._get_page_content(url, params, headers) for url in urls]
+        with ThreadPoolExecutor(max_workers=min(len(urls), self._page_workers)) as executor:
+            return list(executor.map(lambda url: self._get_page_content(url, params, headers), urls))
 
     @staticmethod
     def _prepare_html_text(html_text):
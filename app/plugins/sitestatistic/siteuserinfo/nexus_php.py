@@ -1,6 +1,6 @@
 # -*- coding: utf-8 -*-
 import re
-from typing import Optional
+from typing import Optional, List
 
 from lxml import etree
 
@@ -228,6 +228,27 @@ class NexusPhpSiteUserInfo(ISiteUserInfo):
 
         return next_page
 
+    def _parse_seeding_page_urls(self, html_text: str, next_page_url: str) -> Optional[List[str]]:
+        """
+        NexusPhp分页链接中带有页码（从0开始），按最大页码生成剩余所有页面地址
+        """
+        next_page_match = re.search(r"[?&]page=(\d+)", next_page_url)
+        if not next_page_match:
+            return None
+        html = etree.HTML(str(html_text).replace(r'\/', '/'))
+        if not html:
+            return None
+        pages = []
+        for href in html.xpath('//a[contains(@href, "page=")]/@href'):
+            page_match = re.search(r"[?&]page=(\d+)", href)
+            if page_match:
+                pages.append(int(page_match.group(1)))
+        next_page = int(next_page_match.group(1))
+        if not pages or max(pages) <= next_page:
+            return None
+        return [re.sub(r"([?&]page=)\d+", rf"\g<1>{page}", next_page_url)
+                for page in range(next_page, max(pages) + 1)]
+
     def _parse_user_detail_info(self, html_text: str):
         """
         解析用户额外信息，加入时间，等级
@@ -2,6 +2,7 @@ import re
 import threading
 import time
 from datetime import datetime, timedelta
+from pathlib import Path
 from typing import List, Tuple, Dict, Any, Optional
 
 import pytz
@@ -9,6 +10,7 @@ from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
 
 from app.core.config import settings
+from app.helper.hardlink import HardLinkHelper
 from app.log import logger
 from app.modules.qbittorrent import Qbittorrent
 from app.modules.transmission import Transmission
@@ -569,18 +571,25 @@ class TorrentRemover(_PluginBase):
                             message_text = f"{message_text}\n{text_item}"
                     elif self._action == "deletefile":
                         message_text = f"{downloader.title()} 共删除{len(torrents)}个种子及文件"
+                        # 实际释放的空间，文件仍有硬链接在媒体库等位置时不会释放
+                        reclaimed = 0
                         for torrent in torrents:
                             if self._event.is_set():
                                 logger.info(f"自动删种服务停止")
                                 return
+                            reclaimable = self.__get_reclaimable_size(downlader_obj, torrent)
+                            reclaimed += reclaimable
                             text_item = f"{torrent.get('name')} " \
                                         f"来自站点：{torrent.get('site')} " \
-                                        f"大小：{StringUtils.str_filesize(torrent.get('size'))} GB"
+                                        f"大小：{StringUtils.str_filesize(torrent.get('size'))} GB " \
+                                        f"可释放：{StringUtils.str_filesize(reclaimable)}"
                             # 删除种子
                             downlader_obj.delete_torrents(delete_file=True,
                                                           ids=[torrent.get("id")])
                             logger.info(f"自动删种任务 删除种子及文件：{text_item}")
                             message_text = f"{message_text}\n{text_item}"
+                        if torrents:
+                            message_text = f"{message_text}\n共释放空间：{StringUtils.str_filesize(reclaimed)}"
                     else:
                         continue
                     if torrents and message_text and self._notify:
@@ -592,6 +601,18 @@ class TorrentRemover(_PluginBase):
             except Exception as e:
                 logger.error(f"自动删种任务异常：{str(e)}")
 
+    @staticmethod
+    def __get_reclaimable_size(downloader_obj: Any, torrent: dict) -> int:
+        """
+        计算删除种子文件后可以释放的空间，按硬链接索引排除仍链接在其它位置的文件
+        """
+        if not torrent.get("path"):
+            return 0
+        files = downloader_obj.get_files(torrent.get("id"))
+        if not files:
+            return 0
+        return HardLinkHelper().reclaimable_size([Path(torrent.get("path")) / file.name for file in files])
+
     def __get_qb_torrent(self, torrent: Any) -> Optional[dict]:
         """
         检查QB下载任务是否符合条件
@@ -631,7 +652,8 @@ class TorrentRemover(_PluginBase):
             "id": torrent.hash,
             "name": torrent.name,
             "site": StringUtils.get_url_sld(torrent.tracker),
-            "size": torrent.size
+            "size": torrent.size,
+            "path": torrent.save_path
         }
 
     def __get_tr_torrent(self, torrent: Any) -> Optional[dict]:
@@ -680,7 +702,8 @@ class TorrentRemover(_PluginBase):
             "id": torrent.hashString,
             "name": torrent.name,
             "site": torrent.trackers[0].get("sitename") if torrent.trackers else "",
-            "size": torrent.total_size
+            "size": torrent.total_size,
+            "path": torrent.download_dir
         }
 
     def get_remove_torrents(self, downloader: str):
@@ -724,7 +747,8 @@ class TorrentRemover(_PluginBase):
                             "id": torrent.hash,
                             "name": torrent.name,
                             "site": StringUtils.get_url_sld(torrent.tracker),
-                            "size": torrent.size
+                            "size": torrent.size,
+                            "path": torrent.save_path
                         })
             remove_torrents.extend(remove_torrents_plus)
         return remove_torrents
@@ -13,6 +13,8 @@ from app.chain.subscribe import SubscribeChain
 from app.chain.transfer import TransferChain
 from app.core.config import settings
 from app.db import SessionLocal
+from app.db.init import optimize_db
+from app.helper.hardlink import HardLinkHelper
 from app.log import logger
 from app.utils.singleton import Singleton
 from app.utils.timer import TimerUtils
@@ -78,9 +80,29 @@ class Scheduler(metaclass=Singleton):
         self._scheduler.add_job(RssChain(self._db).refresh, "interval",
                                 minutes=30, name="自定义订阅刷新")
 
-        # 下载器文件转移（每5分钟）
-        if settings.DOWNLOADER_MONITOR:
-            self._scheduler.add_job(TransferChain(self._db).process, "interval", minutes=5, name="下载文件整理")
+        # 启动时恢复上次中断的转移
+        self._scheduler.add_job(TransferChain(self._db).resume, "date",
+                                run_date=datetime.now(pytz.timezone(settings.TZ)) + timedelta(seconds=10),
+                                name="恢复中断的转移")
+
+        # 下载器文件转移（默认每5分钟，兜底下载完成通知和目录监控）
+        if settings.DOWNLOADER_MONITOR and settings.DOWNLOADER_MONITOR_INTERVAL:
+            self._scheduler.add_job(TransferChain(self._db).process, "interval",
+                                    minutes=settings.DOWNLOADER_MONITOR_INTERVAL,
+                                    name="下载文件整理")
+
+        # 硬链接索引维护
+        self._scheduler.add_job(HardLinkHelper().maintain, "interval",
+                                hours=24,
+                                next_run_time=datetime.now(pytz.timezone(settings.TZ)) + timedelta(minutes=15),
+                                name="硬链接索引维护")
+
+        # 数据库优化
+        if settings.DB_OPTIMIZE_INTERVAL:
+            self._scheduler.add_job(optimize_db, "interval",
+                                    hours=settings.DB_OPTIMIZE_INTERVAL,
+                                    next_run_time=datetime.now(pytz.timezone(settings.TZ)) + timedelta(minutes=30),
+                                    name="数据库优化")
 
         # 公共定时服务
         self._scheduler.add_job(SchedulerChain(self._db).scheduler_job, "interval", minutes=10)
@@ -46,8 +46,6 @@ class EventType(Enum):
 class SystemConfigKey(Enum):
     # 用户已安装的插件
     UserInstalledPlugins = "UserInstalledPlugins"
-    # 搜索结果
-    SearchResults = "SearchResults"
     # 索引站点范围
     IndexerSites = "IndexerSites"
     # 种子优先级规则
@@ -62,6 +60,12 @@ class SystemConfigKey(Enum):
     FilterRules = "FilterRules"
     # 洗版规则
     FilterRules2 = "FilterRules2"
+    # 订阅搜索进度
+    SubscribeSearchProgress = "SubscribeSearchProgress"
+    # 媒体服务器同步时间
+    MediaServerSyncTime = "MediaServerSyncTime"
+    # 硬链接索引已从转移历史补充登记
+    HardLinkBackfill = "HardLinkBackfill"
 
 
 # 处理进度Key字典
@@ -94,7 +94,8 @@ class RequestUtils:
             return None
 
     def get_res(self, url: str, params: dict = None,
-                allow_redirects: bool = True, raise_exception: bool = False) -> Optional[Response]:
+                allow_redirects: bool = True, raise_exception: bool = False,
+                stream: bool = False) -> Optional[Response]:
         try:
             if self._session:
                 return self._session.get(url,
@@ -104,7 +105,8 @@ class RequestUtils:
                                          proxies=self._proxies,
                                          cookies=self._cookies,
                                          timeout=self._timeout,
-                                         allow_redirects=allow_redirects)
+                                         allow_redirects=allow_redirects,
+                                         stream=stream)
             else:
                 return requests.get(url,
                                     params=params,
@@ -113,7 +115,8 @@ class RequestUtils:
                                     proxies=self._proxies,
                                     cookies=self._cookies,
                                     timeout=self._timeout,
-                                    allow_redirects=allow_redirects)
+                                    allow_redirects=allow_redirects,
+                                    stream=stream)
         except requests.exceptions.RequestException:
             if raise_exception:
                 raise requests.exceptions.RequestException
@@ -1,10 +1,11 @@
 import datetime
+import errno
 import os
 import platform
 import re
 import shutil
 from pathlib import Path
-from typing import List, Union, Tuple
+from typing import List, Union, Tuple, Callable
 import psutil
 from app import schemas
 
@@ -42,30 +43,66 @@ class SystemUtils:
         return True if platform.system() == 'Darwin' else False
 
     @staticmethod
-    def copy(src: Path, dest: Path) -> Tuple[int, str]:
+    def copy(src: Path, dest: Path, verify: Callable[[Path, Path], bool] = None) -> Tuple[int, str]:
         """
-        复制
+        复制，先复制为临时文件再重命名，避免中断时残留不完整的目标文件
+        :param verify: 校验函数，参数为源文件和临时文件，校验不通过时删除临时文件，已存在的目标文件保持不变
         """
+        temp = dest.with_name(f".{dest.name}.mptmp")
         try:
-            shutil.copy2(src, dest)
+            shutil.copy2(src, temp)
+            if verify and not verify(src, temp):
+                temp.unlink()
+                return -1, f"{dest} 文件校验失败"
+            temp.replace(dest)
             return 0, ""
         except Exception as err:
             print(str(err))
+            if temp.exists():
+                temp.unlink()
             return -1, str(err)
 
     @staticmethod
-    def move(src: Path, dest: Path) -> Tuple[int, str]:
+    def move(src: Path, dest: Path, verify: Callable[[Path, Path], bool] = None) -> Tuple[int, str]:
         """
-        移动
+        移动，同设备直接重命名；跨设备先完整复制到目标位置再删除源文件，中断时源文件始终保留
+        :param verify: 跨设备复制时的校验函数，校验通过后才删除源文件
         """
         try:
-            temp = src.replace(src.parent / dest.name)
-            shutil.move(temp, dest)
+            src.replace(dest)
+            return 0, ""
+        except OSError as err:
+            if err.errno != errno.EXDEV:
+                print(str(err))
+                return -1, str(err)
+        # 跨设备
+        retcode, retmsg = SystemUtils.copy(src, dest, verify=verify)
+        if retcode != 0:
+            return retcode, retmsg
+        try:
+            src.unlink()
             return 0, ""
         except Exception as err:
             print(str(err))
             return -1, str(err)
 
+    @staticmethod
+    def clear_temp_files(directory: Path) -> List[Path]:
+        """
+        删除目录下复制中断残留的临时文件
+        :return: 删除的文件
+        """
+        if not directory.exists():
+            return []
+        files = []
+        for temp in directory.rglob(".*.mptmp"):
+            try:
+                temp.unlink()
+                files.append(temp)
+            except OSError as err:
+                print(str(err))
+        return files
+
     @staticmethod
     def link(src: Path, dest: Path) -> Tuple[int, str]:
         """
@@ -1,10 +1,26 @@
 import unittest
 
+from tests.test_checksum import ChecksumTest
+from tests.test_context import MediaInfoRegistryTest
 from tests.test_cookiecloud import CookieCloudTest
+from tests.test_dboper import DbOperTest
+from tests.test_downloadhistory import DownloadHistoryTest
 from tests.test_filter import FilterTest
+from tests.test_fts import FtsTest
+from tests.test_hardlink import HardLinkTest
+from tests.test_mediaserver import MediaServerChainTest
 from tests.test_metainfo import MetaInfoTest
+from tests.test_migration import MigrationTest
 from tests.test_recognize import RecognizeTest
+from tests.test_rss import RssTest, RssOperTest
+from tests.test_scanner import IncrementalScannerTest
+from tests.test_search import SearchChainTest
+from tests.test_searchresult import SearchResultTest
+from tests.test_sitestatistic import SiteStatisticTest
+from tests.test_subscribestate import SubscribeStateTest
+from tests.test_system import SystemUtilsTest
 from tests.test_transfer import TransferTest
+from tests.test_transferjournal import TransferJournalTest
 
 if __name__ == '__main__':
     suite = unittest.TestSuite()
@@ -19,6 +35,56 @@ if __name__ == '__main__':
     suite.addTest(CookieCloudTest('test_cookiecloud'))
     # 测试文件转移
     suite.addTest(TransferTest('test_transfer'))
+    # 测试转移中断
+    suite.addTest(SystemUtilsTest('test_copy_interrupted'))
+    suite.addTest(SystemUtilsTest('test_move_interrupted'))
+    suite.addTest(SystemUtilsTest('test_move_cross_device'))
+    suite.addTest(SystemUtilsTest('test_move_verify_failed'))
+    suite.addTest(SystemUtilsTest('test_clear_temp_files'))
+    # 测试转移日志恢复
+    suite.addTest(TransferJournalTest('test_resume'))
+    suite.addTest(TransferJournalTest('test_rollback'))
+    # 测试RSS解析
+    suite.addTest(RssTest('test_parse'))
+    suite.addTest(RssTest('test_watermark'))
+    suite.addTest(RssTest('test_partial'))
+    suite.addTest(RssTest('test_charset'))
+    suite.addTest(RssOperTest('test_processed'))
+    # 测试搜索结果保存
+    suite.addTest(SearchResultTest('test_userid'))
+    suite.addTest(SearchResultTest('test_evict'))
+    # 测试下载历史查询
+    suite.addTest(DownloadHistoryTest('test_cache_hashes'))
+    suite.addTest(DownloadHistoryTest('test_cursor'))
+    # 测试全文索引
+    suite.addTest(FtsTest('test_trigger'))
+    suite.addTest(FtsTest('test_like'))
+    # 测试共享媒体信息
+    suite.addTest(MediaInfoRegistryTest('test_share'))
+    # 测试站点数据统计
+    suite.addTest(SiteStatisticTest('test_daily'))
+    suite.addTest(SiteStatisticTest('test_weekly'))
+    # 测试批量写入
+    suite.addTest(DbOperTest('test_bulk_upsert'))
+    suite.addTest(DbOperTest('test_unit_of_work'))
+    # 测试数据库升级
+    suite.addTest(MigrationTest('test_upgrade'))
+    # 测试搜索关键词回退
+    suite.addTest(SearchChainTest('test_original_title'))
+    suite.addTest(SearchChainTest('test_prefetched_match'))
+    # 测试文件摘要保存
+    suite.addTest(ChecksumTest('test_persist'))
+    # 测试目录增量扫描重试
+    suite.addTest(IncrementalScannerTest('test_retry'))
+    # 测试媒体库同步失败
+    suite.addTest(MediaServerChainTest('test_crawl_failed'))
+    suite.addTest(MediaServerChainTest('test_crawl_complete'))
+    # 测试硬链接索引
+    suite.addTest(HardLinkTest('test_inode'))
+    suite.addTest(HardLinkTest('test_backfill'))
+    # 测试订阅状态快照
+    suite.addTest(SubscribeStateTest('test_expire'))
+    suite.addTest(SubscribeStateTest('test_delete'))
 
     # 运行测试
     runner = unittest.TextTestRunner()
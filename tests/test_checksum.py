@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+
+import shutil
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+from unittest.mock import patch
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db.filestate_oper import FileStateOper
+from app.db.models import Base
+from app.db.models.filestate import FileState
+from app.helper.checksum import ChecksumHelper
+
+
+class ChecksumTest(TestCase):
+    def setUp(self) -> None:
+        self.tmpdir = Path(tempfile.mkdtemp())
+        self.file = self.tmpdir / "movie.mkv"
+        self.file.write_bytes(b"0123456789" * 1024)
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine, tables=[FileState.__table__])
+        self.session = sessionmaker(bind=engine)
+        self.checksum = ChecksumHelper()
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def __oper(self):
+        return FileStateOper(self.session())
+
+    def test_persist(self):
+        with patch("app.helper.checksum.FileStateOper", side_effect=self.__oper):
+            digest = self.checksum.digest(self.file)
+            self.assertTrue(digest)
+            # 重启后内存缓存为空，从数据库读取已保存的摘要，不重新计算
+            self.checksum._cache.clear()
+            with patch.object(ChecksumHelper, "_ChecksumHelper__hash_file") as hash_file:
+                self.assertEqual(self.checksum.digest(self.file), digest)
+                hash_file.assert_not_called()
+            # 文件变化后重新计算
+            self.checksum._cache.clear()
+            self.file.write_bytes(b"changed")
+            self.assertNotEqual(self.checksum.digest(self.file), digest)
+        # 摘要记录不参与硬链接索引
+        self.assertEqual(self.__oper().load_files(), {})
@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+
+from unittest import TestCase
+
+from app.core.context import MediaInfo, MediaInfoRegistry
+from app.schemas.types import MediaType
+
+
+class MediaInfoRegistryTest(TestCase):
+    def setUp(self) -> None:
+        self.registry = MediaInfoRegistry()
+
+    def tearDown(self) -> None:
+        pass
+
+    def test_share(self):
+        mediainfo = MediaInfo(tmdb_id=1, type=MediaType.MOVIE, title="流浪地球", names=["The Wandering Earth"])
+        # 登记前可以清理
+        mediainfo.clear()
+        self.assertEqual(mediainfo.names, [])
+        shared = self.registry.share(mediainfo)
+        self.assertIs(shared, mediainfo)
+        self.assertIs(self.registry.share(MediaInfo(tmdb_id=1, type=MediaType.MOVIE)), shared)
+        # 共享的实例只读
+        with self.assertRaises(RuntimeError):
+            shared.clear()
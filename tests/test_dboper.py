@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+
+from unittest import TestCase
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db import DbOper
+from app.db.models import Base
+from app.db.models.mediaserver import MediaServerItem
+
+
+class DbOperTest(TestCase):
+    def setUp(self) -> None:
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine, tables=[MediaServerItem.__table__])
+        self.db = sessionmaker(bind=engine)()
+        self.oper = DbOper(self.db)
+
+    def tearDown(self) -> None:
+        self.db.close()
+
+    def __items(self) -> dict:
+        # 批量写入不经过会话，查询前使已加载的对象过期
+        self.db.expire_all()
+        return {item.item_id: item for item in self.db.query(MediaServerItem).all()}
+
+    @staticmethod
+    def __rows(start: int, end: int, title: str) -> list:
+        return [{"id": 0, "server": "emby", "item_id": str(i), "title": f"{title} {i}",
+                 "year": "2023", "unknown": "ignored"} for i in range(start, end)]
+
+    def test_bulk_upsert(self):
+        # 超过一批的数量分批写入，忽略主键和表中不存在的字段
+        self.assertEqual(self.oper.bulk_upsert(MediaServerItem, self.__rows(0, 1200, "Old"),
+                                               index_elements=["server", "item_id"]), 1200)
+        self.assertEqual(len(self.__items()), 1200)
+        # 已存在的更新，不存在的新增
+        self.oper.bulk_upsert(MediaServerItem, self.__rows(1000, 1300, "New"),
+                              index_elements=["server", "item_id"])
+        items = self.__items()
+        self.assertEqual(len(items), 1300)
+        self.assertEqual(items["999"].title, "Old 999")
+        self.assertEqual(items["1000"].title, "New 1000")
+        # 只更新指定字段
+        rows = [{**row, "year": "2024"} for row in self.__rows(0, 10, "Other")]
+        self.oper.bulk_upsert(MediaServerItem, rows, index_elements=["server", "item_id"], update_fields=["year"])
+        items = self.__items()
+        self.assertEqual((items["0"].title, items["0"].year), ("Old 0", "2024"))
+
+    def test_unit_of_work(self):
+        # 工作单元中出错时，未提交的批量写入全部回滚
+        with self.assertRaises(ValueError):
+            with self.oper.unit_of_work():
+                self.oper.bulk_insert(MediaServerItem, self.__rows(0, 10, "Item"), commit=False)
+                raise ValueError("interrupted")
+        self.assertEqual(self.__items(), {})
+        with self.oper.unit_of_work():
+            self.oper.bulk_insert(MediaServerItem, self.__rows(0, 10, "Item"), commit=False)
+        self.assertEqual(len(self.__items()), 10)
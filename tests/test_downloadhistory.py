@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+
+from unittest import TestCase
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db.downloadhistory_oper import DownloadHistoryOper
+from app.db.models import Base
+from app.db.models.downloadhistory import DownloadHistory
+
+
+class DownloadHistoryTest(TestCase):
+    def setUp(self) -> None:
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine, tables=[DownloadHistory.__table__])
+        self.db = sessionmaker(bind=engine)()
+        self.downloadhis = DownloadHistoryOper(self.db)
+        self.downloadhis.add_batch([{
+            "path": f"/downloads/Movie {i}",
+            "type": "电影",
+            "title": f"Movie {i}",
+            "download_hash": f"hash{i % 5}"
+        } for i in range(10)])
+
+    def tearDown(self) -> None:
+        self.db.close()
+
+    def test_cache_hashes(self):
+        self.downloadhis.cache_hashes(["hash1", "hash9"])
+        # 同一Hash取最早的记录
+        self.assertEqual(self.downloadhis.get_by_hash("hash1").title, "Movie 1")
+        # 没有记录的Hash不缓存，之后新增的记录可以查到
+        self.downloadhis.add(path="/downloads/New", type="电影", title="New", download_hash="hash9")
+        self.assertEqual(self.downloadhis.get_by_hash("hash9").title, "New")
+        self.downloadhis.clear_cache()
+        self.assertEqual(self.downloadhis.get_by_hash("hash2").title, "Movie 2")
+
+    def test_cursor(self):
+        # 按ID倒序逐页查询，不重复不遗漏
+        titles, last_id = [], None
+        while True:
+            page = self.downloadhis.list_by_cursor(last_id=last_id, count=3)
+            if not page:
+                break
+            titles.extend(history.title for history in page)
+            last_id = page[-1].id
+        self.assertEqual(titles, [f"Movie {i}" for i in range(9, -1, -1)])
+        page = self.downloadhis.list_by_cursor(title="Movie 1", count=3)
+        self.assertEqual([history.title for history in page], ["Movie 1"])
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+
+import importlib.util
+from pathlib import Path
+from unittest import TestCase
+
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db.models import Base, _fts_tables
+from app.db.models.transferhistory import TransferHistory
+
+
+def _load_migration(name: str):
+    """
+    加载迁移脚本模块
+    """
+    path = Path(__file__).parents[1] / "alembic" / "versions" / name
+    spec = importlib.util.spec_from_file_location(path.stem, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class FtsTest(TestCase):
+    def setUp(self) -> None:
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine, tables=[TransferHistory.__table__])
+        self.db = sessionmaker(bind=engine)()
+        _fts_tables.clear()
+        # 按1.0.4迁移脚本建立全文索引及触发器
+        migration = _load_migration("172f43e888a2_1_0_4.py")
+        try:
+            with Operations.context(MigrationContext.configure(self.db.connection())):
+                migration.create_fts("transferhistory", migration.FTS_TABLES["transferhistory"])
+            self.db.commit()
+        except Exception as err:
+            self.skipTest(f"SQLite不支持三元组分词：{err}")
+        self.history = TransferHistory(title="流浪地球", src="/downloads/The.Wandering.Earth.2019/a.mkv",
+                                       dest="/library/流浪地球 (2019)/流浪地球 (2019).mkv",
+                                       date="2023-10-01 10:00:00").create(self.db)
+        TransferHistory(title="三体", src="/downloads/Three-Body.S01E05/b.mkv",
+                        dest="/library/三体 (2023)/Season 1/三体 - S01E05.mkv",
+                        seasons="S01", episodes="E05", date="2023-10-02 10:00:00").create(self.db)
+
+    def tearDown(self) -> None:
+        _fts_tables.clear()
+        self.db.close()
+
+    def __titles(self, keyword: str, fts: bool = True) -> list:
+        _fts_tables["transferhistory"] = fts
+        return [history.title for history in TransferHistory.list_by_title(self.db, keyword)]
+
+    def test_trigger(self):
+        # 新增记录由触发器写入全文索引
+        self.assertIsNotNone(TransferHistory.fts_filter(self.db, "Wandering"))
+        self.assertEqual(self.__titles("Wandering"), ["流浪地球"])
+        # 更新后旧内容不再命中
+        self.history.update(self.db, {"title": "流浪地球2", "src": "/downloads/Earth.2023/a.mkv"})
+        self.assertEqual(self.__titles("Wandering"), [])
+        self.assertEqual(self.__titles("流浪地球2"), ["流浪地球2"])
+        # 删除后不再命中
+        TransferHistory.delete(self.db, self.history.id)
+        self.assertEqual(self.__titles("流浪地球"), [])
+        self.assertEqual(TransferHistory.count_by_title(self.db, "Three-Body"), 1)
+
+    def test_like(self):
+        # 全文索引与模糊查询匹配相同的字段
+        for keyword in ["Wandering", "Season 1", "S01E05", "流浪地球", "mkv"]:
+            self.assertEqual(self.__titles(keyword), self.__titles(keyword, fts=False), keyword)
+        # 少于3个字符时使用模糊查询
+        self.assertIsNone(TransferHistory.fts_filter(self.db, "三体"))
+        self.assertEqual(self.__titles("E05"), ["三体"])
+        self.assertEqual(self.__titles("三体"), ["三体"])
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+from unittest.mock import patch
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db.filestate_oper import FileStateOper
+from app.db.models import Base
+from app.db.models.filestate import FileState
+from app.helper.hardlink import HardLinkHelper
+
+
+class HardLinkTest(TestCase):
+    def setUp(self) -> None:
+        self.tmpdir = Path(tempfile.mkdtemp())
+        self.download = self.tmpdir / "downloads"
+        self.library = self.tmpdir / "library"
+        self.download.mkdir()
+        self.library.mkdir()
+        self.src = self.download / "movie.mkv"
+        self.src.write_bytes(b"0123456789")
+        self.dest = self.library / "movie.mkv"
+        os.link(self.src, self.dest)
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine, tables=[FileState.__table__])
+        self.session = sessionmaker(bind=engine)
+        # 不使用单例，每个测试独立的索引
+        self.helper = HardLinkHelper.__new__(HardLinkHelper)
+        self.helper.__init__()
+        self.patches = [
+            patch("app.helper.hardlink.FileStateOper", side_effect=self.__oper),
+            patch("app.helper.hardlink.settings", DOWNLOAD_PATH=str(self.download), DOWNLOAD_MOVIE_PATH=None,
+                  DOWNLOAD_TV_PATH=None, DOWNLOAD_ANIME_PATH=None, LIBRARY_PATH=str(self.library),
+                  RMT_MEDIAEXT=[".mkv"])
+        ]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self) -> None:
+        for p in self.patches:
+            p.stop()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def __oper(self):
+        return FileStateOper(self.session())
+
+    def test_inode(self):
+        self.helper.add_paths([self.src, self.dest])
+        self.assertTrue(self.helper.is_linked_to_library(self.src))
+        self.assertFalse(self.helper.is_linked_to_library(self.src, exclude=[self.dest]))
+        # 媒体库文件被替换为另一个文件，路径存在但已不是同一inode
+        self.dest.unlink()
+        self.dest.write_bytes(b"replaced")
+        self.assertFalse(self.helper.is_linked_to_library(self.src))
+        self.assertEqual(self.helper.get_links(self.src), {str(self.src)})
+        # 已删除的文件从索引中清除
+        self.dest.unlink()
+        self.helper.prune()
+        self.assertNotIn(str(self.dest), self.__oper().load_files())
+
+    def test_backfill(self):
+        with patch("app.helper.hardlink.TransferHistoryOper") as transferhis, \
+                patch("app.helper.hardlink.SystemConfigOper") as systemconfig:
+            transferhis.return_value.list_paths_by_mode.return_value = [(str(self.download), str(self.dest))]
+            systemconfig.return_value.get.return_value = None
+            self.helper.backfill()
+            systemconfig.return_value.set.assert_called_once()
+            self.assertTrue(self.helper.is_linked_to_library(self.src))
+            # 已补充登记过的不再执行
+            systemconfig.return_value.get.return_value = 1
+            transferhis.reset_mock()
+            self.helper.backfill()
+            transferhis.return_value.list_paths_by_mode.assert_not_called()
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from app import schemas
+from app.chain.mediaserver import MediaServerChain
+
+
+class MediaServerChainTest(TestCase):
+    def setUp(self) -> None:
+        # 不连接媒体服务器和数据库，只测试同步结果的处理
+        self.chain = MediaServerChain.__new__(MediaServerChain)
+        self.chain.mediaserverdb = MagicMock()
+        self.chain.systemconfig = MagicMock()
+        self.chain.systemconfig.get.return_value = {}
+        self.chain.librarys = MagicMock(return_value=[
+            schemas.MediaServerLibrary(server="emby", id="1", name="电影"),
+            schemas.MediaServerLibrary(server="emby", id="2", name="电视剧")
+        ])
+        self.chain.item_ids = MagicMock(return_value=[])
+
+    def tearDown(self) -> None:
+        pass
+
+    @staticmethod
+    def __items(library_id, since=None):
+        yield schemas.MediaServerItem(server="emby", library=library_id, item_id="10", item_type="Movie")
+        if library_id == "2":
+            raise IOError("Users/Items 获取第 500 条起的数据失败")
+
+    def test_crawl_failed(self):
+        # 有媒体库项目获取失败时其它媒体库照常同步，但不更新同步时间
+        self.chain.items = MagicMock(side_effect=self.__items)
+        with patch("app.chain.mediaserver.settings") as settings, \
+                patch("app.chain.mediaserver.LibraryHelper") as library_helper:
+            settings.MEDIASERVER = "emby"
+            self.chain.sync(full=True)
+        self.assertEqual(self.chain.mediaserverdb.upsert.call_count, 1)
+        self.chain.systemconfig.set.assert_not_called()
+        library_helper.return_value.reset_transferred.assert_not_called()
+
+    def test_crawl_complete(self):
+        self.chain.items = MagicMock(side_effect=lambda library_id, since=None: iter([]))
+        with patch("app.chain.mediaserver.settings") as settings, \
+                patch("app.chain.mediaserver.LibraryHelper"):
+            settings.MEDIASERVER = "emby"
+            self.chain.sync(full=True)
+        self.chain.systemconfig.set.assert_called_once()
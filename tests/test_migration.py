@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+
+import importlib
+import shutil
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+
+from alembic.command import upgrade
+from alembic.config import Config
+from alembic.script import ScriptDirectory
+from sqlalchemy import create_engine, inspect, text
+
+from app.db.models import Base
+
+
+class MigrationTest(TestCase):
+    def setUp(self) -> None:
+        self.tmpdir = Path(tempfile.mkdtemp())
+        db_location = self.tmpdir / "user.db"
+        self.engine = create_engine(f"sqlite:///{db_location}")
+        # 与init_db一致，导入所有模型后全量建表
+        for module in (Path(__file__).parents[1] / "app" / "db" / "models").glob("*.py"):
+            importlib.import_module(f"app.db.models.{module.stem}")
+        Base.metadata.create_all(bind=self.engine)
+        self.alembic_cfg = Config()
+        self.alembic_cfg.set_main_option("script_location", str(Path(__file__).parents[1] / "alembic"))
+        self.alembic_cfg.set_main_option("sqlalchemy.url", f"sqlite:///{db_location}")
+
+    def tearDown(self) -> None:
+        self.engine.dispose()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def __execute(self, sql: str) -> list:
+        with self.engine.begin() as conn:
+            result = conn.execute(text(sql))
+            return result.fetchall() if result.returns_rows else []
+
+    def __indexes(self, table: str) -> set:
+        return {index["name"] for index in inspect(self.engine).get_indexes(table)}
+
+    def test_upgrade(self):
+        # 模拟旧版本数据库：没有后续版本建立的索引，存在需要清理的数据
+        self.__execute("DROP INDEX ix_mediaserveritem_server_itemid")
+        self.__execute("DROP INDEX ix_transferhistory_tmdbid_seasons_episodes")
+        self.__execute("INSERT INTO mediaserveritem (server, item_id, title) VALUES "
+                       "('emby', '1', 'Old'), ('emby', '1', 'New'), ('emby', '2', 'Other')")
+        self.__execute("INSERT INTO subscribe (id, name, state) VALUES (1, 'Movie', 'R')")
+        self.__execute("INSERT INTO subscribestate (subscribe_id) VALUES (1), (2)")
+        self.__execute("INSERT INTO systemconfig (key, value) VALUES ('SearchResults', '[]')")
+        upgrade(self.alembic_cfg, "head")
+        # 重复的媒体服务器数据只保留最新一条，并建立唯一索引
+        self.assertEqual(self.__execute("SELECT item_id, title FROM mediaserveritem ORDER BY item_id"),
+                         [("1", "New"), ("2", "Other")])
+        self.assertIn("ix_mediaserveritem_server_itemid", self.__indexes("mediaserveritem"))
+        self.assertIn("ix_transferhistory_tmdbid_seasons_episodes", self.__indexes("transferhistory"))
+        # 已删除订阅的状态快照和旧的搜索结果被清理
+        self.assertEqual(self.__execute("SELECT subscribe_id FROM subscribestate"), [(1,)])
+        self.assertEqual(self.__execute("SELECT value FROM systemconfig WHERE key = 'SearchResults'"), [])
+        # 升级到最新版本，再次升级不做任何操作
+        head = ScriptDirectory.from_config(self.alembic_cfg).get_current_head()
+        self.assertEqual(self.__execute("SELECT version_num FROM alembic_version"), [(head,)])
+        upgrade(self.alembic_cfg, "head")
+        self.assertEqual(self.__execute("SELECT version_num FROM alembic_version"), [(head,)])
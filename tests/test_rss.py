@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+
+from unittest import TestCase
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db.models import Base
+from app.db.models.rss import Rss, RssItem
+from app.db.rss_oper import RssOper
+from app.helper.rss import RssHelper
+
+
+def _feed(titles: list, encoding: str = "utf-8", declaration: bool = True) -> bytes:
+    """
+    生成RSS报文，条目按发布时间倒序
+    """
+    items = "".join(f"<item><title>{title}</title><guid>guid-{i}</guid>"
+                    f"<enclosure url=\"https://example.com/{i}.torrent\" length=\"{i}\"/>"
+                    f"<pubDate>Mon, 0{9 - i} Oct 2023 10:00:00 +0800</pubDate></item>"
+                    for i, title in enumerate(titles))
+    head = f"<?xml version=\"1.0\" encoding=\"{encoding}\"?>" if declaration else ""
+    return f"{head}<rss><channel><title>feed</title>{items}</channel></rss>".encode(encoding)
+
+
+def _chunks(content: bytes, size: int = 64):
+    return [content[i:i + size] for i in range(0, len(content), size)]
+
+
+class RssTest(TestCase):
+    def setUp(self) -> None:
+        self.parse = RssHelper._RssHelper__iter_parse
+
+    def tearDown(self) -> None:
+        pass
+
+    def test_parse(self):
+        items, success = self.parse(_chunks(_feed(["A", "B", "C"])))
+        self.assertTrue(success)
+        self.assertEqual([item.get("title") for item in items], ["A", "B", "C"])
+        self.assertEqual(items[1].get("guid"), "guid-1")
+        self.assertEqual(items[2].get("size"), 2)
+
+    def test_watermark(self):
+        # 解析到上次处理的位置即停止
+        items, success = self.parse(_chunks(_feed(["A", "B", "C"])), last_guid="guid-1")
+        self.assertTrue(success)
+        self.assertEqual([item.get("title") for item in items], ["A"])
+        last_pubdate = int(items[0]["pubdate"].timestamp())
+        items, success = self.parse(_chunks(_feed(["A", "B", "C"])), last_pubdate=last_pubdate)
+        self.assertTrue(success)
+        self.assertEqual([item.get("title") for item in items], ["A"])
+
+    def test_partial(self):
+        # 内容不完整时返回失败，调用方不能据此更新已处理位置
+        content = _feed(["A", "B", "C"])
+        items, success = self.parse(_chunks(content[:len(content) // 2]))
+        self.assertFalse(success)
+
+        def broken():
+            yield content[:100]
+            raise IOError("connection reset")
+
+        _, success = self.parse(broken())
+        self.assertFalse(success)
+
+    def test_charset(self):
+        # 只在响应头中声明GBK编码
+        items, success = self.parse(_chunks(_feed(["中文标题"], encoding="gbk", declaration=False)),
+                                    charset="gbk")
+        self.assertTrue(success)
+        self.assertEqual(items[0].get("title"), "中文标题")
+        # XML声明优先
+        items, _ = self.parse(_chunks(_feed(["中文标题"])), charset="gbk")
+        self.assertEqual(items[0].get("title"), "中文标题")
+
+
+class RssOperTest(TestCase):
+    def setUp(self) -> None:
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine, tables=[Rss.__table__, RssItem.__table__])
+        self.db = sessionmaker(bind=engine)()
+        self.rssoper = RssOper(self.db)
+        self.rss = Rss(name="test", url="https://example.com/rss",
+                       note='{"titles": ["Old"], "season_episodes": ["S01 E01"]}').create(self.db)
+
+    def tearDown(self) -> None:
+        self.db.close()
+
+    def test_processed(self):
+        # 旧版本附加信息中的数据
+        self.assertEqual(self.rssoper.import_note(self.rss), 1)
+        self.assertFalse(self.rss.note)
+        self.rssoper.add_processed(self.rss.id, [{"guid": "guid-1", "title": "New", "season_episode": "S01 E02"}])
+        # 重复登记不会新增
+        self.rssoper.add_processed(self.rss.id, [{"guid": "guid-1", "title": "New", "season_episode": "S01 E02"}])
+        items = [{"guid": "guid-0", "title": "Old"}, {"guid": "guid-1", "title": "New"},
+                 {"guid": "guid-2", "title": "Other"}]
+        self.assertEqual(self.rssoper.processed(self.rss.id, items), {"Old", "guid-1", "New"})
+        self.assertEqual(self.rssoper.season_episodes(self.rss.id), {"S01 E01", "S01 E02"})
+        self.assertTrue(self.rssoper.delete(self.rss.id))
+        self.assertEqual(self.rssoper.processed(self.rss.id, items), set())
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+
+import shutil
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+from unittest.mock import patch
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db.filestate_oper import FileStateOper
+from app.db.models import Base
+from app.db.models.filestate import FileState
+from app.plugins.dirmonitor.scanner import IncrementalScanner
+
+
+class IncrementalScannerTest(TestCase):
+    def setUp(self) -> None:
+        self.tmpdir = Path(tempfile.mkdtemp())
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine, tables=[FileState.__table__])
+        self.session = sessionmaker(bind=engine)
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def __oper(self):
+        return FileStateOper(self.session())
+
+    def test_retry(self):
+        root = str(self.tmpdir)
+        with patch("app.plugins.dirmonitor.scanner.FileStateOper", side_effect=self.__oper), \
+                patch("app.plugins.dirmonitor.scanner.HardLinkHelper"):
+            scanner = IncrementalScanner(root)
+            scanner.scan()
+            file = self.tmpdir / "movie.mkv"
+            file.write_bytes(b"0123456789")
+            path = str(file)
+            self.assertEqual(scanner.scan(wait_stable=False), [path])
+            # 处理失败后等待重试间隔
+            scanner.retry([path])
+            self.assertEqual(scanner.scan(wait_stable=False), [])
+            # 重启后重新返回，已失败的次数保留
+            scanner = IncrementalScanner(root)
+            self.assertEqual(scanner.scan(wait_stable=False), [path])
+            scanner._retry_interval = 0
+            for _ in range(IncrementalScanner._max_retries - 1):
+                scanner.retry([path])
+                self.assertEqual(scanner.scan(wait_stable=False), [path])
+            # 超过最大重试次数后登记到索引，不再返回
+            scanner.retry([path])
+            self.assertEqual(scanner.scan(wait_stable=False), [])
+        self.assertIn(path, self.__oper().load(root))
+        self.assertEqual(self.__oper().load_retries(root), {})
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from app.chain.search import SearchChain
+from app.core.context import MediaInfo, TorrentInfo
+from app.schemas.types import MediaType
+
+
+class SearchChainTest(TestCase):
+    def setUp(self) -> None:
+        # 不连接站点和数据库，只测试关键词回退和匹配
+        self.chain = SearchChain.__new__(SearchChain)
+        self.chain.torrenthelper = MagicMock()
+        self.chain.torrenthelper.sort_torrents.side_effect = lambda contexts: contexts
+        self.mediainfo = MediaInfo(type=MediaType.MOVIE, tmdb_id=535167, title="流浪地球",
+                                   original_title="The Wandering Earth", year="2019", names=["流浪地球"])
+
+    def tearDown(self) -> None:
+        pass
+
+    @staticmethod
+    def __search(results: dict):
+        def _search(mediainfo=None, keyword=None, **kwargs):
+            return [TorrentInfo(site=1, site_name="site", title=title) for title in results.get(keyword, [])]
+
+        return _search
+
+    def test_original_title(self):
+        # 主标题没有结果，批量查询只有同组其它订阅的资源，回退到原始标题搜索
+        search = self.__search({"The Wandering Earth": ["The.Wandering.Earth.2019.1080p.BluRay.x264"]})
+        prefetched = {2: [TorrentInfo(site=2, site_name="batch", title="Oppenheimer.2023.1080p.BluRay.x264")]}
+        with patch.object(SearchChain, "_SearchChain__search_all_sites", side_effect=search) as mock:
+            contexts = self.chain.process(mediainfo=self.mediainfo, filter_rule="",
+                                          prefetched=prefetched, progress=False)
+        self.assertEqual([call.kwargs["keyword"] for call in mock.call_args_list],
+                         ["流浪地球", "The Wandering Earth"])
+        self.assertEqual([context.torrent_info.title for context in contexts],
+                         ["The.Wandering.Earth.2019.1080p.BluRay.x264"])
+
+    def test_prefetched_match(self):
+        # 批量查询中有本媒体的资源时不再回退
+        prefetched = {2: [TorrentInfo(site=2, site_name="batch", title="The.Wandering.Earth.2019.2160p.WEB-DL")]}
+        with patch.object(SearchChain, "_SearchChain__search_all_sites", side_effect=self.__search({})) as mock:
+            contexts = self.chain.process(mediainfo=self.mediainfo, filter_rule="",
+                                          prefetched=prefetched, progress=False)
+        self.assertEqual(mock.call_count, 1)
+        self.assertEqual(len(contexts), 1)
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+
+from unittest import TestCase
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.context import Context, TorrentInfo
+from app.db.models import Base
+from app.db.models.searchresult import SearchResult, SearchResultItem
+from app.db.searchresult_oper import SearchResultOper
+
+
+class SearchResultTest(TestCase):
+    def setUp(self) -> None:
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine, tables=[SearchResult.__table__, SearchResultItem.__table__])
+        self.db = sessionmaker(bind=engine)()
+        self.searchresult = SearchResultOper(self.db)
+
+    def tearDown(self) -> None:
+        self.db.close()
+
+    @staticmethod
+    def __contexts(count: int):
+        return [Context(torrent_info=TorrentInfo(title=f"Movie.2023.{i}")) for i in range(count)]
+
+    def test_userid(self):
+        search_id = self.searchresult.save(self.__contexts(3), userid="1")
+        # 不能查询其他用户的搜索
+        self.assertIsNone(self.searchresult.get(search_id, userid="2"))
+        self.assertIsNone(self.searchresult.get(search_id))
+        search = self.searchresult.get(search_id, userid=1)
+        self.assertEqual(search.count, 3)
+        items = self.searchresult.list_items(search, page=2, count=2)
+        self.assertEqual([item["torrent_info"]["title"] for item in items], ["Movie.2023.2"])
+
+    def test_evict(self):
+        search_ids = [self.searchresult.save(self.__contexts(2), userid="1") for _ in range(7)]
+        other = self.searchresult.save(self.__contexts(2), userid="2")
+        # 每个用户只保留最近的搜索，不影响其他用户
+        kept = [search_id for search_id in search_ids if self.searchresult.get(search_id, userid="1")]
+        self.assertEqual(kept, search_ids[-5:])
+        self.assertIsNotNone(self.searchresult.get(other, userid="2"))
+        self.assertEqual(self.db.query(SearchResultItem).count(), 12)
+        self.assertEqual(self.searchresult.get_last("1").search_id, search_ids[-1])
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+
+from datetime import datetime
+from unittest import TestCase
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db.models import Base
+from app.db.models.sitestatistic import SiteStatisticPoint, SiteStatisticDaily
+from app.db.sitestatistic_oper import SiteStatisticOper
+
+
+def _ts(day: str, hour: int = 12) -> int:
+    return int(datetime.strptime(day, "%Y-%m-%d").replace(hour=hour).timestamp())
+
+
+class SiteStatisticTest(TestCase):
+    def setUp(self) -> None:
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine, tables=[SiteStatisticPoint.__table__, SiteStatisticDaily.__table__])
+        self.db = sessionmaker(bind=engine)()
+        self.statisticoper = SiteStatisticOper(self.db)
+
+    def tearDown(self) -> None:
+        self.db.close()
+
+    def test_daily(self):
+        # 同一天多次刷新，按天汇总只保留最后一次的数据
+        self.statisticoper.add_points({"site": {"upload": 100, "download": 10}}, ts=_ts("2024-12-31", 8))
+        self.statisticoper.add_points({"site": {"upload": 300, "download": 30}}, ts=_ts("2024-12-31", 20))
+        self.statisticoper.add_points({"site": {"err_msg": "timeout"}}, ts=_ts("2024-12-31", 22))
+        rows = self.statisticoper.range(period="day")
+        self.assertEqual([(row["day"], row["upload"]) for row in rows], [("2024-12-31", 300)])
+        self.assertEqual(len(self.statisticoper.range(period="raw")), 2)
+        # 与前一天最后一次记录比较
+        self.statisticoper.add_points({"site": {"upload": 500, "download": 35}}, ts=_ts("2025-01-01"))
+        deltas = self.statisticoper.deltas(start=self.statisticoper.last_ts(before=_ts("2025-01-01", 0)))
+        self.assertEqual((deltas["site"]["upload"], deltas["site"]["download"]), (200, 5))
+
+    def test_weekly(self):
+        # 2024-12-30（周一）至2025-01-05（周日）为同一周
+        for i, day in enumerate(["2024-12-29", "2024-12-30", "2024-12-31", "2025-01-01", "2025-01-05", "2025-01-06"]):
+            self.statisticoper.add_points({"site": {"upload": i}}, ts=_ts(day))
+        rows = self.statisticoper.range(period="week")
+        self.assertEqual([row["day"] for row in rows], ["2024-12-29", "2025-01-05", "2025-01-06"])
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+
+from unittest import TestCase
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db.models import Base
+from app.db.models.subscribe import Subscribe
+from app.db.models.subscribestate import SubscribeState
+from app.db.subscribe_oper import SubscribeOper
+from app.db.subscribestate_oper import SubscribeStateOper
+from app.schemas import NotExistMediaInfo
+
+
+class SubscribeStateTest(TestCase):
+    def setUp(self) -> None:
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine, tables=[Subscribe.__table__, SubscribeState.__table__])
+        self.db = sessionmaker(bind=engine)()
+        self.subscribeoper = SubscribeOper(self.db)
+        self.stateoper = SubscribeStateOper(self.db)
+        self.first = Subscribe(name="Series", type="电视剧", tmdbid=1, season=1).create(self.db)
+        self.second = Subscribe(name="Other", type="电视剧", tmdbid=2, season=1,
+                                doubanid="100").create(self.db)
+        for subscribe in [self.first, self.second]:
+            self.stateoper.save_no_exists(subscribe, False, {
+                subscribe.tmdbid: {1: NotExistMediaInfo(season=1, episodes=[2, 3], total_episode=3)}
+            })
+
+    def tearDown(self) -> None:
+        self.db.close()
+
+    def test_expire(self):
+        exist_flag, no_exists = self.stateoper.get_no_exists(self.first)
+        self.assertFalse(exist_flag)
+        self.assertEqual(no_exists[1][1].episodes, [2, 3])
+        # 只有对应TMDBID的缺失情况失效
+        self.stateoper.expire_exists(tmdbid=1)
+        self.assertIsNone(self.stateoper.get_no_exists(self.first))
+        self.assertIsNotNone(self.stateoper.get_no_exists(self.second))
+        # 订阅的季变化后快照无效
+        self.stateoper.save_no_exists(self.first, True, {})
+        self.first.update(self.db, {"season": 2})
+        self.assertIsNone(self.stateoper.get_no_exists(self.first))
+
+    def test_delete(self):
+        # 各删除入口都同时删除快照
+        self.subscribeoper.delete_by_tmdbid(1, season=1)
+        self.subscribeoper.delete_by_doubanid("100")
+        self.assertEqual(Subscribe.list(self.db), [])
+        self.assertEqual(self.db.query(SubscribeState).count(), 0)
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+
+import errno
+import shutil
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+from unittest.mock import patch
+
+from app.utils.system import SystemUtils
+
+
+class SystemUtilsTest(TestCase):
+    def setUp(self) -> None:
+        self.tmpdir = Path(tempfile.mkdtemp())
+        self.src = self.tmpdir / "src" / "movie.mkv"
+        self.src.parent.mkdir()
+        self.src.write_bytes(b"0123456789" * 1024)
+        self.dest = self.tmpdir / "dest" / "Movie (2023).mkv"
+        self.dest.parent.mkdir()
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    @staticmethod
+    def __interrupted_copy(src, dst, *args, **kwargs):
+        """
+        模拟复制到一半时中断
+        """
+        Path(dst).write_bytes(Path(src).read_bytes()[:100])
+        raise OSError(errno.EIO, "interrupted")
+
+    def __cross_device_replace(self):
+        """
+        模拟源文件与目标跨设备，只有源文件重命名时失败
+        """
+        replace = Path.replace
+        src = self.src
+
+        def _replace(path, target):
+            if path == src:
+                raise OSError(errno.EXDEV, "Invalid cross-device link")
+            return replace(path, target)
+
+        return _replace
+
+    def test_copy_interrupted(self):
+        with patch("shutil.copy2", side_effect=self.__interrupted_copy):
+            retcode, _ = SystemUtils.copy(self.src, self.dest)
+        self.assertNotEqual(retcode, 0)
+        # 不残留目标文件和临时文件
+        self.assertFalse(self.dest.exists())
+        self.assertEqual(list(self.dest.parent.iterdir()), [])
+        self.assertTrue(self.src.exists())
+
+    def test_move_interrupted(self):
+        with patch.object(Path, "replace", self.__cross_device_replace()), \
+                patch("shutil.copy2", side_effect=self.__interrupted_copy):
+            retcode, _ = SystemUtils.move(self.src, self.dest)
+        self.assertNotEqual(retcode, 0)
+        # 源文件保留，目标文件不存在
+        self.assertTrue(self.src.exists())
+        self.assertFalse(self.dest.exists())
+        self.assertEqual(list(self.dest.parent.iterdir()), [])
+
+    def test_move_cross_device(self):
+        data = self.src.read_bytes()
+        with patch.object(Path, "replace", self.__cross_device_replace()):
+            retcode, _ = SystemUtils.move(self.src, self.dest)
+        self.assertEqual(retcode, 0)
+        self.assertFalse(self.src.exists())
+        self.assertEqual(self.dest.read_bytes(), data)
+
+    def test_clear_temp_files(self):
+        # 进程被杀掉时临时文件来不及删除
+        temp = self.dest.with_name(f".{self.dest.name}.mptmp")
+        temp.write_bytes(b"partial")
+        self.assertEqual(SystemUtils.clear_temp_files(self.tmpdir / "dest"), [temp])
+        self.assertFalse(temp.exists())
+        self.assertTrue(self.src.exists())
+
+    def test_move_verify_failed(self):
+        # 跨设备移动校验失败时，源文件和原有的目标文件都保持不变
+        self.dest.write_bytes(b"old")
+        with patch.object(Path, "replace", self.__cross_device_replace()):
+            retcode, _ = SystemUtils.move(self.src, self.dest, verify=lambda src, temp: False)
+        self.assertNotEqual(retcode, 0)
+        self.assertTrue(self.src.exists())
+        self.assertEqual(self.dest.read_bytes(), b"old")
+        self.assertEqual(list(self.dest.parent.iterdir()), [self.dest])
+        # 校验通过后才替换目标文件、删除源文件
+        data = self.src.read_bytes()
+        with patch.object(Path, "replace", self.__cross_device_replace()):
+            retcode, _ = SystemUtils.move(self.src, self.dest,
+                                          verify=lambda src, temp: src.read_bytes() == temp.read_bytes())
+        self.assertEqual(retcode, 0)
+        self.assertFalse(self.src.exists())
+        self.assertEqual(self.dest.read_bytes(), data)
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+
+import shutil
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.chain.transfer import TransferChain
+from app.db.models import Base
+from app.db.models.transferjournal import TransferJournal
+from app.db.transferjournal_oper import TransferJournalOper
+
+
+class TransferJournalTest(TestCase):
+    def setUp(self) -> None:
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine, tables=[TransferJournal.__table__])
+        self.db = sessionmaker(bind=engine)()
+        self.journal = TransferJournalOper(self.db)
+
+    def tearDown(self) -> None:
+        self.db.close()
+
+    def __plan(self, src: str) -> TransferJournal:
+        return self.journal.plan(download_hash="hash", torrent_title="Movie 2023",
+                                 src=Path(src), mode="move", mtype="电影", tmdbid=1)
+
+    def test_resume(self):
+        first = self.__plan("/downloads/Movie 2023/a.mkv")
+        second = self.__plan("/downloads/Movie 2023/b.mkv")
+        # 第一个文件转移完成，第二个文件转移时中断
+        self.journal.start(first)
+        self.journal.finish(first, dest=Path("/library/Movie (2023)/a.mkv"))
+        self.journal.start(second, dest=Path("/library/电影/华语电影"))
+        self.assertFalse(self.journal.is_done("hash"))
+        # 恢复时只有未完成的日志需要处理，重新登记时复用原记录
+        self.assertEqual([journal.id for journal in self.journal.list_unfinished()], [second.id])
+        self.assertEqual(self.journal.list_unfinished()[0].dest, "/library/电影/华语电影")
+        self.assertEqual(self.__plan("/downloads/Movie 2023/b.mkv").id, second.id)
+        self.journal.finish(second)
+        self.assertTrue(self.journal.is_done("hash"))
+        self.journal.clear("hash")
+        self.assertEqual(self.journal.list_by_hash("hash"), [])
+        self.assertFalse(self.journal.is_done("hash"))
+
+    def test_rollback(self):
+        # 只清理中断时正在转移的目的目录，其它目录下的临时文件不处理
+        tmpdir = Path(tempfile.mkdtemp())
+        try:
+            running = tmpdir / "电影" / "华语电影" / "Movie (2023)"
+            other = tmpdir / "电视剧" / "国产剧" / "Show (2023)"
+            running.mkdir(parents=True)
+            other.mkdir(parents=True)
+            running_temp = running / ".Movie (2023).mkv.mptmp"
+            other_temp = other / ".Show (2023) - S01E01.mkv.mptmp"
+            running_temp.write_bytes(b"partial")
+            other_temp.write_bytes(b"partial")
+            journal = self.__plan("/downloads/Movie 2023/a.mkv")
+            self.journal.start(journal, dest=tmpdir / "电影" / "华语电影")
+            TransferChain._TransferChain__rollback_temp_files(self.journal.list_unfinished())
+            self.assertFalse(running_temp.exists())
+            self.assertTrue(other_temp.exists())
+        finally:
+            shutil.rmtree(tmpdir, ignore_errors=True)